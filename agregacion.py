@@ -0,0 +1,211 @@
+import os
+from array import array
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Agregación del historial de movimientos en varios procesos. El historial se
+# parte en fragmentos columnares (arrays del módulo array: se serializan como
+# bytes) con productos, responsables y almacenes codificados como enteros; cada
+# proceso devuelve un parcial compacto {clave de códigos: [movimientos, neto]}
+# y el proceso principal los fusiona y traduce los códigos a nombres.
+
+# Columnas de un fragmento, en este orden
+COLUMNAS = ('producto', 'responsable', 'almacen', 'tipo', 'cantidad', 'marca')
+DIMENSIONES = ('producto', 'responsable', 'almacen', 'tipo', 'dia', 'mes')
+_MICROSEGUNDOS_DIA = 86_400_000_000
+_EPOCA = date(1970, 1, 1)
+
+
+class Tablas:
+    # Traducción de códigos a valores, compartida por todos los fragmentos de una fuente
+    def __init__(self, productos: List[str], responsables: List[str], almacenes: List[str],
+                 tipos: Sequence[str]):
+        self.productos = productos
+        self.responsables = responsables
+        self.almacenes = almacenes
+        self.tipos = tipos
+
+
+class Codificador(Tablas):
+    # Construye fragmentos a partir de filas (producto, responsable, almacen,
+    # tipo, cantidad con signo, marca), para fuentes que no son columnares
+    def __init__(self, tipos: Sequence[str]):
+        super().__init__([], [], [], tipos)
+        self._codigos = ({}, {}, {})
+        self._codigos_tipo = {tipo: codigo for codigo, tipo in enumerate(tipos)}
+
+    def _codigo(self, tabla: List[str], codigos: Dict[str, int], valor: str) -> int:
+        codigo = codigos.get(valor)
+        if codigo is None:
+            codigo = codigos[valor] = len(tabla)
+            tabla.append(valor)
+        return codigo
+
+    def fragmentos(self, filas: Iterable[tuple], tamano: int) -> Iterator[tuple]:
+        productos, responsables, almacenes = self._codigos
+        fragmento = _fragmento_vacio()
+        for producto, responsable, almacen, tipo, cantidad, marca in filas:
+            fragmento[0].append(self._codigo(self.productos, productos, producto))
+            fragmento[1].append(self._codigo(self.responsables, responsables, responsable))
+            fragmento[2].append(self._codigo(self.almacenes, almacenes, almacen))
+            fragmento[3].append(self._codigos_tipo[tipo])
+            fragmento[4].append(cantidad)
+            fragmento[5].append(marca)
+            if len(fragmento[5]) >= tamano:
+                yield tuple(fragmento)
+                fragmento = _fragmento_vacio()
+        if fragmento[5]:
+            yield tuple(fragmento)
+
+
+def _fragmento_vacio() -> list:
+    return [array('i'), array('i'), array('H'), array('B'), array('q'), array('q')]
+
+
+def agregar_fragmento(fragmento: tuple, dimensiones: Tuple[str, ...]):
+    # Se ejecuta en los procesos del pool: solo usa la biblioteca estándar y
+    # devuelve ({clave: [movimientos, neto]}, primera marca, última marca).
+    # El tipo siempre forma parte de la clave: así las unidades (|neto|) salen
+    # de la suma con signo sin una segunda pasada.
+    columnas = dict(zip(COLUMNAS, fragmento))
+    marcas = columnas['marca']
+    if not marcas:
+        return {}, None, None
+    if 'dia' in dimensiones:
+        columnas['dia'] = array('l', (m // _MICROSEGUNDOS_DIA for m in marcas))
+    claves = [columnas[d] for d in dimensiones + ('tipo',)]
+    netos = defaultdict(int)
+    for clave, cantidad in zip(zip(*claves), columnas['cantidad']):
+        netos[clave] += cantidad
+    cuentas = Counter(zip(*claves))
+    return {clave: [cuentas[clave], neto] for clave, neto in netos.items()}, min(marcas), max(marcas)
+
+
+class Agregado:
+    # Resultado fusionado: {valores de las dimensiones: [movimientos, unidades, neto]}
+    # por tipo de movimiento, y el intervalo de fechas cubierto
+    def __init__(self, dimensiones: Tuple[str, ...], totales: Dict[tuple, Dict[str, list]],
+                 primera: Optional[datetime], ultima: Optional[datetime]):
+        self.dimensiones = dimensiones
+        self.totales = totales
+        self.primera = primera
+        self.ultima = ultima
+
+    def __len__(self) -> int:
+        return len(self.totales)
+
+    def filas(self) -> Iterator[dict]:
+        # Una fila por clave, sumando los tipos
+        for clave, por_tipo in self.totales.items():
+            fila = dict(zip(self.dimensiones, clave))
+            fila['movimientos'] = sum(t[0] for t in por_tipo.values())
+            fila['unidades'] = sum(t[1] for t in por_tipo.values())
+            fila['neto'] = sum(t[2] for t in por_tipo.values())
+            yield fila
+
+
+class MotorAgregacion:
+    # Con pocos movimientos (un solo fragmento) se agrega en el propio proceso:
+    # arrancar o alimentar el pool costaría más que el cálculo. El pool se crea
+    # al primer uso y se reutiliza; usa forkserver para no bifurcar un proceso
+    # con hilos (los del Ejecutor de la vista) y cerrojos tomados.
+    def __init__(self, procesos: int = None, tamano_fragmento: int = 250_000):
+        self.procesos = procesos or os.cpu_count() or 1
+        self.tamano_fragmento = tamano_fragmento
+        self._pool = None
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            # Importación diferida: la CLI y los reportes pequeños no la pagan
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            metodos = multiprocessing.get_all_start_methods()
+            contexto = multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+            self._pool = ProcessPoolExecutor(self.procesos, mp_context=contexto)
+        return self._pool
+
+    def agregar(self, tablas: Tablas, fragmentos: Iterable[tuple],
+                dimensiones: Sequence[str]) -> Agregado:
+        dimensiones = tuple(dimensiones)
+        for dimension in dimensiones:
+            if dimension not in DIMENSIONES:
+                raise ValueError(f"No se puede agregar por {dimension}")
+        # El mes se calcula al fusionar, a partir del día
+        en_fragmento = tuple('dia' if d == 'mes' else d for d in dimensiones)
+        parciales = self._parciales(iter(fragmentos), en_fragmento)
+        return self._fusionar(tablas, parciales, dimensiones)
+
+    def _parciales(self, fragmentos: Iterator[tuple], dimensiones: Tuple[str, ...]) -> Iterator:
+        primero = next(fragmentos, None)
+        if primero is None:
+            return
+        segundo = next(fragmentos, None)
+        todos = chain((primero,) if segundo is None else (primero, segundo), fragmentos)
+        if segundo is None or self.procesos == 1:
+            for fragmento in todos:
+                yield agregar_fragmento(fragmento, dimensiones)
+            return
+        # Como mucho dos fragmentos en vuelo por proceso: la memoria no crece con el historial
+        pool = self._obtener_pool()
+        pendientes = deque()
+        for fragmento in todos:
+            pendientes.append(pool.submit(agregar_fragmento, fragmento, dimensiones))
+            if len(pendientes) >= 2 * self.procesos:
+                yield pendientes.popleft().result()
+        for futuro in pendientes:
+            yield futuro.result()
+
+    @staticmethod
+    def _fusionar(tablas: Tablas, parciales: Iterator, dimensiones: Tuple[str, ...]) -> Agregado:
+        # Las tablas se consultan al fusionar: un Codificador las completa a
+        # medida que genera los fragmentos
+        valores = {'producto': tablas.productos.__getitem__,
+                   'responsable': tablas.responsables.__getitem__,
+                   'almacen': tablas.almacenes.__getitem__,
+                   'tipo': tablas.tipos.__getitem__,
+                   'dia': _dia, 'mes': _mes}
+        traducir = [valores[dimension] for dimension in dimensiones]
+        # Primero se suman los parciales por códigos; cada clave se traduce una sola vez
+        por_codigos: Dict[tuple, list] = {}
+        primera = ultima = None
+        for parcial, minimo, maximo in parciales:
+            if minimo is None:
+                continue
+            primera = minimo if primera is None else min(primera, minimo)
+            ultima = maximo if ultima is None else max(ultima, maximo)
+            for codigos, (movimientos, neto) in parcial.items():
+                acumulado = por_codigos.get(codigos)
+                if acumulado is None:
+                    por_codigos[codigos] = [movimientos, neto]
+                else:
+                    acumulado[0] += movimientos
+                    acumulado[1] += neto
+        totales: Dict[tuple, Dict[str, list]] = {}
+        for (*codigos, tipo), (movimientos, neto) in por_codigos.items():
+            clave = tuple(valor(codigo) for valor, codigo in zip(traducir, codigos))
+            acumulado = totales.setdefault(clave, {}).setdefault(tablas.tipos[tipo], [0, 0, 0])
+            acumulado[0] += movimientos
+            acumulado[1] += abs(neto)
+            acumulado[2] += neto
+        return Agregado(dimensiones, totales, _fecha(primera), _fecha(ultima))
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def _dia(codigo: int) -> str:
+    return (_EPOCA + timedelta(days=codigo)).isoformat()
+
+
+def _mes(codigo: int) -> str:
+    return (_EPOCA + timedelta(days=codigo)).isoformat()[:7]
+
+
+def _fecha(marca: Optional[int]) -> Optional[datetime]:
+    if marca is None:
+        return None
+    return datetime(1970, 1, 1) + timedelta(microseconds=marca)
@@ -0,0 +1,491 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple
+
+from agregacion import Codificador, Tablas
+from historial import HistorialColumnar, HistorialObjetos, _marca
+from modelo import TIPOS_MOVIMIENTO, Movimiento
+from reportes import ORDEN_NATURAL, ConsultasPaginadas, clave_orden, paginar, validar_pagina
+
+COLECCIONES = ("categorias", "proveedores", "responsables", "productos")
+
+
+class Almacenamiento(ABC):
+    # Backend de almacenamiento del GestorInventario. El catálogo se mantiene
+    # además en los registros en memoria del gestor (búsquedas O(1)); el backend
+    # decide dónde vive el historial de movimientos y cómo se consultan los reportes.
+    persistente = False
+
+    def vincular(self, indices: dict):
+        # Mapas id -> entidad del gestor, para materializar movimientos
+        self._indices = indices
+
+    @abstractmethod
+    def leer_entidades(self, coleccion: str) -> Iterator[dict]:
+        pass
+
+    @abstractmethod
+    def guardar_entidades(self, coleccion: str, entidades: Iterable):
+        pass
+
+    @abstractmethod
+    def eliminar_producto(self, _id: str):
+        pass
+
+    @abstractmethod
+    def leer_existencias(self) -> Iterator[dict]:
+        pass
+
+    @abstractmethod
+    def guardar_existencias(self, celdas: Iterable):
+        # celdas: (producto_id, almacén, existencias)
+        pass
+
+    @abstractmethod
+    def tiene_movimientos(self, producto_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def agregar_movimientos(self, movimientos: List[Movimiento]):
+        pass
+
+    @property
+    @abstractmethod
+    def movimientos(self) -> Sequence:
+        pass
+
+    @abstractmethod
+    def consultar_movimientos(self, offset: int = 0, limit: int = None, orden: str = None,
+                              descendente: bool = False, filtro: str = None,
+                              desde: datetime = None, hasta: datetime = None) -> List[Movimiento]:
+        pass
+
+    @abstractmethod
+    def contar_movimientos(self, filtro: str = None, desde: datetime = None,
+                           hasta: datetime = None) -> int:
+        pass
+
+    @abstractmethod
+    def iterar_movimientos(self, orden: str = None, descendente: bool = False, filtro: str = None,
+                           desde: datetime = None, hasta: datetime = None) -> Iterator[Movimiento]:
+        # Como consultar_movimientos sin paginar, pero perezoso: para exportar
+        # historiales completos sin materializarlos en una lista
+        pass
+
+    @abstractmethod
+    def neto_posterior(self, producto_id: str, fecha: datetime) -> int:
+        # Cantidad neta movida del producto después de `fecha`
+        pass
+
+    @abstractmethod
+    def fragmentos_movimientos(self, tamano: int, desde: datetime = None,
+                               hasta: datetime = None) -> Tuple[Tablas, Iterator[tuple]]:
+        # Historial en fragmentos columnares de hasta `tamano` movimientos
+        # (ver agregacion.COLUMNAS) y las tablas para traducir sus códigos
+        pass
+
+    @abstractmethod
+    def productos_stock_bajo(self, indice_stock_bajo) -> List:
+        pass
+
+    @abstractmethod
+    def limpiar(self):
+        pass
+
+    def cerrar(self):
+        pass
+
+
+class AlmacenamientoMemoria(Almacenamiento):
+    # Todo en memoria; la persistencia queda en guardar_datos o el diario.
+    # Con columnar=True el historial se guarda en columnas array compactas.
+    def __init__(self, columnar: bool = False):
+        self._movimientos = HistorialColumnar() if columnar else HistorialObjetos()
+        self._consultas = ConsultasPaginadas()
+
+    def vincular(self, indices: dict):
+        super().vincular(indices)
+        self._movimientos.vincular(indices)
+
+    def leer_entidades(self, coleccion: str) -> Iterator[dict]:
+        return iter(())
+
+    def guardar_entidades(self, coleccion: str, entidades: Iterable):
+        pass
+
+    def eliminar_producto(self, _id: str):
+        pass
+
+    def leer_existencias(self) -> Iterator[dict]:
+        return iter(())
+
+    def guardar_existencias(self, celdas: Iterable):
+        pass
+
+    def tiene_movimientos(self, producto_id: str) -> bool:
+        return self._movimientos.tiene_producto(producto_id)
+
+    def agregar_movimientos(self, movimientos: List[Movimiento]):
+        self._movimientos.agregar_varios(movimientos)
+
+    @property
+    def movimientos(self) -> Sequence:
+        return self._movimientos
+
+    def consultar_movimientos(self, offset: int = 0, limit: int = None, orden: str = None,
+                              descendente: bool = False, filtro: str = None,
+                              desde: datetime = None, hasta: datetime = None) -> List[Movimiento]:
+        if not filtro and clave_orden("movimientos", orden) is ORDEN_NATURAL:
+            # Orden natural: se lee directamente la ventana pedida del índice
+            # temporal, sin recorrer el historial
+            posiciones = self._movimientos.posiciones_entre(desde, hasta)
+            if descendente:
+                posiciones = posiciones[::-1]
+            return [self._movimientos[i] for i in paginar(posiciones, offset, limit)]
+        return paginar(self._resolver(orden, descendente, filtro, desde, hasta), offset, limit)
+
+    def contar_movimientos(self, filtro: str = None, desde: datetime = None,
+                           hasta: datetime = None) -> int:
+        if not filtro:
+            return len(self._movimientos.posiciones_entre(desde, hasta))
+        return len(self._resolver(None, False, filtro, desde, hasta))
+
+    def iterar_movimientos(self, orden: str = None, descendente: bool = False, filtro: str = None,
+                           desde: datetime = None, hasta: datetime = None) -> Iterator[Movimiento]:
+        if not filtro and clave_orden("movimientos", orden) is ORDEN_NATURAL:
+            # Las posiciones se fijan ahora; lo que se registre después no entra
+            posiciones = self._movimientos.posiciones_entre(desde, hasta)
+            if descendente:
+                posiciones = posiciones[::-1]
+            return map(self._movimientos.__getitem__, posiciones)
+        # Ordenar o filtrar necesita el resultado completo (el mismo de la caché de páginas)
+        return iter(self._resolver(orden, descendente, filtro, desde, hasta))
+
+    def _resolver(self, orden, descendente, filtro, desde, hasta) -> List[Movimiento]:
+        # El historial solo crece: su longitud sirve como versión de la caché
+        if desde is None and hasta is None:
+            elementos = lambda: self._movimientos
+        else:
+            elementos = lambda: (self._movimientos[i]
+                                 for i in self._movimientos.posiciones_entre(desde, hasta))
+        return self._consultas.resolver("movimientos", elementos, len(self._movimientos),
+                                        orden, descendente, filtro, rango=(desde, hasta))
+
+    def neto_posterior(self, producto_id: str, fecha: datetime) -> int:
+        return (self._movimientos.neto_total(producto_id)
+                - self._movimientos.neto_hasta(producto_id, fecha))
+
+    def fragmentos_movimientos(self, tamano: int, desde: datetime = None,
+                               hasta: datetime = None) -> Tuple[Tablas, Iterator[tuple]]:
+        return self._movimientos.fragmentos(tamano, desde, hasta)
+
+    def productos_stock_bajo(self, indice_stock_bajo) -> List:
+        return list(indice_stock_bajo)
+
+    def limpiar(self):
+        self._movimientos.limpiar()
+
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS categorias (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS proveedores (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    contacto TEXT
+);
+CREATE TABLE IF NOT EXISTS responsables (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    rol TEXT
+);
+CREATE TABLE IF NOT EXISTS productos (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    categoria TEXT NOT NULL REFERENCES categorias(id),
+    proveedor TEXT NOT NULL REFERENCES proveedores(id),
+    stock_minimo INTEGER NOT NULL,
+    stock_actual INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movimientos (
+    n INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    tipo TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    producto TEXT NOT NULL REFERENCES productos(id),
+    cantidad INTEGER NOT NULL,
+    responsable TEXT NOT NULL REFERENCES responsables(id),
+    almacen TEXT NOT NULL,
+    motivo TEXT
+);
+CREATE TABLE IF NOT EXISTS existencias (
+    producto TEXT NOT NULL REFERENCES productos(id),
+    almacen TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    PRIMARY KEY (producto, almacen)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria);
+CREATE INDEX IF NOT EXISTS idx_productos_proveedor ON productos(proveedor);
+CREATE INDEX IF NOT EXISTS idx_productos_stock_bajo ON productos(stock_actual < stock_minimo);
+CREATE INDEX IF NOT EXISTS idx_movimientos_fecha ON movimientos(fecha);
+CREATE INDEX IF NOT EXISTS idx_movimientos_producto ON movimientos(producto, fecha);
+CREATE INDEX IF NOT EXISTS idx_movimientos_almacen ON movimientos(almacen, fecha);
+"""
+
+# Bases creadas antes del libro de stock: las existencias se reconstruyen una
+# vez a partir del historial
+MIGRAR_EXISTENCIAS_SQLITE = """
+INSERT INTO existencias (producto, almacen, cantidad)
+SELECT producto, almacen, SUM(CASE tipo WHEN 'Salida' THEN -cantidad ELSE cantidad END)
+FROM movimientos
+WHERE NOT EXISTS (SELECT 1 FROM existencias)
+GROUP BY producto, almacen
+"""
+
+COLUMNAS_MOVIMIENTO = ("id", "tipo", "fecha", "producto", "cantidad", "responsable", "almacen", "motivo")
+
+# Columnas SQL equivalentes a las claves de orden de reportes.CLAVES_ORDEN["movimientos"]
+ORDEN_SQL_MOVIMIENTOS = {
+    "id": "m.n",
+    "fecha": "m.n",
+    "tipo": "m.tipo",
+    "producto": "p.nombre",
+    "cantidad": "m.cantidad",
+    "responsable": "r.nombre",
+    "almacen": "m.almacen"
+}
+
+
+class AlmacenamientoSQLite(Almacenamiento):
+    # Backend persistente sobre sqlite3 en modo WAL. El historial no se carga
+    # en memoria: los movimientos se materializan bajo demanda desde la tabla.
+    persistente = True
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        # Una conexión compartida entre hilos; su uso se serializa con _cerrojo
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._cerrojo = threading.RLock()
+        self._conexion.row_factory = sqlite3.Row
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("PRAGMA foreign_keys=ON")
+        self._conexion.executescript(ESQUEMA_SQLITE)
+        with self._conexion:
+            self._conexion.execute(MIGRAR_EXISTENCIAS_SQLITE)
+        self._movimientos = _MovimientosSQLite(self)
+
+    def _consultar(self, sql: str, parametros=()) -> List[sqlite3.Row]:
+        with self._cerrojo:
+            return self._conexion.execute(sql, parametros).fetchall()
+
+    def leer_entidades(self, coleccion: str) -> Iterator[dict]:
+        return (dict(fila) for fila in self._consultar(f"SELECT * FROM {coleccion} ORDER BY rowid"))
+
+    def guardar_entidades(self, coleccion: str, entidades: Iterable):
+        registros = [e.a_registro() for e in entidades]
+        if not registros:
+            return
+        columnas = tuple(registros[0])
+        # Upsert y no INSERT OR REPLACE: este borra la fila y la inserta con un
+        # rowid nuevo, y leer_entidades ordena por rowid
+        sql = (f"INSERT INTO {coleccion} ({', '.join(columnas)}) "
+               f"VALUES ({', '.join('?' * len(columnas))}) "
+               f"ON CONFLICT(id) DO UPDATE SET "
+               f"{', '.join(f'{c} = excluded.{c}' for c in columnas if c != 'id')}")
+        with self._cerrojo, self._conexion:
+            self._conexion.executemany(sql, ([r[c] for c in columnas] for r in registros))
+
+    def eliminar_producto(self, _id: str):
+        with self._cerrojo, self._conexion:
+            self._conexion.execute("DELETE FROM existencias WHERE producto = ?", (_id,))
+            self._conexion.execute("DELETE FROM productos WHERE id = ?", (_id,))
+
+    def leer_existencias(self) -> Iterator[dict]:
+        return (dict(fila) for fila in self._consultar("SELECT producto, almacen, cantidad FROM existencias"))
+
+    def guardar_existencias(self, celdas: Iterable):
+        with self._cerrojo, self._conexion:
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO existencias (producto, almacen, cantidad) VALUES (?, ?, ?)", celdas)
+
+    def tiene_movimientos(self, producto_id: str) -> bool:
+        return bool(self._consultar("SELECT 1 FROM movimientos WHERE producto = ? LIMIT 1", (producto_id,)))
+
+    def agregar_movimientos(self, movimientos: List[Movimiento]):
+        # Movimientos, stock y existencias resultantes en una sola transacción
+        registros = [m.a_registro() for m in movimientos]
+        productos = {m.producto.id: m.producto.stock_actual for m in movimientos}
+        celdas = {(m.producto.id, m.almacen): m.producto.existencias(m.almacen) for m in movimientos}
+        with self._cerrojo, self._conexion:
+            inicio = len(self._movimientos) + 1
+            filas = [[n] + [r.get(c) for c in COLUMNAS_MOVIMIENTO] for n, r in enumerate(registros, inicio)]
+            self._conexion.executemany(
+                f"INSERT INTO movimientos (n, {', '.join(COLUMNAS_MOVIMIENTO)}) "
+                f"VALUES ({', '.join('?' * (len(COLUMNAS_MOVIMIENTO) + 1))})", filas)
+            self._conexion.executemany(
+                "UPDATE productos SET stock_actual = ? WHERE id = ?",
+                ((stock, _id) for _id, stock in productos.items()))
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO existencias (producto, almacen, cantidad) VALUES (?, ?, ?)",
+                ((_id, almacen, cantidad) for (_id, almacen), cantidad in celdas.items()))
+            self._movimientos._total += len(filas)
+
+    @property
+    def movimientos(self) -> Sequence:
+        return self._movimientos
+
+    def consultar_movimientos(self, offset: int = 0, limit: int = None, orden: str = None,
+                              descendente: bool = False, filtro: str = None,
+                              desde: datetime = None, hasta: datetime = None) -> List[Movimiento]:
+        # Filtro, rango de fechas, orden y paginación se resuelven en SQL con los
+        # índices de la tabla
+        validar_pagina(offset, limit)
+        sql, parametros = self._sql_movimientos(orden, descendente, filtro, desde, hasta)
+        filas = self._consultar(f"{sql} LIMIT ? OFFSET ?",
+                                parametros + [-1 if limit is None else limit, offset])
+        return [self._materializar(fila) for fila in filas]
+
+    def iterar_movimientos(self, orden: str = None, descendente: bool = False, filtro: str = None,
+                           desde: datetime = None, hasta: datetime = None) -> Iterator[Movimiento]:
+        sql, parametros = self._sql_movimientos(orden, descendente, filtro, desde, hasta)
+        return self._iterar_consulta(sql, parametros)
+
+    def _sql_movimientos(self, orden, descendente, filtro, desde, hasta):
+        clave_orden("movimientos", orden)  # valida la columna
+        where, parametros = self._where_filtro(filtro, desde, hasta)
+        direccion = "DESC" if descendente else "ASC"
+        sql = (f"SELECT {', '.join('m.' + c for c in COLUMNAS_MOVIMIENTO)} FROM movimientos m "
+               f"JOIN productos p ON p.id = m.producto JOIN responsables r ON r.id = m.responsable "
+               f"{where} ORDER BY {ORDEN_SQL_MOVIMIENTOS[orden or 'id']} {direccion}, m.n")
+        return sql, parametros
+
+    def _iterar_consulta(self, sql: str, parametros, lote: int = 1000) -> Iterator[Movimiento]:
+        return map(self._materializar, self._iterar_filas(sql, parametros, lote))
+
+    def _iterar_filas(self, sql: str, parametros, lote: int = 1000) -> Iterator[sqlite3.Row]:
+        # Con una conexión propia: en modo WAL la consulta lee una instantánea
+        # consistente sin retener _cerrojo ni bloquear a los escritores
+        if self.ruta == ":memory:":
+            yield from self._consultar(sql, parametros)
+            return
+        conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        conexion.row_factory = sqlite3.Row
+        try:
+            cursor = conexion.execute(sql, parametros)
+            while True:
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                yield from filas
+        finally:
+            conexion.close()
+
+    def contar_movimientos(self, filtro: str = None, desde: datetime = None,
+                           hasta: datetime = None) -> int:
+        if not filtro and desde is None and hasta is None:
+            return len(self._movimientos)
+        where, parametros = self._where_filtro(filtro, desde, hasta)
+        return self._consultar(
+            f"SELECT COUNT(*) FROM movimientos m JOIN productos p ON p.id = m.producto "
+            f"JOIN responsables r ON r.id = m.responsable {where}", parametros)[0][0]
+
+    @staticmethod
+    def _where_filtro(filtro: str, desde: datetime = None, hasta: datetime = None):
+        # Mismos campos que reportes.texto_busqueda. Las fechas se guardan en ISO,
+        # que se ordena igual como texto (índice idx_movimientos_fecha).
+        condiciones, parametros = [], []
+        if filtro:
+            campos = ("m.id", "m.tipo", "m.producto", "p.nombre", "r.nombre", "m.almacen")
+            condiciones.append(f"({' OR '.join(c + ' LIKE ?' for c in campos)})")
+            parametros += [f"%{filtro}%"] * len(campos)
+        if desde is not None:
+            condiciones.append("m.fecha >= ?")
+            parametros.append(desde.isoformat())
+        if hasta is not None:
+            condiciones.append("m.fecha <= ?")
+            parametros.append(hasta.isoformat())
+        if not condiciones:
+            return "", []
+        return f"WHERE {' AND '.join(condiciones)}", parametros
+
+    def neto_posterior(self, producto_id: str, fecha: datetime) -> int:
+        # Recorre solo los movimientos posteriores con el índice (producto, fecha)
+        return self._consultar(
+            "SELECT COALESCE(SUM(CASE tipo WHEN 'Salida' THEN -cantidad ELSE cantidad END), 0) "
+            "FROM movimientos WHERE producto = ? AND fecha > ?",
+            (producto_id, fecha.isoformat()))[0][0]
+
+    def fragmentos_movimientos(self, tamano: int, desde: datetime = None,
+                               hasta: datetime = None) -> Tuple[Tablas, Iterator[tuple]]:
+        # Filas crudas, sin materializar Movimiento, codificadas por lotes
+        where, parametros = self._where_filtro(None, desde, hasta)
+        sql = (f"SELECT m.producto, m.responsable, m.almacen, m.tipo, "
+               f"CASE m.tipo WHEN 'Salida' THEN -m.cantidad ELSE m.cantidad END, m.fecha "
+               f"FROM movimientos m {where} ORDER BY m.n")
+        filas = ((producto, responsable, almacen, tipo, cantidad, _marca(datetime.fromisoformat(fecha)))
+                 for producto, responsable, almacen, tipo, cantidad, fecha
+                 in self._iterar_filas(sql, parametros, lote=10_000))
+        codificador = Codificador(tuple(TIPOS_MOVIMIENTO))
+        return codificador, codificador.fragmentos(filas, tamano)
+
+    def productos_stock_bajo(self, indice_stock_bajo) -> List:
+        productos = self._indices['productos']
+        filas = self._consultar("SELECT id FROM productos WHERE stock_actual < stock_minimo ORDER BY rowid")
+        return [productos[fila[0]] for fila in filas]
+
+    def limpiar(self):
+        with self._cerrojo, self._conexion:
+            for tabla in ("movimientos", "existencias") + tuple(reversed(COLECCIONES)):
+                self._conexion.execute(f"DELETE FROM {tabla}")
+            self._movimientos._total = 0
+
+    def cerrar(self):
+        with self._cerrojo:
+            self._conexion.close()
+
+    def _materializar(self, fila) -> Movimiento:
+        return Movimiento.desde_registro(dict(fila), self._indices)
+
+
+class _MovimientosSQLite(Sequence):
+    # Vista perezosa del historial: len O(1), acceso por posición e iteración por lotes
+    _SELECT = f"SELECT {', '.join(COLUMNAS_MOVIMIENTO)} FROM movimientos"
+
+    def __init__(self, almacenamiento: AlmacenamientoSQLite):
+        self._almacenamiento = almacenamiento
+        self._total = almacenamiento._consultar("SELECT MAX(n) FROM movimientos")[0][0] or 0
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            inicio, fin, paso = posicion.indices(self._total)
+            if paso != 1:
+                return [self[i] for i in range(inicio, fin, paso)]
+            return list(self._rango(inicio, fin))
+        if posicion < 0:
+            posicion += self._total
+        if not 0 <= posicion < self._total:
+            raise IndexError("Índice de movimiento fuera de rango")
+        filas = self._almacenamiento._consultar(f"{self._SELECT} WHERE n = ?", (posicion + 1,))
+        return self._almacenamiento._materializar(filas[0])
+
+    def __iter__(self) -> Iterator[Movimiento]:
+        return self._rango(0, self._total)
+
+    def _rango(self, inicio: int, fin: int, lote: int = 1000) -> Iterator[Movimiento]:
+        # Lotes por clave (n) para no retener un cursor abierto entre hilos
+        materializar = self._almacenamiento._materializar
+        while inicio < fin:
+            hasta = min(inicio + lote, fin)
+            for fila in self._almacenamiento._consultar(
+                    f"{self._SELECT} WHERE n > ? AND n <= ? ORDER BY n", (inicio, hasta)):
+                yield materializar(fila)
+            inicio = hasta
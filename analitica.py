@@ -0,0 +1,158 @@
+import math
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from agregacion import Tablas
+from modelo import Movimiento, Producto
+
+# Analítica de demanda con NumPy: las salidas de los últimos DIAS_HISTORIA días
+# en una matriz productos × días, y las previsiones de todo el catálogo con
+# operaciones sobre la matriz completa. NumPy es opcional: el controlador
+# importa este módulo solo al pedir el reporte de reabastecimiento.
+
+DIAS_HISTORIA = 90
+VENTANA_CONSUMO = 28      # días de la media móvil del consumo
+PLAZO_ENTREGA = 7         # días desde el pedido hasta la recepción
+PERIODO_REVISION = 14     # días entre revisiones del stock
+FACTOR_SERVICIO = 1.65    # z de la normal: ~95 % de ciclos sin rotura
+
+_MICROSEGUNDOS_DIA = 86_400_000_000
+_EPOCA = datetime(1970, 1, 1)
+
+
+class AnaliticaDemanda:
+    # La matriz se carga una vez desde el almacenamiento y después se mantiene
+    # con anotar(): los movimientos nuevos quedan pendientes y se suman en
+    # bloque al calcular. Al cambiar de día las columnas se desplazan.
+    def __init__(self, dias: int = DIAS_HISTORIA, ventana: int = VENTANA_CONSUMO,
+                 plazo: int = PLAZO_ENTREGA, revision: int = PERIODO_REVISION,
+                 factor_servicio: float = FACTOR_SERVICIO):
+        if not 1 < ventana <= dias:
+            raise ValueError("La ventana de consumo debe estar entre 2 y los días de historia")
+        self.dias = dias
+        self.ventana = ventana
+        self.plazo = plazo
+        self.revision = revision
+        self.factor_servicio = factor_servicio
+        self._ultimo_dia = _dia_actual()
+        self._filas: Dict[str, int] = {}
+        self._matriz = np.zeros((0, dias), dtype=np.int64)
+        # Salidas registradas tras la carga: (producto, día, unidades). Un deque
+        # porque los escritores añaden mientras un lector lo vacía.
+        self._pendientes = deque()
+        self._cache = None
+
+    @property
+    def primer_dia(self) -> int:
+        return self._ultimo_dia - self.dias + 1
+
+    def inicio_ventana(self) -> datetime:
+        return _EPOCA + timedelta(days=self.primer_dia)
+
+    def _fila(self, producto_id: str) -> int:
+        fila = self._filas.get(producto_id)
+        if fila is None:
+            fila = self._filas[producto_id] = len(self._filas)
+            if fila == len(self._matriz):
+                # Crece al doble: las altas sucesivas no copian la matriz cada vez
+                matriz = np.zeros((max(64, 2 * len(self._matriz)), self.dias), dtype=np.int64)
+                matriz[:len(self._matriz)] = self._matriz
+                self._matriz = matriz
+        return fila
+
+    def cargar(self, tablas: Tablas, fragmentos: Iterable[tuple], limite: int):
+        # Fragmentos columnares del historial desde inicio_ventana(), en orden de
+        # registro; solo se usan las `limite` primeras filas (las siguientes ya
+        # llegan por anotar)
+        salida = tablas.tipos.index("Salida")
+        filas_producto = np.empty(0, dtype=np.intp)
+        for productos, _, _, tipos, cantidades, marcas in fragmentos:
+            if limite <= 0:
+                break
+            productos, tipos, cantidades, marcas = (
+                np.asarray(columna)[:limite] for columna in (productos, tipos, cantidades, marcas))
+            limite -= len(marcas)
+            # Los códigos de producto se traducen a filas solo para los nuevos
+            nuevos = tablas.productos[len(filas_producto):]
+            if nuevos:
+                filas_producto = np.concatenate(
+                    (filas_producto, np.fromiter(map(self._fila, nuevos), np.intp, len(nuevos))))
+            salidas = tipos == salida
+            self._acumular(filas_producto[productos[salidas]],
+                           marcas[salidas] // _MICROSEGUNDOS_DIA, -cantidades[salidas])
+        self._cache = None
+
+    def anotar(self, movimientos: Sequence[Movimiento]):
+        for movimiento in movimientos:
+            if movimiento.tipo == "Salida":
+                self._pendientes.append((movimiento.producto.id,
+                                         (movimiento.fecha - _EPOCA).days, movimiento.cantidad))
+
+    def _aplicar_pendientes(self):
+        n = len(self._pendientes)
+        if not n:
+            return
+        lote = [self._pendientes.popleft() for _ in range(n)]
+        productos, dias, unidades = zip(*lote)
+        self._acumular(np.fromiter(map(self._fila, productos), np.intp, n),
+                       np.array(dias, dtype=np.int64), np.array(unidades, dtype=np.int64))
+        self._cache = None
+
+    def _acumular(self, filas: np.ndarray, dias: np.ndarray, unidades: np.ndarray):
+        # Fuera de la ventana no cuenta: lo anterior ya no pesa en la media
+        columnas = dias - self.primer_dia
+        dentro = (columnas >= 0) & (columnas < self.dias)
+        np.add.at(self._matriz, (filas[dentro], columnas[dentro]), unidades[dentro])
+
+    def _avanzar_a(self, dia: int):
+        pasados = dia - self._ultimo_dia
+        if pasados <= 0:
+            return
+        if pasados >= self.dias:
+            self._matriz[:] = 0
+        else:
+            self._matriz[:, :-pasados] = self._matriz[:, pasados:]
+            self._matriz[:, -pasados:] = 0
+        self._ultimo_dia = dia
+        self._cache = None
+
+    def calcular(self, productos: Sequence[Producto], version) -> Tuple[List[Producto], Dict[str, np.ndarray]]:
+        # Previsión de todo el catálogo. Se reutiliza mientras no cambien ni los
+        # datos (`version`) ni el día.
+        self._avanzar_a(_dia_actual())
+        self._aplicar_pendientes()
+        if self._cache is not None and self._cache[0] == version:
+            return self._cache[1]
+        productos = list(productos)
+        n = len(productos)
+        filas = np.fromiter((self._fila(p.id) for p in productos), np.intp, n)
+        stock = np.fromiter((p.stock_actual for p in productos), np.int64, n)
+
+        consumo = self._matriz[filas, -self.ventana:]
+        medio = consumo.mean(axis=1)
+        desviacion = consumo.std(axis=1, ddof=1)
+        # Stock de seguridad para la variabilidad durante el plazo de entrega
+        seguridad = self.factor_servicio * desviacion * math.sqrt(self.plazo)
+        punto_pedido = np.ceil(medio * self.plazo + seguridad)
+        # Pedido hasta cubrir plazo y revisión más la seguridad
+        objetivo = medio * (self.plazo + self.revision) + seguridad
+        cantidad = np.maximum(np.ceil(objetivo - stock), 0)
+        cobertura = np.divide(stock, medio, out=np.full(n, np.nan), where=medio > 0)
+
+        prevision = {
+            'consumo_medio': np.round(medio, 2),
+            'desviacion': np.round(desviacion, 2),
+            'dias_cobertura': np.round(cobertura, 1),
+            'punto_pedido': punto_pedido.astype(np.int64),
+            'cantidad_sugerida': cantidad.astype(np.int64),
+            'con_demanda': consumo.any(axis=1)
+        }
+        self._cache = (version, (productos, prevision))
+        return productos, prevision
+
+
+def _dia_actual() -> int:
+    return (datetime.now() - _EPOCA).days
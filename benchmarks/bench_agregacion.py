@@ -0,0 +1,52 @@
+import argparse
+import os
+import time
+
+from sintetico import generar_movimientos, poblar_catalogo
+
+from agregacion import MotorAgregacion
+from almacenamiento import AlmacenamientoMemoria
+from controlador import GestorInventario
+
+
+def medir(gestor: GestorInventario, procesos: int, dimensiones, repeticiones: int) -> float:
+    # Mejor de varias pasadas; el pool se arranca antes de cronometrar
+    motor = MotorAgregacion(procesos)
+    tablas, fragmentos = gestor.almacenamiento.fragmentos_movimientos(motor.tamano_fragmento)
+    motor.agregar(tablas, fragmentos, dimensiones)
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        tablas, fragmentos = gestor.almacenamiento.fragmentos_movimientos(motor.tamano_fragmento)
+        motor.agregar(tablas, fragmentos, dimensiones)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    motor.cerrar()
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalado de la agregación del historial con procesos")
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--movimientos", type=int, default=2_000_000)
+    parser.add_argument("--procesos", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    gestor = GestorInventario(AlmacenamientoMemoria(columnar=True))
+    poblar_catalogo(gestor, args.productos)
+    gestor.registrar_movimientos_lote(generar_movimientos(args.productos, args.movimientos))
+    print(f"{args.movimientos} movimientos, {os.cpu_count()} CPU")
+
+    for dimensiones in (("producto",), ("almacen",), ("responsable", "mes")):
+        base = None
+        for procesos in args.procesos:
+            segundos = medir(gestor, procesos, dimensiones, args.repeticiones)
+            base = base or segundos
+            print(f"{'+'.join(dimensiones):18s} {procesos:3d} procesos  {segundos:7.3f} s  "
+                  f"{args.movimientos / segundos:12,.0f} mov/s  x{base / segundos:4.2f}")
+    gestor.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Objetivo: de arranque en frío a primera orden completada (reporte pequeño a la
+# salida estándar sobre SQLite), medido como tiempo de pared del proceso
+OBJETIVO_MS = 100
+
+
+def tiempo_proceso(argumentos, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable] + argumentos, cwd=RAIZ, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def desglose_importaciones(argumentos, primeros: int):
+    # -X importtime escribe en stderr "import time: propio | acumulado | módulo";
+    # se agregan los módulos de primer nivel por tiempo acumulado
+    salida = subprocess.run([sys.executable, "-X", "importtime"] + argumentos, cwd=RAIZ, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    modulos = []
+    total = 0
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not nombre.startswith("  "):  # primer nivel
+            modulos.append((int(acumulado), nombre.strip()))
+            total += int(acumulado)
+    return total, sorted(modulos, reverse=True)[:primeros]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de la CLI (python -m inventario)")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--primeros", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        bd = os.path.join(directorio, "inventario.db")
+        subprocess.run([sys.executable, "-m", "inventario", "--sqlite", bd, "--ejemplo",
+                        "registrar", "Entrada", "PROD001", "1", "RESP001", "A"],
+                       cwd=RAIZ, check=True, stdout=subprocess.DEVNULL)
+        orden = ["-m", "inventario", "--sqlite", bd, "reporte", "productos"]
+
+        casos = (
+            ("python vacío", ["-c", "pass"]),
+            ("inventario --help", ["-m", "inventario", "--help"]),
+            ("inventario reporte", orden),
+            ("import tkinter + vista", ["-c", "import vista"]),
+        )
+        medianas = {}
+        for nombre, argumentos in casos:
+            medianas[nombre] = tiempo_proceso(argumentos, args.repeticiones)
+            print(f"{nombre:24s} {medianas[nombre]:7.1f} ms")
+
+        total, modulos = desglose_importaciones(orden, args.primeros)
+        print(f"\nImportaciones de 'inventario reporte' ({total / 1000:.1f} ms, -X importtime):")
+        for acumulado, nombre in modulos:
+            print(f"  {acumulado / 1000:7.2f} ms  {nombre}")
+
+    resultado = medianas["inventario reporte"]
+    estado = "OK" if resultado <= OBJETIVO_MS else "SUPERADO"
+    print(f"\nArranque en frío a primera orden: {resultado:.1f} ms (objetivo {OBJETIVO_MS} ms) {estado}")
+    return 0 if resultado <= OBJETIVO_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
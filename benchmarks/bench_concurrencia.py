@@ -0,0 +1,85 @@
+import argparse
+import random
+import threading
+import time
+
+from sintetico import N_RESPONSABLES, poblar_catalogo
+
+from almacenamiento import AlmacenamientoMemoria
+from controlador import GestorInventario
+
+STOCK_INICIAL = 1_000
+
+
+def estresar(n_hilos: int, por_hilo: int, mismo_producto: bool, n_productos: int = 64):
+    # Cada hilo registra `por_hilo` movimientos aleatorios. Las salidas pueden
+    # fallar por stock insuficiente: lo que se comprueba es que nunca se pierde
+    # ni se duplica una actualización.
+    gestor = GestorInventario(AlmacenamientoMemoria())
+    poblar_catalogo(gestor, n_productos)
+    for i in range(n_productos):
+        gestor.registrar_movimiento("Entrada", f"SKU{i:07d}", STOCK_INICIAL, "BRESP000", "ALM00")
+    inicial = {p.id: p.stock_actual for p in gestor.productos}
+    base = len(gestor.movimientos)
+    barrera = threading.Barrier(n_hilos + 1)
+    errores = []
+
+    def trabajo(semilla: int):
+        rnd = random.Random(semilla)
+        barrera.wait()
+        for _ in range(por_hilo):
+            producto = 0 if mismo_producto else rnd.randrange(n_productos)
+            tipo = rnd.choice(("Entrada", "Salida", "Salida"))
+            try:
+                gestor.registrar_movimiento(tipo, f"SKU{producto:07d}", rnd.randint(1, 20),
+                                            f"BRESP{rnd.randrange(N_RESPONSABLES):03d}", "ALM00")
+            except ValueError as e:
+                if str(e) != "Stock insuficiente":
+                    errores.append(e)
+
+    hilos = [threading.Thread(target=trabajo, args=(n,)) for n in range(n_hilos)]
+    for hilo in hilos:
+        hilo.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    comprobar(gestor, inicial, base, errores)
+    return (len(gestor.movimientos) - base) / segundos
+
+
+def comprobar(gestor: GestorInventario, inicial: dict, base: int, errores: list):
+    if errores:
+        raise AssertionError(f"Errores inesperados: {errores[:3]}")
+    neto = dict.fromkeys(inicial, 0)
+    for movimiento in gestor.movimientos[base:]:
+        neto[movimiento.producto.id] += movimiento.cantidad_neta
+    for producto in gestor.productos:
+        if producto.stock_actual < 0:
+            raise AssertionError(f"Stock negativo en {producto.id}")
+        if producto.stock_actual != inicial[producto.id] + neto[producto.id]:
+            raise AssertionError(f"Stock de {producto.id} no cuadra con el historial")
+    ids = [m.id for m in gestor.movimientos]
+    if ids != [f"MOV{n:03d}" for n in range(1, len(ids) + 1)]:
+        raise AssertionError("Los ids de movimiento no son únicos y consecutivos")
+    fechas = [m.fecha for m in gestor.movimientos]
+    if fechas != sorted(fechas):
+        raise AssertionError("El historial no está ordenado por fecha")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro concurrente de movimientos: invariantes y rendimiento")
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--por-hilo", type=int, default=5_000)
+    args = parser.parse_args()
+
+    for mismo_producto, nombre in ((True, "mismo producto"), (False, "productos distintos")):
+        for n_hilos in args.hilos:
+            velocidad = estresar(n_hilos, args.por_hilo, mismo_producto)
+            print(f"{nombre:20s} {n_hilos:3d} hilos  {velocidad:10,.0f} mov/s  invariantes OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sintetico import generar_movimientos, poblar_catalogo
+
+from almacenamiento import AlmacenamientoMemoria
+from controlador import GestorInventario
+
+
+def medir_exportacion(gestor: GestorInventario, ruta: str, **kwargs):
+    # Velocidad sin trazar; después, memoria adicional máxima durante la
+    # exportación (la del historial ya existía)
+    inicio = time.perf_counter()
+    filas = gestor.exportar_reporte("movimientos", ruta, **kwargs)
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    gestor.exportar_reporte("movimientos", ruta, **kwargs)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return filas, segundos, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria y velocidad de la exportación en streaming")
+    parser.add_argument("--productos", type=int, default=1_000)
+    parser.add_argument("--movimientos", type=int, nargs="+", default=[50_000, 200_000, 800_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for n_movimientos in args.movimientos:
+            gestor = GestorInventario(AlmacenamientoMemoria(columnar=True))
+            poblar_catalogo(gestor, args.productos)
+            gestor.registrar_movimientos_lote(generar_movimientos(args.productos, n_movimientos))
+            for extension in ("csv", "jsonl.gz"):
+                ruta = os.path.join(directorio, f"movimientos.{extension}")
+                filas, segundos, pico = medir_exportacion(gestor, ruta)
+                print(f"{n_movimientos:9d} movimientos  {extension:8s} {filas / segundos:9,.0f} filas/s  "
+                      f"pico {pico / 2 ** 20:6.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
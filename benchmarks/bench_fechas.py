@@ -0,0 +1,54 @@
+import argparse
+import random
+import time
+
+from sintetico import generar_movimientos, poblar_catalogo
+
+from almacenamiento import AlmacenamientoMemoria
+from controlador import GestorInventario
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas por rango de fechas y stock en una fecha pasada")
+    parser.add_argument("--productos", type=int, default=1_000)
+    parser.add_argument("--movimientos", type=int, default=200_000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    for nombre, columnar in (("objetos", False), ("columnar", True)):
+        gestor = GestorInventario(AlmacenamientoMemoria(columnar=columnar))
+        poblar_catalogo(gestor, args.productos)
+        for fila in generar_movimientos(args.productos, args.movimientos):
+            gestor.registrar_movimiento(**fila)
+        movimientos = gestor.movimientos
+        rnd = random.Random(0)
+
+        def rango():
+            inicio = rnd.randrange(len(movimientos) - 100)
+            gestor.generar_reporte("movimientos", 0, 50, desde=movimientos[inicio].fecha,
+                                   hasta=movimientos[inicio + 100].fecha)
+
+        def stock_en_fecha():
+            movimiento = movimientos[rnd.randrange(len(movimientos))]
+            gestor.stock_en_fecha(movimiento.producto.id, movimiento.fecha)
+
+        def recorrido():
+            # Lo que costaba antes: reconstruir el stock recorriendo el historial
+            movimiento = movimientos[rnd.randrange(len(movimientos))]
+            sum(m.cantidad_neta for m in movimientos
+                if m.producto is movimiento.producto and m.fecha <= movimiento.fecha)
+
+        print(f"{nombre:9s} rango (50 filas)   {medir(rango, args.repeticiones):10.1f} µs")
+        print(f"{nombre:9s} stock_en_fecha     {medir(stock_en_fecha, args.repeticiones):10.1f} µs")
+        print(f"{nombre:9s} recorrido completo {medir(recorrido, 3):10.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
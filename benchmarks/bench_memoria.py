@@ -0,0 +1,38 @@
+import argparse
+import gc
+import tracemalloc
+
+from sintetico import generar_movimientos, poblar_catalogo
+
+from almacenamiento import AlmacenamientoMemoria
+from controlador import GestorInventario
+
+
+def bytes_por_movimiento(columnar: bool, n_productos: int, n_movimientos: int) -> float:
+    gestor = GestorInventario(AlmacenamientoMemoria(columnar=columnar))
+    poblar_catalogo(gestor, n_productos)
+    filas = list(generar_movimientos(n_productos, n_movimientos))
+
+    # Solo se mide lo que retiene el historial, no las filas de entrada
+    gc.collect()
+    tracemalloc.start()
+    for fila in filas:
+        gestor.registrar_movimiento(**fila)
+    gc.collect()
+    retenido, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retenido / n_movimientos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria retenida por movimiento en el historial")
+    parser.add_argument("--productos", type=int, default=1_000)
+    parser.add_argument("--movimientos", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for nombre, columnar in (("objetos (__slots__)", False), ("columnar (array)", True)):
+        print(f"{nombre:22s} {bytes_por_movimiento(columnar, args.productos, args.movimientos):7.1f} bytes/mov")
+
+
+if __name__ == "__main__":
+    main()
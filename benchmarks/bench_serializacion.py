@@ -0,0 +1,42 @@
+import argparse
+import os
+import tempfile
+import time
+
+from sintetico import crear_gestor
+
+from controlador import GestorInventario
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    funcion(*args)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de guardado/carga del inventario completo")
+    parser.add_argument("--productos", type=int, default=100_000)
+    parser.add_argument("--movimientos", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"Generando {args.productos} productos y {args.movimientos} movimientos...")
+    gestor = crear_gestor(args.productos, args.movimientos)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "inventario.json")
+        t_guardar = medir(gestor.guardar_datos, archivo)
+        tamano = os.path.getsize(archivo)
+
+        cargado = GestorInventario()
+        t_cargar = medir(cargado.cargar_datos, archivo)
+
+    assert len(cargado.productos) == len(gestor.productos)
+    assert len(cargado.movimientos) == len(gestor.movimientos)
+
+    print(f"guardar_datos: {t_guardar:.2f} s ({tamano / 2 ** 20:.1f} MiB)")
+    print(f"cargar_datos:  {t_cargar:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+
+from sintetico import ALMACENES, N_RESPONSABLES, poblar_catalogo
+
+from controlador import GestorInventario
+from servidor import servir
+
+# Prueba de carga de la API HTTP: `conexiones` clientes keep-alive, cada uno con
+# hasta `profundidad` peticiones encadenadas, registran entradas (y, con
+# --lecturas, consultan stock) durante `duracion` segundos. Sin --puerto arranca
+# su propio servidor en otro proceso con un catálogo sintético.
+
+
+def _servidor_sintetico(productos: int, puerto: int, listo):
+    gestor = GestorInventario()
+    poblar_catalogo(gestor, productos)
+
+    def al_iniciar(servidor):
+        listo.set()
+
+    try:
+        asyncio.run(servir(gestor, "127.0.0.1", puerto, al_iniciar))
+    except KeyboardInterrupt:
+        pass
+
+
+def _peticion(metodo: str, ruta: str, cuerpo=None) -> bytes:
+    datos = b"" if cuerpo is None else json.dumps(cuerpo).encode()
+    return (f"{metodo} {ruta} HTTP/1.1\r\nHost: carga\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(datos)}\r\n\r\n").encode() + datos
+
+
+def _entrada(rnd: random.Random, productos: int) -> dict:
+    producto = rnd.randrange(productos)
+    return {'tipo': "Entrada", 'producto_id': f"SKU{producto:07d}", 'cantidad': rnd.randint(1, 5),
+            'responsable_id': f"BRESP{rnd.randrange(N_RESPONSABLES):03d}",
+            'almacen': ALMACENES[producto % len(ALMACENES)]}
+
+
+async def _leer_respuesta(lector: asyncio.StreamReader) -> int:
+    cabecera = await lector.readuntil(b"\r\n\r\n")
+    longitud = 0
+    for linea in cabecera.split(b"\r\n")[1:]:
+        if linea[:15].lower() == b"content-length:":
+            longitud = int(linea[15:])
+    await lector.readexactly(longitud)
+    return int(cabecera[9:12])
+
+
+async def _cliente(host: str, puerto: int, args, semilla: int, fin: float, medidas: dict):
+    rnd = random.Random(semilla)
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    # Como mucho `profundidad` peticiones sin respuesta; la latencia se mide
+    # desde que la petición sale, no desde que espera hueco
+    huecos = asyncio.Semaphore(args.profundidad)
+    enviadas = asyncio.Queue()  # (inicio, movimientos) en orden de envío
+
+    async def enviar():
+        while time.perf_counter() < fin:
+            if rnd.random() < args.lecturas:
+                producto = rnd.randrange(args.productos)
+                peticion, movimientos = _peticion("GET", f"/productos/SKU{producto:07d}/stock"), 0
+            elif args.lote > 1:
+                filas = [_entrada(rnd, args.productos) for _ in range(args.lote)]
+                peticion, movimientos = _peticion("POST", "/movimientos/lote", filas), args.lote
+            else:
+                peticion, movimientos = _peticion("POST", "/movimientos", _entrada(rnd, args.productos)), 1
+            if huecos.locked():
+                await escritor.drain()
+            await huecos.acquire()
+            enviadas.put_nowait((time.perf_counter(), movimientos))
+            escritor.write(peticion)
+        await escritor.drain()
+        enviadas.put_nowait(None)
+
+    async def recibir():
+        while True:
+            elemento = await enviadas.get()
+            if elemento is None:
+                return
+            inicio, movimientos = elemento
+            estado = await _leer_respuesta(lector)
+            huecos.release()
+            medidas['latencias'].append(time.perf_counter() - inicio)
+            if estado >= 400:
+                medidas['errores'] += 1
+            else:
+                medidas['movimientos'] += movimientos
+
+    await asyncio.gather(enviar(), recibir())
+    escritor.close()
+
+
+async def cargar(host: str, puerto: int, args) -> dict:
+    medidas = {'latencias': [], 'errores': 0, 'movimientos': 0}
+    inicio = time.perf_counter()
+    fin = inicio + args.duracion
+    await asyncio.gather(*(_cliente(host, puerto, args, n, fin, medidas)
+                           for n in range(args.conexiones)))
+    medidas['segundos'] = time.perf_counter() - inicio
+    return medidas
+
+
+def percentil(ordenados, p: float) -> float:
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga sostenida sobre la API HTTP del inventario")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, help="servidor ya en marcha (por defecto se arranca uno)")
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--profundidad", type=int, default=8, help="peticiones encadenadas por conexión")
+    parser.add_argument("--lote", type=int, default=1, help="movimientos por petición (>1 usa /movimientos/lote)")
+    parser.add_argument("--lecturas", type=float, default=0.0, help="fracción de consultas de stock")
+    parser.add_argument("--duracion", type=float, default=10.0)
+    args = parser.parse_args()
+
+    proceso = None
+    puerto = args.puerto
+    if puerto is None:
+        puerto = 8000 + random.randrange(1000)
+        contexto = multiprocessing.get_context("spawn")
+        listo = contexto.Event()
+        proceso = contexto.Process(target=_servidor_sintetico, args=(args.productos, puerto, listo))
+        proceso.start()
+        if not listo.wait(120):
+            proceso.terminate()
+            raise SystemExit("El servidor no arrancó")
+    try:
+        medidas = asyncio.run(cargar(args.host, puerto, args))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.join()
+
+    latencias = sorted(medidas['latencias'])
+    if not latencias:
+        raise SystemExit("No se completó ninguna petición")
+    segundos = medidas['segundos']
+    print(f"{args.conexiones} conexiones x {args.profundidad} en vuelo, lote {args.lote}, "
+          f"lecturas {args.lecturas:.0%}, {segundos:.1f} s")
+    print(f"{len(latencias) / segundos:12,.0f} peticiones/s  {medidas['movimientos'] / segundos:12,.0f} mov/s  "
+          f"errores {medidas['errores']}")
+    print("latencia ms  " + "  ".join(f"p{p:g} {percentil(latencias, p) * 1000:8.2f}"
+                                      for p in (50, 90, 99, 99.9))
+          + f"  max {latencias[-1] * 1000:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
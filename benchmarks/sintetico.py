@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlador import GestorInventario  # noqa: E402
+from modelo import Categoria, Proveedor, Responsable  # noqa: E402
+
+N_CATEGORIAS = 50
+N_PROVEEDORES = 200
+N_RESPONSABLES = 20
+ALMACENES = tuple(f"ALM{i:02d}" for i in range(10))
+
+
+def crear_gestor(n_productos: int, n_movimientos: int, semilla: int = 0) -> GestorInventario:
+    # Catálogo sintético reproducible; los movimientos pasan por el API público
+    gestor = GestorInventario()
+    poblar_catalogo(gestor, n_productos, semilla)
+    for movimiento in generar_movimientos(n_productos, n_movimientos, semilla):
+        gestor.registrar_movimiento(**movimiento)
+    return gestor
+
+
+def poblar_catalogo(gestor: GestorInventario, n_productos: int, semilla: int = 0):
+    rnd = random.Random(semilla)
+    gestor.categorias.extend(Categoria(f"BCAT{i:04d}", f"Categoría {i}") for i in range(N_CATEGORIAS))
+    gestor.proveedores.extend(Proveedor(f"BPROV{i:04d}", f"Proveedor {i}", f"p{i}@bench")
+                              for i in range(N_PROVEEDORES))
+    gestor.responsables.extend(Responsable(f"BRESP{i:03d}", f"Responsable {i}", "Operador")
+                               for i in range(N_RESPONSABLES))
+    for i in range(n_productos):
+        gestor.registrar_producto(f"SKU{i:07d}", f"Producto {i}",
+                                  f"BCAT{rnd.randrange(N_CATEGORIAS):04d}",
+                                  f"BPROV{rnd.randrange(N_PROVEEDORES):04d}",
+                                  rnd.randint(5, 50))
+
+
+def generar_movimientos(n_productos: int, n_movimientos: int, semilla: int = 0):
+    # Una entrada inicial por producto y después un ~60 % de salidas pequeñas,
+    # de modo que el stock nunca llega a ser insuficiente. Cada producto se
+    # mueve siempre en su propio almacén (el stock se valida por almacén).
+    rnd = random.Random(semilla + 1)
+    for i in range(n_movimientos):
+        producto = i if i < n_productos else rnd.randrange(n_productos)
+        if i < n_productos:
+            tipo, cantidad = "Entrada", 1000
+        else:
+            tipo = rnd.choices(("Entrada", "Salida", "Devolución"), (35, 60, 5))[0]
+            cantidad = rnd.randint(1, 5)
+        movimiento = {
+            'tipo': tipo,
+            'producto_id': f"SKU{producto:07d}",
+            'cantidad': cantidad,
+            'responsable_id': f"BRESP{rnd.randrange(N_RESPONSABLES):03d}",
+            'almacen': ALMACENES[producto % len(ALMACENES)]
+        }
+        if tipo == "Devolución":
+            movimiento['motivo'] = "Defecto"
+        yield movimiento
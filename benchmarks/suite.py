@@ -0,0 +1,270 @@
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sintetico import generar_movimientos, poblar_catalogo
+
+from controlador import GestorInventario
+
+# Suite reproducible de los caminos calientes del controlador. Para cada caso
+# mide ops/s y latencias p50/p99 (la mejor de varias pasadas, sin trazas y con
+# el GC desactivado, como timeit) y el pico de memoria adicional con
+# tracemalloc (pasada aparte, porque trazar distorsiona los tiempos).
+#
+#   python benchmarks/suite.py --escala 100k --salida resultados.json
+#   python benchmarks/suite.py --escala 10k --base benchmarks/base_10k.json
+#
+# Las bases dependen de la máquina: se regeneran con --guardar-base.
+
+ESCALAS = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+TIPOS_REPORTE = ("productos", "movimientos", "stock_minimo", "stock_por_almacen",
+                 "ventas_por_producto", "rotacion", "movimientos_por_almacen", "reabastecimiento")
+# El reporte de reabastecimiento necesita numpy, que es opcional
+if importlib.util.find_spec("numpy") is None:
+    TIPOS_REPORTE = tuple(tipo for tipo in TIPOS_REPORTE if tipo != "reabastecimiento")
+TAMANO_PAGINA = 50
+MIN_OPS_P99 = 100
+
+
+class Contexto:
+    # Inventario sintético a escala: `movimientos` movimientos sobre
+    # movimientos / 10 productos (mínimo 100)
+    def __init__(self, n_movimientos: int, semilla: int):
+        self.n_movimientos = n_movimientos
+        self.n_productos = max(100, n_movimientos // 10)
+        self.semilla = semilla
+        self.gestor = GestorInventario()
+        poblar_catalogo(self.gestor, self.n_productos, semilla)
+        self.gestor.registrar_movimientos_lote(generar_movimientos(self.n_productos, n_movimientos, semilla))
+        self.rnd = random.Random(semilla)
+        self.directorio = tempfile.mkdtemp(prefix="suite_inventario_")
+        self.altas = 0
+
+    def producto_al_azar(self) -> str:
+        return f"SKU{self.rnd.randrange(self.n_productos):07d}"
+
+
+# Cada caso recibe el contexto y el número de operaciones y devuelve una lista
+# de funciones sin argumentos, una por operación cronometrada.
+
+def caso_registrar_producto(ctx: Contexto, n: int):
+    def alta(_id):
+        return lambda: ctx.gestor.registrar_producto(_id, f"Nuevo {_id}", "BCAT0000", "BPROV0000", 10)
+    inicio, ctx.altas = ctx.altas, ctx.altas + n
+    return [alta(f"NUEVO{i:08d}") for i in range(inicio, inicio + n)]
+
+
+def caso_registrar_movimiento(ctx: Contexto, n: int):
+    # Entradas: nunca fallan por stock y mantienen válido el inventario
+    def movimiento(producto_id):
+        return lambda: ctx.gestor.registrar_movimiento("Entrada", producto_id, 1, "BRESP000", "ALM00")
+    return [movimiento(ctx.producto_al_azar()) for _ in range(n)]
+
+
+def caso_buscar_producto(ctx: Contexto, n: int):
+    buscar = ctx.gestor.buscar_producto
+    return [(lambda _id=ctx.producto_al_azar(): buscar(_id)) for _ in range(n)]
+
+
+def caso_autocompletar(ctx: Contexto, n: int):
+    # Lo que pide un campo de búsqueda al escribir: prefijos del id, palabras
+    # del nombre y fragmentos sueltos (que resuelven los trigramas)
+    buscar = ctx.gestor.buscar
+
+    def consulta():
+        _id = ctx.producto_al_azar()
+        numero = str(int(_id[3:]))
+        return ctx.rnd.choice((_id[:ctx.rnd.randint(4, len(_id))], f"producto {numero}",
+                               f"{_id[5:]}", numero[:3]))
+    return [(lambda texto=consulta(): buscar("productos", texto, 20)) for _ in range(n)]
+
+
+def caso_validar_stock(ctx: Contexto, n: int):
+    validar = ctx.gestor.validar_stock
+    return [(lambda _id=ctx.producto_al_azar(): validar(_id)) for _ in range(n)]
+
+
+def caso_reporte_pagina(tipo: str):
+    # Páginas al azar del reporte en orden natural (lo que pide la tabla virtual)
+    def caso(ctx: Contexto, n: int):
+        gestor = ctx.gestor
+        total = max(gestor.contar_reporte(tipo) - TAMANO_PAGINA, 1)
+        return [(lambda o=ctx.rnd.randrange(total): gestor.generar_reporte(tipo, o, TAMANO_PAGINA))
+                for _ in range(n)]
+    return caso
+
+
+def caso_reporte_completo(tipo: str):
+    def caso(ctx: Contexto, n: int):
+        return [lambda: ctx.gestor.generar_reporte(tipo) for _ in range(min(n, 3))]
+    return caso
+
+
+def caso_guardar_datos(ctx: Contexto, n: int):
+    ruta = os.path.join(ctx.directorio, "datos.json")
+    return [lambda: ctx.gestor.guardar_datos(ruta) for _ in range(min(n, 3))]
+
+
+def caso_cargar_datos(ctx: Contexto, n: int):
+    ruta = os.path.join(ctx.directorio, "datos.json")
+    if not os.path.exists(ruta):
+        ctx.gestor.guardar_datos(ruta)
+    return [lambda: GestorInventario().cargar_datos(ruta) for _ in range(min(n, 3))]
+
+
+CASOS = {
+    "registrar_producto": caso_registrar_producto,
+    "registrar_movimiento": caso_registrar_movimiento,
+    "buscar_producto": caso_buscar_producto,
+    "validar_stock": caso_validar_stock,
+    "buscar[productos]": caso_autocompletar,
+    **{f"generar_reporte[{tipo}]": caso_reporte_pagina(tipo) for tipo in TIPOS_REPORTE},
+    # El reporte completo de movimientos crece con el historial: solo catálogo
+    **{f"generar_reporte[{tipo}] completo": caso_reporte_completo(tipo)
+       for tipo in TIPOS_REPORTE if tipo != "movimientos"},
+    "guardar_datos": caso_guardar_datos,
+    "cargar_datos": caso_cargar_datos,
+}
+
+
+def percentil(ordenados, p: float) -> float:
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def cronometrar(operaciones) -> list:
+    latencias = []
+    gc.collect()
+    gc.disable()
+    try:
+        reloj = time.perf_counter_ns
+        for operacion in operaciones:
+            inicio = reloj()
+            operacion()
+            latencias.append(reloj() - inicio)
+    finally:
+        gc.enable()
+    return sorted(latencias)
+
+
+def medir(caso, ctx: Contexto, n: int, n_memoria: int, repeticiones: int) -> dict:
+    # Se queda con la pasada más rápida: el ruido de la máquina solo suma tiempo
+    latencias = min((cronometrar(caso(ctx, n)) for _ in range(repeticiones)), key=sum)
+    total = sum(latencias)
+
+    operaciones = caso(ctx, n_memoria)
+    gc.collect()
+    tracemalloc.start()
+    for operacion in operaciones:
+        operacion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops": len(latencias),
+        "ops_s": len(latencias) / (total / 1e9) if total else 0.0,
+        "p50_us": percentil(latencias, 0.50) / 1e3,
+        "p99_us": percentil(latencias, 0.99) / 1e3,
+        "pico_memoria_kib": pico / 1024,
+    }
+
+
+def comparar(resultados: dict, base: dict, tolerancia: float) -> list:
+    # Regresión: menos ops/s, más p99 o más memoria que la base, más allá de la
+    # tolerancia. Con pocas operaciones el p99 es solo la peor muestra: no cuenta
+    regresiones = []
+    print(f"\n{'caso':50s} {'ops/s':>12s} {'base':>12s} {'Δ':>8s}  {'p99 µs':>10s} {'base':>10s}")
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            print(f"{nombre:50s} {actual['ops_s']:12.1f} {'(nuevo)':>12s}")
+            continue
+        delta = actual["ops_s"] / anterior["ops_s"] - 1 if anterior["ops_s"] else 0.0
+        problemas = []
+        if delta < -tolerancia:
+            problemas.append("ops/s")
+        if actual["ops"] >= MIN_OPS_P99 and actual["p99_us"] > anterior["p99_us"] * (1 + tolerancia):
+            problemas.append("p99")
+        if actual["pico_memoria_kib"] > anterior["pico_memoria_kib"] * (1 + tolerancia) + 64:
+            problemas.append("memoria")
+        marca = f"  REGRESIÓN ({', '.join(problemas)})" if problemas else ""
+        print(f"{nombre:50s} {actual['ops_s']:12.1f} {anterior['ops_s']:12.1f} {delta:+8.1%}  "
+              f"{actual['p99_us']:10.1f} {anterior['p99_us']:10.1f}{marca}")
+        if problemas:
+            regresiones.append((nombre, problemas))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de rendimiento del GestorInventario")
+    parser.add_argument("--escala", choices=ESCALAS, default="10k",
+                        help="número de movimientos del inventario de partida")
+    parser.add_argument("--operaciones", type=int, default=5_000, help="operaciones cronometradas por caso")
+    parser.add_argument("--repeticiones", type=int, default=3, help="pasadas cronometradas por caso")
+    parser.add_argument("--operaciones-memoria", type=int, default=500,
+                        help="operaciones de la pasada con tracemalloc")
+    parser.add_argument("--casos", nargs="+", choices=CASOS, help="solo estos casos")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, salida estándar)")
+    parser.add_argument("--base", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--guardar-base", metavar="RUTA", help="guardar los resultados como nueva base")
+    parser.add_argument("--tolerancia", type=float, default=0.20)
+    args = parser.parse_args()
+
+    print(f"Generando inventario de {args.escala} movimientos...", file=sys.stderr)
+    ctx = Contexto(ESCALAS[args.escala], args.semilla)
+    resultados = {}
+    for nombre in args.casos or CASOS:
+        resultados[nombre] = medir(CASOS[nombre], ctx, args.operaciones, args.operaciones_memoria,
+                                   args.repeticiones)
+        r = resultados[nombre]
+        print(f"{nombre:50s} {r['ops_s']:12.1f} ops/s  p50 {r['p50_us']:9.1f} µs  "
+              f"p99 {r['p99_us']:9.1f} µs  pico {r['pico_memoria_kib']:9.1f} KiB", file=sys.stderr)
+
+    informe = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "escala": args.escala,
+            "productos": ctx.n_productos,
+            "movimientos": ctx.n_movimientos,
+            "operaciones": args.operaciones,
+            "repeticiones": args.repeticiones,
+            "semilla": args.semilla,
+        },
+        "resultados": resultados,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+    if args.guardar_base:
+        with open(args.guardar_base, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        if base["meta"]["escala"] != args.escala:
+            print(f"Aviso: la base es de escala {base['meta']['escala']}", file=sys.stderr)
+        regresiones = comparar(resultados, base["resultados"], args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones frente a {args.base}")
+            return 1
+        print(f"\nSin regresiones frente a {args.base}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
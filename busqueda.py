@@ -0,0 +1,183 @@
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+
+def normalizar(texto: str) -> str:
+    # Minúsculas y sin tildes: "Camión" y "camion" se encuentran igual
+    texto = texto.casefold()
+    if texto.isascii():
+        return texto
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def trigramas(texto: str) -> set:
+    # Con un espacio a cada lado: los comienzos y finales de palabra también cuentan
+    texto = f" {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBusqueda:
+    # Búsqueda por id y nombre para los campos con autocompletado. Dos listas
+    # ordenadas (ids y palabras del nombre, normalizados) resuelven los
+    # prefijos con búsqueda binaria, y un índice de trigramas los parecidos
+    # (errores de tecleo, fragmentos del medio). Las altas solo se encolan:
+    # se indexan en bloque en la siguiente búsqueda (los trigramas, en la
+    # primera que los necesite), así cargar un catálogo grande no paga el
+    # índice hasta que alguien busca.
+    LOTE_ORDENAR = 32           # a partir de aquí, ordenar todo en vez de insertar uno a uno
+    SIMILITUD_MINIMA = 0.5      # fracción de trigramas de la consulta presentes
+    MAX_CANDIDATOS = 1000       # documentos puntuados como mucho por consulta parecida
+    MAX_RECORRIDO_PREFIJO = 10_000
+
+    def __init__(self):
+        # (id, id normalizado, nombre normalizado); None si se dio de baja
+        self._documentos: List[Optional[Tuple[str, str, str]]] = []
+        self._numeros: Dict[str, int] = {}
+        self._ids: List[Tuple[str, int]] = []
+        self._palabras: List[Tuple[str, int]] = []
+        self._trigramas: Dict[str, array] = {}
+        self._sin_indexar: List[int] = []
+        self._sin_trigramas: List[int] = []
+        # Las búsquedas corren con el cerrojo compartido del gestor e indexan lo
+        # pendiente: este cerrojo evita que dos lo hagan a la vez
+        self._cerrojo = threading.Lock()
+
+    def agregar(self, _id: str, nombre: str):
+        with self._cerrojo:
+            numero = len(self._documentos)
+            self._documentos.append((_id, normalizar(_id), normalizar(nombre)))
+            self._numeros[_id] = numero
+            self._sin_indexar.append(numero)
+
+    def eliminar(self, _id: str):
+        with self._cerrojo:
+            numero = self._numeros.pop(_id, None)
+            if numero is None:
+                return
+            self._indexar_pendientes()
+            _, id_normalizado, nombre = self._documentos[numero]
+            for lista, clave in [(self._ids, id_normalizado)] + [(self._palabras, p)
+                                                                 for p in set(nombre.split())]:
+                posicion = bisect_left(lista, (clave, numero))
+                if posicion < len(lista) and lista[posicion] == (clave, numero):
+                    del lista[posicion]
+            # En los trigramas queda como hueco (None); se ignora al buscar
+            self._documentos[numero] = None
+
+    def limpiar(self):
+        with self._cerrojo:
+            self._documentos.clear()
+            self._numeros.clear()
+            self._ids.clear()
+            self._palabras.clear()
+            self._trigramas.clear()
+            self._sin_indexar.clear()
+            self._sin_trigramas.clear()
+
+    def __len__(self) -> int:
+        return len(self._numeros)
+
+    def _indexar_pendientes(self):
+        if not self._sin_indexar:
+            return
+        nuevos_ids = []
+        nuevas_palabras = []
+        for numero in self._sin_indexar:
+            _, id_normalizado, nombre = self._documentos[numero]
+            nuevos_ids.append((id_normalizado, numero))
+            nuevas_palabras.extend((palabra, numero) for palabra in set(nombre.split()))
+        for lista, nuevas in ((self._ids, nuevos_ids), (self._palabras, nuevas_palabras)):
+            if len(nuevas) < self.LOTE_ORDENAR:
+                for entrada in nuevas:
+                    insort(lista, entrada)
+            else:
+                lista.extend(nuevas)
+                lista.sort()
+        self._sin_trigramas.extend(self._sin_indexar)
+        self._sin_indexar.clear()
+
+    def _indexar_trigramas(self):
+        # Números de documento crecientes: cada lista queda ordenada para bisect
+        for numero in self._sin_trigramas:
+            documento = self._documentos[numero]
+            if documento is None:
+                continue
+            for trigrama in trigramas(documento[1]) | trigramas(documento[2]):
+                lista = self._trigramas.get(trigrama)
+                if lista is None:
+                    lista = self._trigramas[trigrama] = array('i')
+                lista.append(numero)
+        self._sin_trigramas.clear()
+
+    def buscar(self, texto: str, limite: int = 10) -> List[str]:
+        # Ids de las `limite` mejores coincidencias: id exacto, prefijo del id y
+        # palabras del nombre que empiezan por las de la consulta; si nada
+        # empieza así, los más parecidos por trigramas
+        consulta = normalizar(texto).strip()
+        with self._cerrojo:
+            self._indexar_pendientes()
+            if not consulta:
+                return [self._documentos[numero][0] for _, numero in self._ids[:limite]]
+            encontrados: Dict[int, None] = {}
+            for numero in self._por_prefijo(self._ids, consulta, limite):
+                encontrados[numero] = None
+            # Se recorre la palabra de la consulta con menos coincidencias y
+            # se comprueban las demás en cada candidato
+            palabras = sorted(consulta.split(), key=self._contar_prefijo)
+            if len(encontrados) < limite:
+                for numero in self._por_prefijo(self._palabras, palabras[0], None):
+                    if numero not in encontrados and self._contiene_palabras(numero, palabras[1:]):
+                        encontrados[numero] = None
+                        if len(encontrados) >= limite:
+                            break
+            if not encontrados and len(consulta) >= 3:
+                return [self._documentos[numero][0] for numero in self._parecidos(consulta, limite)]
+            return [self._documentos[numero][0] for numero in list(encontrados)[:limite]]
+
+    def _por_prefijo(self, lista: List[Tuple[str, int]], prefijo: str, limite: Optional[int]):
+        # En orden alfabético; el id exacto, si existe, es el primero
+        inicio = bisect_left(lista, (prefijo, -1))
+        fin = min(len(lista), inicio + (limite or self.MAX_RECORRIDO_PREFIJO))
+        for posicion in range(inicio, fin):
+            clave, numero = lista[posicion]
+            if not clave.startswith(prefijo):
+                return
+            yield numero
+
+    def _contar_prefijo(self, prefijo: str) -> int:
+        return (bisect_left(self._palabras, (prefijo + "\uffff",))
+                - bisect_left(self._palabras, (prefijo,)))
+
+    def _contiene_palabras(self, numero: int, palabras: List[str]) -> bool:
+        nombre = self._documentos[numero][2].split()
+        return all(any(p.startswith(palabra) for p in nombre) for palabra in palabras)
+
+    def _parecidos(self, consulta: str, limite: int) -> List[int]:
+        self._indexar_trigramas()
+        buscados = trigramas(consulta)
+        minimo = max(1, int(len(buscados) * self.SIMILITUD_MINIMA + 0.999))
+        # Los candidatos salen de las listas más cortas (trigramas poco
+        # frecuentes, los que distinguen) hasta MAX_CANDIDATOS; en las demás
+        # solo se comprueba si contienen a cada candidato
+        listas = sorted((self._trigramas.get(t, array('i')) for t in buscados), key=len)
+        cuentas = Counter(islice(listas[0], self.MAX_CANDIDATOS))
+        usadas = 1
+        for lista in listas[1:]:
+            if len(cuentas) + len(lista) > self.MAX_CANDIDATOS:
+                break
+            cuentas.update(lista)
+            usadas += 1
+        for lista in listas[usadas:]:
+            for numero in cuentas:
+                posicion = bisect_left(lista, numero)
+                if posicion < len(lista) and lista[posicion] == numero:
+                    cuentas[numero] += 1
+        puntuados = sorted((-comunes, self._documentos[numero][1], numero)
+                           for numero, comunes in cuentas.items()
+                           if comunes >= minimo and self._documentos[numero] is not None)
+        return [numero for _, _, numero in puntuados[:limite]]
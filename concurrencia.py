@@ -0,0 +1,139 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+
+class CerrojoLecturaEscritura:
+    # Varios lectores a la vez o un único escritor. Da preferencia a los
+    # escritores en espera para que no queden bloqueados por lecturas continuas.
+    # Es reentrante por hilo: un método público puede llamar a otro del gestor.
+    def __init__(self):
+        self._condicion = threading.Condition(threading.Lock())
+        self._lectores = 0
+        self._escritor = None
+        self._escritores_esperando = 0
+        self._local = threading.local()
+
+    def _niveles(self):
+        if not hasattr(self._local, 'lecturas'):
+            self._local.lecturas = 0
+            self._local.escrituras = 0
+        return self._local
+
+    def adquirir_lectura(self):
+        niveles = self._niveles()
+        if niveles.escrituras or niveles.lecturas:
+            niveles.lecturas += 1
+            return
+        with self._condicion:
+            while self._escritor is not None or self._escritores_esperando:
+                self._condicion.wait()
+            self._lectores += 1
+        niveles.lecturas = 1
+
+    def liberar_lectura(self):
+        niveles = self._niveles()
+        niveles.lecturas -= 1
+        if niveles.lecturas or niveles.escrituras:
+            return
+        with self._condicion:
+            self._lectores -= 1
+            if not self._lectores:
+                self._condicion.notify_all()
+
+    def adquirir_escritura(self):
+        niveles = self._niveles()
+        if niveles.escrituras:
+            niveles.escrituras += 1
+            return
+        if niveles.lecturas:
+            raise RuntimeError("No se puede pasar de lectura a escritura sin liberar el cerrojo")
+        with self._condicion:
+            self._escritores_esperando += 1
+            while self._escritor is not None or self._lectores:
+                self._condicion.wait()
+            self._escritores_esperando -= 1
+            self._escritor = threading.get_ident()
+        niveles.escrituras = 1
+
+    def liberar_escritura(self):
+        niveles = self._niveles()
+        niveles.escrituras -= 1
+        if niveles.escrituras:
+            return
+        with self._condicion:
+            self._escritor = None
+            self._condicion.notify_all()
+
+    @contextmanager
+    def compartido(self):
+        self.adquirir_lectura()
+        try:
+            yield
+        finally:
+            self.liberar_lectura()
+
+    @contextmanager
+    def exclusivo(self):
+        self.adquirir_escritura()
+        try:
+            yield
+        finally:
+            self.liberar_escritura()
+
+
+class CerrojosPorProducto:
+    # Cerrojos por franjas (lock striping): cada producto se asigna a uno de
+    # `franjas` cerrojos, así que productos distintos casi nunca compiten
+    def __init__(self, franjas: int = 64):
+        self._cerrojos = [threading.Lock() for _ in range(franjas)]
+
+    def para(self, producto_id: str) -> threading.Lock:
+        return self._cerrojos[hash(producto_id) % len(self._cerrojos)]
+
+
+class ContadorAtomico:
+    # Generador monótono de números consecutivos, seguro entre hilos
+    def __init__(self, ultimo: int = 0):
+        self._ultimo = ultimo
+        self._cerrojo = threading.Lock()
+
+    def siguiente(self) -> int:
+        with self._cerrojo:
+            self._ultimo += 1
+            return self._ultimo
+
+    def reservar(self, cantidad: int) -> int:
+        # Reserva un bloque consecutivo y devuelve su primer número
+        with self._cerrojo:
+            primero = self._ultimo + 1
+            self._ultimo += cantidad
+            return primero
+
+    def reiniciar(self, ultimo: int):
+        with self._cerrojo:
+            self._ultimo = ultimo
+
+
+def lectura(metodo):
+    # Ejecuta el método con el cerrojo compartido del gestor (self._cerrojo)
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        self._cerrojo.adquirir_lectura()
+        try:
+            return metodo(self, *args, **kwargs)
+        finally:
+            self._cerrojo.liberar_lectura()
+    return envoltura
+
+
+def escritura(metodo):
+    # Ejecuta el método con el cerrojo exclusivo del gestor (self._cerrojo)
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        self._cerrojo.adquirir_escritura()
+        try:
+            return metodo(self, *args, **kwargs)
+        finally:
+            self._cerrojo.liberar_escritura()
+    return envoltura
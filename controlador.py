@@ -1,104 +1,562 @@
 import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from agregacion import Agregado, MotorAgregacion
+from almacenamiento import COLECCIONES, Almacenamiento, AlmacenamientoMemoria
+from concurrencia import (CerrojoLecturaEscritura, CerrojosPorProducto, ContadorAtomico,
+                          escritura, lectura)
+from exportacion import exportar
+from importacion import ResultadoLote, leer_entero, leer_fila, leer_movimientos
+from metricas import Metricas, desinstrumentar, instrumentar
 from modelo import *
-from typing import List
+from persistencia import DiarioMovimientos, escribir_instantanea, leer_instantanea
+from registro import IndiceStockBajo, LibroStock, Registro
+from reportes import REPORTES_AGREGADOS, ConsultasPaginadas, paginar
+from typing import Dict, Iterator, List, Sequence
+
+CLASES_ENTIDAD = {
+    'categorias': Categoria,
+    'proveedores': Proveedor,
+    'responsables': Responsable,
+    'productos': Producto
+}
+
+# Almacén al que se asigna el stock inicial de un producto (o el que no
+# explican los movimientos de datos anteriores al libro de stock)
+ALMACEN_GENERAL = "General"
 
 
 class GestorInventario:
-    def __init__(self):
-        self.productos: List[Producto] = []
-        self.movimientos: List[Movimiento] = []
-        self.categorias: List[Categoria] = []
-        self.proveedores: List[Proveedor] = []
-        self.responsables: List[Responsable] = []
-        self.cargar_datos_ejemplo()
+    def __init__(self, almacenamiento: Almacenamiento = None, datos_ejemplo: bool = False,
+                 metricas: bool = False):
+        self.almacenamiento = almacenamiento or AlmacenamientoMemoria()
+        # Lecturas (búsquedas, reportes, guardado) concurrentes; escrituras exclusivas
+        self._cerrojo = CerrojoLecturaEscritura()
+        # Registrar movimientos solo necesita el cerrojo compartido: el stock se
+        # protege por producto y el alta en el historial es una sección breve
+        self._cerrojos_producto = CerrojosPorProducto()
+        self._cerrojo_historial = threading.Lock()
+        self._ids_movimiento = ContadorAtomico()
+        # Con índice de búsqueda para los campos con autocompletado de la vista
+        self.productos = Registro({
+            'categoria': lambda p: p.categoria.id,
+            'proveedor': lambda p: p.proveedor.id
+        }, buscable=True)
+        self.categorias = Registro(buscable=True)
+        self.proveedores = Registro(buscable=True)
+        self.responsables = Registro(buscable=True)
+        self.stock_bajo = IndiceStockBajo()
+        self.libro_stock = LibroStock()
+        self._diario = None
+        self._ruta_instantanea = None
+        self._secuencia = 0
+        self._diario_hasta = 0
+        self._compactar_cada = None
+        self._cambios = 0
+        self._consultas = ConsultasPaginadas()
+        # Reportes agregados del historial en varios procesos
+        self._agregador = MotorAgregacion()
+        # Analítica de demanda (numpy): se crea con el primer reporte de
+        # reabastecimiento y después la alimentan los movimientos nuevos
+        self._analitica = None
+        self._cerrojo_analitica = threading.Lock()
+        # Instrumentación opcional: sin activar, los métodos no llevan envoltura
+        self._metricas = Metricas()
+        self._instrumentado = False
+        if metricas:
+            self.activar_metricas()
+        self.almacenamiento.vincular(self.indices())
+        self._cargar_desde_almacenamiento()
+        # Los datos de ejemplo son opcionales (la interfaz los pide; scripts y cron no)
+        if datos_ejemplo and not self.productos and not self.categorias:
+            self.cargar_datos_ejemplo()
+
+    @property
+    def movimientos(self) -> Sequence[Movimiento]:
+        return self.almacenamiento.movimientos
 
     def cargar_datos_ejemplo(self):
         cat1 = Categoria("CAT001", "Electrónicos")
         cat2 = Categoria("CAT002", "Ropa")
-        self.categorias.extend([cat1, cat2])
+        self._agregar_entidades('categorias', [cat1, cat2])
 
         prov1 = Proveedor("PROV001", "TecnoSum", "contacto@tecnosum.com")
         prov2 = Proveedor("PROV002", "Textiles S.A.", "ventas@textiles.com")
-        self.proveedores.extend([prov1, prov2])
+        self._agregar_entidades('proveedores', [prov1, prov2])
 
         resp1 = Responsable("RESP001", "Christofer Amador", "Administrador")
         resp2 = Responsable("RESP002", "David Lara", "Supervisor")
-        self.responsables.extend([resp1, resp2])
+        self._agregar_entidades('responsables', [resp1, resp2])
 
         prod1 = Producto("PROD001", "Laptop", cat1, prov1, 5, 10)
         prod2 = Producto("PROD002", "Camiseta", cat2, prov2, 20, 50)
-        self.productos.extend([prod1, prod2])
+        self._agregar_entidades('productos', [prod1, prod2])
 
+    def _agregar_entidades(self, coleccion: str, entidades: List, persistir: bool = True):
+        registro = getattr(self, coleccion)
+        self._cambios += 1
+        for entidad in entidades:
+            registro.agregar(entidad)
+            if coleccion == 'productos':
+                self.stock_bajo.vigilar(entidad)
+                self.libro_stock.vincular(entidad, ALMACEN_GENERAL)
+        if persistir:
+            self.almacenamiento.guardar_entidades(coleccion, entidades)
+            if coleccion == 'productos':
+                self.almacenamiento.guardar_existencias(
+                    (p.id, almacen, cantidad) for p in entidades
+                    for almacen, cantidad in self.libro_stock.por_producto(p.id).items())
+
+    @escritura
     def registrar_producto(self, _id: str, nombre: str, categoria_id: str,
                            proveedor_id: str, stock_minimo: int) -> Producto:
-        categoria = next((c for c in self.categorias if c.id == categoria_id), None)
-        proveedor = next((p for p in self.proveedores if p.id == proveedor_id), None)
+        categoria = self.categorias.obtener(categoria_id)
+        proveedor = self.proveedores.obtener(proveedor_id)
 
         if not categoria or not proveedor:
             raise ValueError("Categoría o proveedor no encontrado")
+        if _id in self.productos:
+            raise ValueError("Ya existe un producto con ese ID")
 
         producto = Producto(_id, nombre, categoria, proveedor, stock_minimo)
-        self.productos.append(producto)
+        self._agregar_entidades('productos', [producto])
+        self._anotar('producto', producto.a_registro())
+        self._compactar_si_corresponde()
+        return producto
+
+    @escritura
+    def eliminar_producto(self, _id: str) -> Producto:
+        if _id not in self.productos:
+            raise ValueError("Producto no encontrado")
+        if self.almacenamiento.tiene_movimientos(_id):
+            raise ValueError("No se puede eliminar un producto con movimientos registrados")
+        self.almacenamiento.eliminar_producto(_id)
+        producto = self.productos.eliminar(_id)
+        self.stock_bajo.dejar_de_vigilar(producto)
+        self.libro_stock.desvincular(producto)
+        self._cambios += 1
+        self._anotar('baja_producto', {'id': _id})
+        self._compactar_si_corresponde()
         return producto
 
+    @lectura
     def buscar_producto(self, _id: str) -> Producto:
-        return next((p for p in self.productos if p.id == id), None)
+        return self.productos.obtener(_id)
+
+    @lectura
+    def buscar(self, coleccion: str, texto: str, limite: int = 10) -> List:
+        # Las `limite` entidades que mejor coinciden con `texto` por id o nombre
+        # (prefijos primero, luego parecidos), sin recorrer la colección
+        if coleccion not in COLECCIONES:
+            raise ValueError("Colección no válida")
+        return getattr(self, coleccion).buscar(texto, limite)
+
+    @lectura
+    def productos_por_categoria(self, categoria_id: str) -> List[Producto]:
+        return self.productos.filtrar('categoria', categoria_id)
+
+    @lectura
+    def productos_por_proveedor(self, proveedor_id: str) -> List[Producto]:
+        return self.productos.filtrar('proveedor', proveedor_id)
 
     def registrar_movimiento(self, tipo: str, producto_id: str, cantidad: int,
                              responsable_id: str, almacen: str, motivo=None) -> str:
-        producto = self.buscar_producto(producto_id)
-        responsable = next((r for r in self.responsables if r.id == responsable_id), None)
+        with self._cerrojo.compartido():
+            producto = self.productos.obtener(producto_id)
+            responsable = self.responsables.obtener(responsable_id)
+
+            if not producto or not responsable:
+                raise ValueError("Producto o responsable no encontrado")
+
+            movimiento = self._crear_movimiento(tipo, None, producto, cantidad,
+                                                responsable, almacen, motivo)
+
+            # Comprobar y aplicar el stock es atómico por producto. La alerta de
+            # stock mínimo sale solo si el movimiento llega a registrarse.
+            avisos = []
+            with self._cerrojos_producto.para(producto_id), self.stock_bajo.retener_avisos(avisos):
+                resultado = self._ejecutar(movimiento)
+                # id, fecha y posición en el historial se asignan juntos, así el
+                # historial queda ordenado por id y por fecha
+                with self._cerrojo_historial:
+                    movimiento.id = self._id_movimiento(self._ids_movimiento.siguiente())
+                    movimiento.fecha = datetime.now()
+                    try:
+                        self.almacenamiento.agregar_movimientos([movimiento])
+                    except Exception:
+                        self._ids_movimiento.reiniciar(len(self.movimientos))
+                        movimiento.deshacer()
+                        raise
+                    if self._analitica is not None:
+                        self._analitica.anotar((movimiento,))
+                    self._anotar('movimiento', movimiento.a_registro())
+        # Ya sin cerrojos: un suscriptor puede registrar otros movimientos
+        self.stock_bajo.enviar_avisos(avisos)
+        self._compactar_si_corresponde()
+        return resultado
+
+    def _ejecutar(self, movimiento: Movimiento) -> str:
+        # Con métricas activas se mide también Movimiento.ejecutar, en las
+        # métricas de este gestor (no en la clase: otro gestor no lo vería)
+        if not self._instrumentado:
+            return movimiento.ejecutar()
+        with self._metricas.medir('Movimiento.ejecutar', movimiento.tipo):
+            return movimiento.ejecutar()
+
+    @staticmethod
+    def _id_movimiento(numero: int) -> str:
+        return f"MOV{numero:03d}"
+
+    def registrar_movimientos_lote(self, filas) -> ResultadoLote:
+        # Las alertas de stock mínimo se envían después de soltar el cerrojo
+        # exclusivo: un suscriptor puede registrar otros movimientos
+        avisos = []
+        resultado = self._registrar_lote(filas, avisos)
+        self.stock_bajo.enviar_avisos(avisos)
+        return resultado
+
+    @escritura
+    def _registrar_lote(self, filas, avisos: list) -> ResultadoLote:
+        # Todo o nada: primero se valida el lote completo simulando el stock neto
+        # de cada producto y almacén fila a fila, y solo si no hay errores se
+        # aplica y se persiste en una única escritura.
+        inicio = time.perf_counter()
+        productos = self.productos.por_id
+        responsables = self.responsables.por_id
+        stock_simulado = {}
+        movimientos = []
+        errores = []
+
+        for fila_n, fila in enumerate(filas, 1):
+            try:
+                fila = leer_fila(fila)
+                producto = productos.get(fila.get('producto_id'))
+                responsable = responsables.get(fila.get('responsable_id'))
+                if not producto or not responsable:
+                    raise ValueError("Producto o responsable no encontrado")
+                try:
+                    cantidad = leer_entero(fila.get('cantidad'))
+                except ValueError:
+                    raise ValueError("Cantidad no válida")
+
+                movimiento = self._crear_movimiento(
+                    fila.get('tipo'), None, producto,
+                    cantidad, responsable, fila.get('almacen') or "", fila.get('motivo'))
+
+                celda = (producto.id, movimiento.almacen)
+                stock = stock_simulado.get(celda)
+                if stock is None:
+                    stock = producto.existencias(movimiento.almacen)
+                stock += movimiento.cantidad_neta
+                if stock < 0:
+                    raise ValueError("Stock insuficiente")
+                stock_simulado[celda] = stock
+                movimientos.append(movimiento)
+            except (ValueError, TypeError, KeyError) as e:
+                # Cualquier fila mal formada se informa con su número; el
+                # resto del lote se sigue validando
+                errores.append((fila_n, str(e)))
 
-        if not producto or not responsable:
-            raise ValueError("Producto o responsable no encontrado")
+        if errores:
+            return ResultadoLote(0, errores, time.perf_counter() - inicio)
 
-        movimiento_id = f"MOV{len(self.movimientos) + 1:03d}"
+        # Con el cerrojo exclusivo nadie más reserva ids: el bloque es consecutivo
+        primero = self._ids_movimiento.reservar(len(movimientos))
+        for n, movimiento in enumerate(movimientos, primero):
+            movimiento.id = self._id_movimiento(n)
 
+        aplicados = []
+        # Las alertas de stock mínimo salen al confirmar el lote, no por cada
+        # fila aplicada (ni por las que se deshacen si falla)
+        with self.stock_bajo.retener_avisos(avisos):
+            try:
+                for movimiento in movimientos:
+                    self._ejecutar(movimiento)
+                    aplicados.append(movimiento)
+                self.almacenamiento.agregar_movimientos(movimientos)
+            except Exception:
+                # Deshacer el stock ya aplicado para no dejar el lote a medias
+                for movimiento in reversed(aplicados):
+                    movimiento.deshacer()
+                self._ids_movimiento.reiniciar(len(self.movimientos))
+                raise
+        if self._analitica is not None:
+            self._analitica.anotar(movimientos)
+        self._anotar_varios('movimiento', [m.a_registro() for m in movimientos])
+        self._compactar_si_corresponde()
+        return ResultadoLote(len(movimientos), [], time.perf_counter() - inicio)
+
+    def importar_movimientos(self, ruta: str) -> ResultadoLote:
+        return self.registrar_movimientos_lote(leer_movimientos(ruta))
+
+    @staticmethod
+    def _crear_movimiento(tipo: str, movimiento_id: str, producto: Producto, cantidad: int,
+                          responsable: Responsable, almacen: str, motivo=None) -> Movimiento:
+        # Validación común a todas las vías de alta (interfaz, lote, CLI, API)
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser positiva")
         if tipo == "Entrada":
-            movimiento = Entrada(movimiento_id, producto, cantidad, responsable, almacen)
+            return Entrada(movimiento_id, producto, cantidad, responsable, almacen)
         elif tipo == "Salida":
-            movimiento = Salida(movimiento_id, producto, cantidad, responsable, almacen)
+            return Salida(movimiento_id, producto, cantidad, responsable, almacen)
         elif tipo == "Devolución":
             if not motivo:
                 raise ValueError("Motivo requerido para devolución")
-            movimiento = Devolucion(movimiento_id, producto, cantidad, responsable, almacen, motivo)
+            return Devolucion(movimiento_id, producto, cantidad, responsable, almacen, motivo)
         else:
             raise ValueError("Tipo de movimiento no válido")
 
-        resultado = movimiento.ejecutar()
-        self.movimientos.append(movimiento)
-        return resultado
-
+    @lectura
     def validar_stock(self, producto_id: str) -> bool:
         producto = self.buscar_producto(producto_id)
         if not producto:
             raise ValueError("Producto no encontrado")
-        return producto.stock_actual >= producto.stock_minimo
+        return producto.id not in self.stock_bajo
+
+    def suscribir_alerta_stock(self, callback):
+        # callback(producto, bajo) se invoca solo al cruzar el stock mínimo
+        self.stock_bajo.suscribir(callback)
+
+    def desuscribir_alerta_stock(self, callback):
+        self.stock_bajo.desuscribir(callback)
+
+    @lectura
+    def stock_en_almacen(self, producto_id: str, almacen: str) -> int:
+        if producto_id not in self.productos:
+            raise ValueError("Producto no encontrado")
+        return self.libro_stock.existencias(producto_id, almacen)
+
+    @lectura
+    def stock_por_almacen(self, producto_id: str) -> Dict[str, int]:
+        if producto_id not in self.productos:
+            raise ValueError("Producto no encontrado")
+        return self.libro_stock.por_producto(producto_id)
+
+    @lectura
+    def total_almacen(self, almacen: str) -> int:
+        return self.libro_stock.total_almacen(almacen)
+
+    @lectura
+    def totales_por_almacen(self) -> Dict[str, int]:
+        return self.libro_stock.totales()
+
+    @lectura
+    def stock_en_fecha(self, producto_id: str, fecha: datetime) -> int:
+        # Stock actual menos lo movido después de `fecha`. Con el cerrojo del
+        # producto para no ver un movimiento a medio registrar.
+        producto = self.productos.obtener(producto_id)
+        if not producto:
+            raise ValueError("Producto no encontrado")
+        with self._cerrojos_producto.para(producto_id):
+            return producto.stock_actual - self.almacenamiento.neto_posterior(producto_id, fecha)
+
+    @lectura
+    def generar_reporte(self, tipo: str, offset: int = 0, limit: int = None, orden: str = None,
+                        descendente: bool = False, filtro: str = None,
+                        desde: datetime = None, hasta: datetime = None) -> List[dict]:
+        # Sin argumentos devuelve el reporte completo; con offset/limit, una página.
+        # El filtro, el orden y el rango de fechas (solo movimientos, ambos
+        # extremos incluidos) se aplican en el origen de datos, no en la vista.
+        if tipo == "movimientos":
+            filas = self.almacenamiento.consultar_movimientos(offset, limit, orden, descendente,
+                                                              filtro, desde, hasta)
+        else:
+            filas = paginar(self._consultar_resumen(tipo, orden, descendente, filtro, desde, hasta),
+                            offset, limit)
+        return [f.to_dict() for f in filas]
+
+    @lectura
+    def contar_reporte(self, tipo: str, filtro: str = None, desde: datetime = None,
+                       hasta: datetime = None) -> int:
+        if tipo == "movimientos":
+            return self.almacenamiento.contar_movimientos(filtro, desde, hasta)
+        return len(self._consultar_resumen(tipo, None, False, filtro, desde, hasta))
+
+    def iterar_reporte(self, tipo: str, orden: str = None, descendente: bool = False,
+                       filtro: str = None, desde: datetime = None,
+                       hasta: datetime = None) -> Iterator[dict]:
+        # Las mismas filas que generar_reporte, una a una. El cerrojo solo se toma
+        # para fijar el resultado: recorrerlo (p. ej. al exportar millones de
+        # movimientos) no bloquea a los escritores.
+        with self._cerrojo.compartido():
+            if tipo == "movimientos":
+                filas = self.almacenamiento.iterar_movimientos(orden, descendente, filtro, desde, hasta)
+            else:
+                filas = iter(self._consultar_resumen(tipo, orden, descendente, filtro, desde, hasta))
+        return (f.to_dict() for f in filas)
+
+    def exportar_reporte(self, tipo: str, ruta: str, orden: str = None, descendente: bool = False,
+                         filtro: str = None, desde: datetime = None, hasta: datetime = None,
+                         tarea=None, formato: str = None) -> int:
+        # CSV o JSONL (opcionalmente .gz) según la extensión de `ruta` o `formato`;
+        # "-" es la salida estándar. Con una Tarea del Ejecutor se informa del
+        # progreso y se puede cancelar.
+        filas = self.iterar_reporte(tipo, orden, descendente, filtro, desde, hasta)
+        if tipo == "movimientos":
+            # Solo las devoluciones tienen motivo; en CSV la columna debe estar
+            # desde la primera fila
+            filas = (dict(fila, motivo=fila.get('motivo')) for fila in filas)
+        if tarea is not None:
+            filas = tarea.seguir(filas)
+        return exportar(filas, ruta, formato)
+
+    @staticmethod
+    def _validar_sin_rango(desde, hasta):
+        if desde is not None or hasta is not None:
+            raise ValueError("El rango de fechas solo se aplica a los reportes del historial")
+
+    def _consultar_resumen(self, tipo: str, orden, descendente, filtro, desde, hasta) -> List:
+        # Reportes de catálogo y agregados del historial, filtrados y ordenados en memoria
+        if tipo in REPORTES_AGREGADOS:
+            elementos = lambda: self._filas_agregadas(tipo, desde, hasta)
+        else:
+            self._validar_sin_rango(desde, hasta)
+            elementos = self._elementos_catalogo(tipo)
+        # Cualquier alta, baja o movimiento (que cambia el stock) invalida la
+        # caché, y también el cambio de día: la previsión de reabastecimiento
+        # cuenta los días hasta hoy
+        version = (self._cambios, len(self.movimientos), date.today())
+        return self._consultas.resolver(tipo, elementos, version, orden, descendente, filtro,
+                                        rango=(desde, hasta))
 
-    def generar_reporte(self, tipo: str) -> List[dict]:
+    def _elementos_catalogo(self, tipo: str):
         if tipo == "productos":
-            return [p.to_dict() for p in self.productos]
-        elif tipo == "movimientos":
-            return [m.to_dict() for m in self.movimientos]
+            elementos = lambda: self.productos
         elif tipo == "stock_minimo":
-            return [p.to_dict() for p in self.productos if p.stock_actual < p.stock_minimo]
+            elementos = lambda: self.almacenamiento.productos_stock_bajo(self.stock_bajo)
+        elif tipo == "stock_por_almacen":
+            productos = self.productos.por_id
+            elementos = lambda: [Existencia(productos[producto_id], almacen, cantidad)
+                                 for producto_id, almacen, cantidad in self.libro_stock]
+        elif tipo == "reabastecimiento":
+            elementos = self._filas_reabastecimiento
         else:
             raise ValueError("Tipo de reporte no válido")
+        return elementos
 
+    def _filas_agregadas(self, tipo: str, desde: datetime, hasta: datetime) -> List:
+        productos = self.productos.por_id
+        if tipo == "movimientos_por_almacen":
+            agregado = self._agregar(('almacen',), desde, hasta)
+            return [MovimientosAlmacen(almacen, tipo_movimiento, movimientos, unidades)
+                    for (almacen,), por_tipo in agregado.totales.items()
+                    for tipo_movimiento, (movimientos, unidades, _) in por_tipo.items()]
+        agregado = self._agregar(('producto',), desde, hasta)
+        if tipo == "ventas_por_producto":
+            filas = []
+            for (producto_id,), por_tipo in agregado.totales.items():
+                salidas = por_tipo.get("Salida", (0, 0, 0))
+                devoluciones = por_tipo.get("Devolución", (0, 0, 0))
+                # Productos dados de baja: siguen en el historial, no en el catálogo
+                if producto_id in productos and (salidas[0] or devoluciones[0]):
+                    filas.append(VentasProducto(productos[producto_id], salidas[0], salidas[1],
+                                                devoluciones[1]))
+            return filas
+        # Rotación de todo el catálogo. El stock final es el de `hasta` (lo
+        # movido después se descuenta con otra agregación) y el inicial, el
+        # final menos lo movido en el periodo.
+        posterior = {}
+        if hasta is not None:
+            despues = self._agregar(('producto',), hasta + timedelta(microseconds=1), None)
+            posterior = {producto_id: sum(t[2] for t in por_tipo.values())
+                         for (producto_id,), por_tipo in despues.totales.items()}
+        inicio = desde or agregado.primera
+        fin = hasta or agregado.ultima
+        dias = max((fin - inicio) / timedelta(days=1), 1) if inicio and fin else 1
+        filas = []
+        for producto in self.productos:
+            por_tipo = agregado.totales.get((producto.id,), {})
+            stock_final = producto.stock_actual - posterior.get(producto.id, 0)
+            stock_inicial = stock_final - sum(t[2] for t in por_tipo.values())
+            filas.append(RotacionProducto(producto, por_tipo.get("Salida", (0, 0, 0))[1],
+                                          stock_inicial, stock_final, dias))
+        return filas
+
+    def _agregar(self, dimensiones, desde: datetime = None, hasta: datetime = None) -> Agregado:
+        tablas, fragmentos = self.almacenamiento.fragmentos_movimientos(
+            self._agregador.tamano_fragmento, desde, hasta)
+        return self._agregador.agregar(tablas, fragmentos, dimensiones)
+
+    @lectura
+    def totalizar_movimientos(self, por: Sequence[str], desde: datetime = None,
+                              hasta: datetime = None) -> List[dict]:
+        # Totales del historial (movimientos, unidades, neto) agrupados por
+        # cualquier combinación de producto, responsable, almacen, tipo, dia y mes
+        return list(self._agregar(por, desde, hasta).filas())
+
+    def _prevision(self):
+        # Previsión de demanda de todo el catálogo (productos y arrays numpy
+        # alineados). Con su propio cerrojo: dos lecturas concurrentes no deben
+        # construir ni actualizar la matriz a la vez.
+        with self._cerrojo_analitica:
+            if self._analitica is None:
+                self._crear_analitica()
+            return self._analitica.calcular(self.productos, (self._cambios, len(self.movimientos)))
+
+    def _crear_analitica(self):
+        try:
+            # Importación diferida: numpy solo se carga si se piden previsiones
+            from analitica import AnaliticaDemanda
+        except ImportError:
+            raise ValueError("El reporte de reabastecimiento necesita numpy")
+        analitica = AnaliticaDemanda()
+        desde = analitica.inicio_ventana()
+        # Desde aquí los movimientos nuevos llegan por anotar(); la carga se
+        # limita a los que ya había para no contarlos dos veces
+        with self._cerrojo_historial:
+            limite = self.almacenamiento.contar_movimientos(desde=desde)
+            self._analitica = analitica
+        try:
+            analitica.cargar(*self.almacenamiento.fragmentos_movimientos(
+                self._agregador.tamano_fragmento, desde), limite)
+        except Exception:
+            self._analitica = None
+            raise
+
+    def _filas_reabastecimiento(self) -> List[Reabastecimiento]:
+        productos, prevision = self._prevision()
+        columnas = [prevision[campo].tolist() for campo in Reabastecimiento._campos]
+        return [Reabastecimiento(producto, consumo, desviacion,
+                                 cobertura if consumo else None, punto, cantidad)
+                for producto, consumo, desviacion, cobertura, punto, cantidad
+                in zip(productos, *columnas)]
+
+    @escritura
+    def aplicar_stock_minimo_sugerido(self, productos_ids: Sequence[str] = None) -> int:
+        # Fija el stock mínimo de los productos (todos o los indicados) en su
+        # punto de pedido sugerido. Los que no tienen salidas recientes se
+        # dejan como están: sin demanda la sugerencia sería cero.
+        productos, prevision = self._prevision()
+        if productos_ids is not None:
+            pedidos = set(productos_ids)
+            for producto_id in pedidos:
+                if producto_id not in self.productos:
+                    raise ValueError(f"Producto no encontrado: {producto_id}")
+        cambiados = []
+        for producto, punto, con_demanda in zip(productos, prevision['punto_pedido'].tolist(),
+                                                prevision['con_demanda'].tolist()):
+            if productos_ids is not None and producto.id not in pedidos:
+                continue
+            if con_demanda and producto.stock_minimo != punto:
+                producto.ajustar_stock_minimo(punto)
+                cambiados.append(producto)
+        if cambiados:
+            self._cambios += 1
+            self.almacenamiento.guardar_entidades('productos', cambiados)
+            self._anotar_varios('stock_minimo', [{'id': p.id, 'stock_minimo': p.stock_minimo}
+                                                 for p in cambiados])
+            self._compactar_si_corresponde()
+        return len(cambiados)
+
+    @lectura
     def guardar_datos(self, archivo: str):
-        datos = {
-            'productos': [p.to_dict() for p in self.productos],
-            'movimientos': [m.to_dict() for m in self.movimientos],
-            'categorias': [c.to_dict() for c in self.categorias],
-            'proveedores': [p.to_dict() for p in self.proveedores],
-            'responsables': [r.to_dict() for r in self.responsables]
-        }
-        with open(archivo, 'w') as f:
-            json.dump(datos, f, indent=4, default=str)  # type: ignore[arg-type]
+        escribir_instantanea(archivo, self._instantanea())
 
+    @escritura
     def cargar_datos(self, archivo: str):
         try:
-            with open(archivo, 'r') as f:
+            with open(archivo, 'r', encoding='utf-8') as f:
                 datos = json.load(f)
                 self._cargar_desde_dict(datos)
         except FileNotFoundError:
@@ -106,24 +564,237 @@ class GestorInventario:
         except Exception as e:
             print(f"Error al cargar datos: {e}")
 
+    @escritura
+    def cargar_archivo(self, archivo: str):
+        # Como cargar_datos, pero cualquier error se propaga como ValueError en
+        # vez de imprimirse: quien después reescribe el archivo no debe
+        # hacerlo con una carga a medias
+        try:
+            datos = leer_instantanea(archivo)
+            if datos is not None:
+                self._cargar_desde_dict(datos)
+        except KeyError as e:
+            raise ValueError(f"Datos no válidos en {archivo}: falta {e}") from e
+        except (TypeError, AttributeError, ValueError) as e:
+            raise ValueError(f"Datos no válidos en {archivo}: {e}") from e
+        if datos is None:
+            raise ValueError(f"No existe el archivo de datos {archivo}")
+
+    def indices(self) -> dict:
+        return {
+            'productos': self.productos.por_id,
+            'categorias': self.categorias.por_id,
+            'proveedores': self.proveedores.por_id,
+            'responsables': self.responsables.por_id
+        }
+
+    def activar_metricas(self) -> Metricas:
+        # Envuelve los métodos públicos de este gestor; Movimiento.ejecutar se
+        # mide en _ejecutar
+        if not self._instrumentado:
+            instrumentar(self, METODOS_INSTRUMENTADOS, self._metricas,
+                         {'registrar_movimiento': _tipo_movimiento})
+            self._instrumentado = True
+        return self._metricas
+
+    def desactivar_metricas(self):
+        # Retira las envolturas; lo medido se conserva
+        if self._instrumentado:
+            desinstrumentar(self, METODOS_INSTRUMENTADOS)
+            self._instrumentado = False
+
+    @property
+    def metricas_activas(self) -> bool:
+        return self._instrumentado
+
+    def metricas(self) -> dict:
+        datos = self._metricas.instantanea()
+        datos['activas'] = self._instrumentado
+        return datos
+
+    def reiniciar_metricas(self):
+        self._metricas.reiniciar()
+
+    def volcar_metricas(self, ruta: str):
+        # Texto de Prometheus; escritura atómica
+        self._metricas.volcar_prometheus(ruta)
+
+    def perfilar(self, operaciones: int, ruta: str = None):
+        # Perfila con cProfile las próximas `operaciones` llamadas de primer
+        # nivel; el resumen queda en metricas()['perfil'] y, con ruta, el .prof
+        self.activar_metricas()
+        self._metricas.perfilar(operaciones, ruta)
+
+    def _limpiar_catalogo(self):
+        self._cambios += 1
+        for coleccion in COLECCIONES:
+            getattr(self, coleccion).limpiar()
+        self.stock_bajo.limpiar()
+        self.libro_stock.limpiar()
+        self._analitica = None
+
+    def _cargar_existencias(self, registros):
+        # Antes que los productos: al vincularlos solo se asigna a ALMACEN_GENERAL
+        # el stock que estas celdas no expliquen
+        for registro in registros:
+            self.libro_stock.mover(registro['producto'], registro['almacen'], registro['cantidad'])
+
+    def _cargar_desde_almacenamiento(self):
+        # Solo el catálogo: el historial lo sirve el propio almacenamiento
+        self._limpiar_catalogo()
+        self._cargar_existencias(self.almacenamiento.leer_existencias())
+        indices = self.indices()
+        for coleccion in COLECCIONES:
+            clase = CLASES_ENTIDAD[coleccion]
+            self._agregar_entidades(coleccion, [clase.desde_registro(r, indices)
+                                                for r in self.almacenamiento.leer_entidades(coleccion)],
+                                    persistir=False)
+        self._ids_movimiento.reiniciar(len(self.movimientos))
+
     def _cargar_desde_dict(self, datos: dict):
-        self.productos.clear()
-        self.movimientos.clear()
-        self.categorias.clear()
-        self.proveedores.clear()
-        self.responsables.clear()
-
-        # Cargar entidades básicas
-        self.categorias = [Categoria(c['id'], c['nombre']) for c in datos['categorias']]
-        self.proveedores = [Proveedor(p['id'], p['nombre'], p['contacto']) for p in datos['proveedores']]
-        self.responsables = [Responsable(r['id'], r['nombre'], r['rol']) for r in datos['responsables']]
-
-        # Cargar productos (requiere reconstruir relaciones)
-        for p in datos['productos']:
-            cat = next((c for c in self.categorias if c.id == p['categoria']['id']), None)
-            prov = next((pr for pr in self.proveedores if pr.id == p['proveedor']['id']), None)
-            if cat and prov:
-                self.productos.append(Producto(
-                    p['id'], p['nombre'], cat, prov,
-                    p['stock_minimo'], p['stock_actual']
-                ))
\ No newline at end of file
+        self._limpiar_catalogo()
+        self.almacenamiento.limpiar()
+        if 'existencias' in datos:
+            self._cargar_existencias(datos['existencias'])
+        else:
+            # Datos anteriores al libro de stock: las celdas se reconstruyen del historial
+            self._cargar_existencias(
+                {'producto': m['producto'], 'almacen': m['almacen'],
+                 'cantidad': TIPOS_MOVIMIENTO[m['tipo']].signo * m['cantidad']}
+                for m in datos.get('movimientos', []))
+
+        # Una sola pasada por colección: las referencias se resuelven con los mapas por id
+        indices = self.indices()
+        for coleccion in COLECCIONES:
+            clase = CLASES_ENTIDAD[coleccion]
+            self._agregar_entidades(coleccion, [clase.desde_registro(r, indices) for r in datos[coleccion]])
+
+        # El stock ya lo reflejan los productos: el historial no se re-ejecuta
+        desde_registro = Movimiento.desde_registro
+        self.almacenamiento.agregar_movimientos(
+            [desde_registro(m, indices) for m in datos.get('movimientos', [])])
+        self._ids_movimiento.reiniciar(len(self.movimientos))
+
+    # --- Diario de movimientos (write-ahead log) ---
+
+    @escritura
+    def abrir_diario(self, ruta_instantanea: str, ruta_diario: str, politica_fsync: str = "grupo",
+                     tamano_grupo: int = 100, intervalo_grupo: float = 1.0, compactar_cada=None):
+        if self.almacenamiento.persistente:
+            raise ValueError("El almacenamiento ya es persistente; el diario no es necesario")
+        self.cerrar_diario()
+        datos = leer_instantanea(ruta_instantanea)
+        if datos is not None:
+            self._cargar_desde_dict(datos)
+        self._diario_hasta = self._secuencia = datos.get('diario_hasta', 0) if datos else 0
+
+        for registro in DiarioMovimientos.leer(ruta_diario):
+            if registro['n'] <= self._secuencia:
+                continue  # ya incluido en la instantánea
+            self._reproducir(registro)
+            self._secuencia = registro['n']
+        self._ids_movimiento.reiniciar(len(self.movimientos))
+
+        self._ruta_instantanea = ruta_instantanea
+        self._compactar_cada = compactar_cada
+        self._diario = DiarioMovimientos(ruta_diario, politica_fsync, tamano_grupo, intervalo_grupo)
+        if datos is None:
+            self.compactar()
+
+    @escritura
+    def cerrar_diario(self):
+        if self._diario is not None:
+            self._diario.cerrar()
+            self._diario = None
+
+    @escritura
+    def compactar(self):
+        if self._diario is None:
+            raise ValueError("No hay un diario abierto")
+        self._diario.sincronizar()
+        escribir_instantanea(self._ruta_instantanea, self._instantanea())
+        self._diario_hasta = self._secuencia
+        self._diario.truncar()
+
+    def _instantanea(self) -> dict:
+        # Generadores: escribir_instantanea los vuelca por lotes (memoria acotada)
+        return {
+            'diario_hasta': self._secuencia,
+            'categorias': (c.a_registro() for c in self.categorias),
+            'proveedores': (p.a_registro() for p in self.proveedores),
+            'responsables': (r.a_registro() for r in self.responsables),
+            'productos': (p.a_registro() for p in self.productos),
+            'existencias': ({'producto': producto_id, 'almacen': almacen, 'cantidad': cantidad}
+                            for producto_id, almacen, cantidad in self.libro_stock),
+            'movimientos': (m.a_registro() for m in self.movimientos)
+        }
+
+    def _anotar(self, operacion: str, registro: dict):
+        self._anotar_varios(operacion, [registro])
+
+    def _anotar_varios(self, operacion: str, registros: List[dict]):
+        if self._diario is None:
+            return
+        lineas = []
+        for registro in registros:
+            self._secuencia += 1
+            lineas.append({'n': self._secuencia, 'op': operacion, **registro})
+        self._diario.anotar_varios(lineas)
+
+    def _debe_compactar(self) -> bool:
+        return (self._diario is not None and bool(self._compactar_cada)
+                and self._secuencia - self._diario_hasta >= self._compactar_cada)
+
+    def _compactar_si_corresponde(self):
+        # Fuera de cualquier cerrojo compartido: compactar necesita el exclusivo.
+        # Se vuelve a comprobar dentro por si otro hilo ya compactó.
+        if not self._debe_compactar():
+            return
+        with self._cerrojo.exclusivo():
+            if self._debe_compactar():
+                self.compactar()
+
+    def _reproducir(self, registro: dict):
+        operacion = registro['op']
+        if operacion == 'producto':
+            self._agregar_entidades('productos', [Producto.desde_registro(registro, self.indices())])
+        elif operacion == 'baja_producto':
+            producto = self.productos.eliminar(registro['id'])
+            if producto:
+                self.stock_bajo.dejar_de_vigilar(producto)
+                self.libro_stock.desvincular(producto)
+        elif operacion == 'movimiento':
+            movimiento = Movimiento.desde_registro(registro, self.indices())
+            self._ejecutar(movimiento)
+            self.almacenamiento.agregar_movimientos([movimiento])
+            if self._analitica is not None:
+                self._analitica.anotar((movimiento,))
+        elif operacion == 'stock_minimo':
+            producto = self.productos.obtener(registro['id'])
+            if producto:
+                producto.ajustar_stock_minimo(registro['stock_minimo'])
+                self._cambios += 1
+                self.almacenamiento.guardar_entidades('productos', [producto])
+
+    @escritura
+    def cerrar(self):
+        self.cerrar_diario()
+        self._agregador.cerrar()
+        self.almacenamiento.cerrar()
+
+
+def _tipo_movimiento(args, kwargs):
+    # Tipos desconocidos agrupados: la etiqueta no crece con entradas erróneas
+    tipo = kwargs.get('tipo', args[0] if args else None)
+    return tipo if tipo in TIPOS_MOVIMIENTO else "desconocido"
+
+
+# Métodos públicos que mide la instrumentación (todos salvo los de las propias
+# métricas y las suscripciones)
+METODOS_INSTRUMENTADOS = tuple(
+    nombre for nombre, valor in vars(GestorInventario).items()
+    if callable(valor) and not isinstance(valor, staticmethod) and not nombre.startswith('_')
+    and nombre not in ('activar_metricas', 'desactivar_metricas', 'metricas', 'reiniciar_metricas',
+                       'volcar_metricas', 'perfilar', 'suscribir_alerta_stock',
+                       'desuscribir_alerta_stock', 'indices')
+)
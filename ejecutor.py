@@ -0,0 +1,108 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Cancelado(Exception):
+    pass
+
+
+class Tarea:
+    # Operación en segundo plano. El trabajo puede consultar `cancelada` o
+    # recorrer sus datos con `seguir`, que informa del progreso y corta si se cancela.
+    def __init__(self, ejecutor, al_progreso=None):
+        self._ejecutor = ejecutor
+        self._al_progreso = al_progreso
+        self._cancelada = threading.Event()
+        self.future = None
+
+    @property
+    def cancelada(self) -> bool:
+        return self._cancelada.is_set()
+
+    def cancelar(self):
+        self._cancelada.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def informar(self, procesados: int, total: int = None):
+        if self._al_progreso is not None:
+            self._ejecutor._publicar(self._al_progreso, procesados, total)
+
+    def seguir(self, elementos, total: int = None, cada: int = 1000):
+        for n, elemento in enumerate(elementos, 1):
+            if n % cada == 0:
+                if self.cancelada:
+                    raise Cancelado()
+                self.informar(n, total)
+            yield elemento
+        if self.cancelada:
+            raise Cancelado()
+
+
+class Ejecutor:
+    # Capa entre la vista y el GestorInventario: las llamadas al controlador
+    # corren en un pool de hilos (el propio gestor protege su estado con un
+    # cerrojo de lectura/escritura) y los resultados, errores y avisos de
+    # progreso vuelven al hilo de Tk por una cola que se vacía con root.after.
+    def __init__(self, root, max_hilos: int = 4, intervalo_ms: int = 30):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="inventario")
+        self._cola = queue.Queue()
+        self._activo = True
+        # Con un objeto Metricas se mide lo que tarda cada callback en el hilo de Tk
+        self.metricas = None
+        self.root.after(self.intervalo_ms, self._despachar)
+
+    def enviar(self, funcion, *args, al_terminar=None, al_error=None, al_progreso=None,
+               con_tarea: bool = False, **kwargs) -> Tarea:
+        # con_tarea=True pasa la Tarea a `funcion` como argumento `tarea`
+        tarea = Tarea(self, al_progreso)
+        if con_tarea:
+            kwargs['tarea'] = tarea
+
+        def trabajo():
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Cancelado:
+                return
+            except Exception as e:
+                if al_error is not None and not tarea.cancelada:
+                    self._publicar(al_error, e)
+                return
+            if al_terminar is not None and not tarea.cancelada:
+                self._publicar(al_terminar, resultado)
+
+        tarea.future = self._pool.submit(trabajo)
+        return tarea
+
+    def _publicar(self, callback, *args):
+        self._cola.put((callback, args))
+
+    def _despachar(self):
+        # Siempre en el hilo de Tk; se reprograma antes por si un callback falla
+        if not self._activo:
+            return
+        self.root.after(self.intervalo_ms, self._despachar)
+        while True:
+            try:
+                callback, args = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            metricas = self.metricas
+            if metricas is None:
+                callback(*args)
+            else:
+                with metricas.medir(_operacion_vista(callback)):
+                    callback(*args)
+
+    def cerrar(self):
+        self._activo = False
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _operacion_vista(callback) -> str:
+    # "vista.InventarioVista.mostrar_reporte.al_contar": acotado por el código, no por los datos
+    nombre = getattr(callback, '__qualname__', type(callback).__name__)
+    return "vista." + nombre.replace("<locals>.", "")
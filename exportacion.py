@@ -0,0 +1,84 @@
+import csv
+import json
+import os
+import sys
+from typing import Iterable
+
+# Exportación en streaming: las filas llegan de un generador y se escriben una
+# a una, así que la memoria no depende del número de filas exportadas.
+FORMATOS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def formato_de(ruta: str) -> str:
+    # "reporte.csv", "reporte.jsonl.gz", ... (gzip según la extensión final)
+    base = ruta[:-3] if ruta.lower().endswith(".gz") else ruta
+    extension = os.path.splitext(base)[1].lower()
+    try:
+        return FORMATOS[extension]
+    except KeyError:
+        raise ValueError(f"Formato de exportación no soportado: {extension or ruta}")
+
+
+def exportar(filas: Iterable[dict], ruta: str, formato: str = None) -> int:
+    # Escritura atómica como escribir_instantanea: si la exportación falla o se
+    # cancela no queda un archivo a medias. Con ruta "-" se escribe en la salida
+    # estándar (formato "jsonl" por defecto). Devuelve el número de filas escritas.
+    if formato is None:
+        formato = "jsonl" if ruta == "-" else formato_de(ruta)
+    if formato not in ("csv", "jsonl"):
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    escribir = escribir_csv if formato == "csv" else escribir_jsonl
+    if ruta == "-":
+        return escribir(filas, sys.stdout)
+    temporal = f"{ruta}.tmp"
+    try:
+        with _abrir(temporal, comprimir=ruta.lower().endswith(".gz")) as f:
+            escritas = escribir(filas, f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return escritas
+
+
+def _abrir(ruta: str, comprimir: bool):
+    if comprimir:
+        import gzip  # solo si se pide, para no cargarlo en cada arranque
+        return gzip.open(ruta, 'wt', encoding='utf-8', newline='')
+    return open(ruta, 'w', encoding='utf-8', newline='')
+
+
+def escribir_csv(filas: Iterable[dict], f) -> int:
+    # Columnas de la primera fila; las referencias anidadas se aplanan
+    # ("producto.nombre")
+    escritor = None
+    escritas = 0
+    for fila in filas:
+        fila = aplanar(fila)
+        if escritor is None:
+            escritor = csv.DictWriter(f, fieldnames=list(fila), extrasaction='ignore')
+            escritor.writeheader()
+        escritor.writerow(fila)
+        escritas += 1
+    return escritas
+
+
+def escribir_jsonl(filas: Iterable[dict], f) -> int:
+    escritas = 0
+    for fila in filas:
+        f.write(json.dumps(fila, ensure_ascii=False, separators=(',', ':')))
+        f.write("\n")
+        escritas += 1
+    return escritas
+
+
+def aplanar(fila: dict, prefijo: str = "") -> dict:
+    plana = {}
+    for clave, valor in fila.items():
+        if isinstance(valor, dict):
+            plana.update(aplanar(valor, f"{prefijo}{clave}."))
+        else:
+            plana[f"{prefijo}{clave}"] = valor
+    return plana
+
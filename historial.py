@@ -0,0 +1,254 @@
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from agregacion import Codificador, Tablas
+from modelo import TIPOS_MOVIMIENTO, Movimiento
+
+_EPOCA = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
+_CODIGOS_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS_MOVIMIENTO)}
+_CLASES_TIPO = list(TIPOS_MOVIMIENTO.values())
+
+
+class Historial(ABC, Sequence):
+    # Historial de movimientos en memoria, en orden de registro. Como las fechas
+    # se asignan en orden creciente, las marcas de tiempo forman un índice
+    # ordenado para búsquedas binarias. Por producto se guardan sus posiciones y,
+    # cada PUNTO_CONTROL_CADA movimientos, el neto acumulado hasta ese punto.
+    PUNTO_CONTROL_CADA = 64
+
+    def __init__(self):
+        self._marcas = array('q')  # microsegundos desde la época (fecha local)
+        self._posiciones: Dict[str, array] = {}
+        self._puntos_control: Dict[str, array] = {}
+        self._netos: Dict[str, int] = {}
+        self._ordenado = True
+
+    def vincular(self, indices: dict):
+        self._indices = indices
+
+    @abstractmethod
+    def agregar_varios(self, movimientos: List[Movimiento]):
+        pass
+
+    @abstractmethod
+    def _neto(self, posicion: int) -> int:
+        pass
+
+    def _indexar(self, posicion: int, producto_id: str, marca: int, neto: int):
+        if self._marcas and marca < self._marcas[-1]:
+            # Reloj hacia atrás o datos antiguos: las consultas pasan a recorrer
+            self._ordenado = False
+        self._marcas.append(marca)
+        posiciones = self._posiciones.get(producto_id)
+        if posiciones is None:
+            posiciones = self._posiciones[producto_id] = array('i')
+            self._puntos_control[producto_id] = array('q')
+        posiciones.append(posicion)
+        total = self._netos[producto_id] = self._netos.get(producto_id, 0) + neto
+        if len(posiciones) % self.PUNTO_CONTROL_CADA == 0:
+            self._puntos_control[producto_id].append(total)
+
+    def tiene_producto(self, producto_id: str) -> bool:
+        return producto_id in self._posiciones
+
+    def limpiar(self):
+        del self._marcas[:]
+        self._posiciones.clear()
+        self._puntos_control.clear()
+        self._netos.clear()
+        self._ordenado = True
+
+    def __len__(self) -> int:
+        return len(self._marcas)
+
+    def posiciones_entre(self, desde: datetime = None, hasta: datetime = None) -> Sequence:
+        # Posiciones con desde <= fecha <= hasta (ambos opcionales). Con el índice
+        # ordenado cuesta O(log n) y devuelve un range, que se pagina sin copiar.
+        inicio = 0 if desde is None else _marca(desde)
+        fin = None if hasta is None else _marca(hasta)
+        if not self._ordenado:
+            return [i for i, m in enumerate(self._marcas)
+                    if m >= inicio and (fin is None or m <= fin)]
+        return range(0 if desde is None else bisect_left(self._marcas, inicio),
+                     len(self._marcas) if hasta is None else bisect_right(self._marcas, fin))
+
+    def neto_hasta(self, producto_id: str, fecha: datetime) -> int:
+        # Suma de cantidades netas del producto con fecha <= `fecha`. Parte del
+        # punto de control anterior y recorre como mucho PUNTO_CONTROL_CADA movimientos.
+        posiciones = self._posiciones.get(producto_id)
+        if posiciones is None:
+            return 0
+        marca = _marca(fecha)
+        if not self._ordenado:
+            return sum(self._neto(p) for p in posiciones if self._marcas[p] <= marca)
+        cuenta = bisect_right(posiciones, marca, key=self._marcas.__getitem__)
+        bloque = cuenta // self.PUNTO_CONTROL_CADA
+        neto = self._puntos_control[producto_id][bloque - 1] if bloque else 0
+        for posicion in posiciones[bloque * self.PUNTO_CONTROL_CADA:cuenta]:
+            neto += self._neto(posicion)
+        return neto
+
+    def neto_total(self, producto_id: str) -> int:
+        return self._netos.get(producto_id, 0)
+
+    def fragmentos(self, tamano: int, desde: datetime = None,
+                   hasta: datetime = None) -> Tuple[Tablas, Iterator[tuple]]:
+        # Fragmentos columnares para agregacion.MotorAgregacion, codificando
+        # los movimientos uno a uno
+        codificador = Codificador(tuple(TIPOS_MOVIMIENTO))
+        filas = self._filas(self.posiciones_entre(desde, hasta))
+        return codificador, codificador.fragmentos(filas, tamano)
+
+    def _filas(self, posiciones) -> Iterator[tuple]:
+        for posicion in posiciones:
+            movimiento = self[posicion]
+            yield (movimiento.producto.id, movimiento.responsable.id, movimiento.almacen,
+                   movimiento.tipo, movimiento.cantidad_neta, self._marcas[posicion])
+
+
+class HistorialObjetos(Historial):
+    # Una instancia Movimiento (con __slots__) por registro
+    def __init__(self):
+        super().__init__()
+        self._movimientos: List[Movimiento] = []
+
+    def agregar_varios(self, movimientos: List[Movimiento]):
+        for movimiento in movimientos:
+            self._indexar(len(self._movimientos), movimiento.producto.id,
+                          _marca(movimiento.fecha), movimiento.cantidad_neta)
+            self._movimientos.append(movimiento)
+
+    def _neto(self, posicion: int) -> int:
+        return self._movimientos[posicion].cantidad_neta
+
+    def limpiar(self):
+        super().limpiar()
+        self._movimientos.clear()
+
+    def __getitem__(self, posicion):
+        return self._movimientos[posicion]
+
+    def __iter__(self) -> Iterator[Movimiento]:
+        return iter(self._movimientos)
+
+
+class HistorialColumnar(Historial):
+    # Columnas paralelas del módulo array (~30 bytes por movimiento). Los
+    # productos, responsables y almacenes se guardan como índices a tablas
+    # internas, y las instancias Movimiento se crean solo al leerlas.
+    def __init__(self):
+        super().__init__()
+        self._productos = array('i')     # índice en _ids_producto
+        self._cantidades = array('q')    # cantidad con signo (salidas en negativo)
+        self._responsables = array('i')  # índice en _ids_responsable
+        self._almacenes = array('H')     # índice en _nombres_almacen
+        self._tipos = array('B')         # índice en TIPOS_MOVIMIENTO
+        self._ids_producto: List[str] = []
+        self._ids_responsable: List[str] = []
+        self._nombres_almacen: List[str] = []
+        self._codigos_producto: Dict[str, int] = {}
+        self._codigos_responsable: Dict[str, int] = {}
+        self._codigos_almacen: Dict[str, int] = {}
+        # Datos dispersos: motivos de devolución e ids fuera de la secuencia MOVnnn
+        self._motivos: Dict[int, str] = {}
+        self._ids: Dict[int, str] = {}
+
+    def limpiar(self):
+        super().limpiar()
+        for columna in (self._productos, self._cantidades,
+                        self._responsables, self._almacenes, self._tipos):
+            del columna[:]
+        for tabla in (self._ids_producto, self._ids_responsable, self._nombres_almacen,
+                      self._codigos_producto, self._codigos_responsable, self._codigos_almacen,
+                      self._motivos, self._ids):
+            tabla.clear()
+
+    @staticmethod
+    def _codigo(tabla: List[str], codigos: Dict[str, int], valor: str) -> int:
+        codigo = codigos.get(valor)
+        if codigo is None:
+            codigo = codigos[valor] = len(tabla)
+            tabla.append(valor)
+        return codigo
+
+    def agregar_varios(self, movimientos: List[Movimiento]):
+        codigo = self._codigo
+        for movimiento in movimientos:
+            posicion = len(self._marcas)
+            self._indexar(posicion, movimiento.producto.id, _marca(movimiento.fecha),
+                          movimiento.cantidad_neta)
+            self._productos.append(codigo(self._ids_producto, self._codigos_producto,
+                                          movimiento.producto.id))
+            self._cantidades.append(movimiento.cantidad_neta)
+            self._responsables.append(codigo(self._ids_responsable, self._codigos_responsable,
+                                             movimiento.responsable.id))
+            self._almacenes.append(codigo(self._nombres_almacen, self._codigos_almacen,
+                                          movimiento.almacen))
+            self._tipos.append(_CODIGOS_TIPO[movimiento.tipo])
+            motivo = getattr(movimiento, 'motivo', None)
+            if motivo is not None:
+                self._motivos[posicion] = motivo
+            if movimiento.id != _id_secuencial(posicion):
+                self._ids[posicion] = movimiento.id
+
+    def _neto(self, posicion: int) -> int:
+        return self._cantidades[posicion]
+
+    def fragmentos(self, tamano: int, desde: datetime = None,
+                   hasta: datetime = None) -> Tuple[Tablas, Iterator[tuple]]:
+        # Las columnas ya están codificadas: cada fragmento es una rebanada de
+        # ellas (o, con el índice desordenado, las posiciones del rango recogidas)
+        tablas = Tablas(self._ids_producto, self._ids_responsable, self._nombres_almacen,
+                        tuple(TIPOS_MOVIMIENTO))
+        return tablas, self._rebanadas(self.posiciones_entre(desde, hasta), tamano)
+
+    def _rebanadas(self, posiciones, tamano: int) -> Iterator[tuple]:
+        columnas = (self._productos, self._responsables, self._almacenes, self._tipos,
+                    self._cantidades, self._marcas)
+        for inicio in range(0, len(posiciones), tamano):
+            trozo = posiciones[inicio:inicio + tamano]
+            if isinstance(trozo, range):
+                yield tuple(columna[trozo.start:trozo.stop] for columna in columnas)
+            else:
+                yield tuple(array(columna.typecode, map(columna.__getitem__, trozo))
+                            for columna in columnas)
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return [self._materializar(i) for i in range(*posicion.indices(len(self)))]
+        if posicion < 0:
+            posicion += len(self)
+        if not 0 <= posicion < len(self):
+            raise IndexError("Índice de movimiento fuera de rango")
+        return self._materializar(posicion)
+
+    def __iter__(self) -> Iterator[Movimiento]:
+        for posicion in range(len(self)):
+            yield self._materializar(posicion)
+
+    def _materializar(self, posicion: int) -> Movimiento:
+        clase = _CLASES_TIPO[self._tipos[posicion]]
+        movimiento = clase.__new__(clase)
+        movimiento.id = self._ids.get(posicion) or _id_secuencial(posicion)
+        movimiento.fecha = _EPOCA + self._marcas[posicion] * _MICROSEGUNDO
+        movimiento.producto = self._indices['productos'][self._ids_producto[self._productos[posicion]]]
+        movimiento.cantidad = abs(self._cantidades[posicion])
+        movimiento.responsable = self._indices['responsables'][
+            self._ids_responsable[self._responsables[posicion]]]
+        movimiento.almacen = self._nombres_almacen[self._almacenes[posicion]]
+        if posicion in self._motivos:
+            movimiento.motivo = self._motivos[posicion]
+        return movimiento
+
+
+def _marca(fecha: datetime) -> int:
+    return (fecha - _EPOCA) // _MICROSEGUNDO
+
+
+def _id_secuencial(posicion: int) -> str:
+    return f"MOV{posicion + 1:03d}"
@@ -0,0 +1,83 @@
+import csv
+import json
+import os
+import re
+from typing import Iterator, List, Tuple
+
+CAMPOS_MOVIMIENTO = ("tipo", "producto_id", "cantidad", "responsable_id", "almacen", "motivo")
+
+
+class ResultadoLote:
+    def __init__(self, aplicados: int, errores: List[Tuple[int, str]], segundos: float):
+        self.aplicados = aplicados
+        self.errores = errores  # (número de fila, mensaje)
+        self.segundos = segundos
+
+    @property
+    def exito(self) -> bool:
+        return not self.errores
+
+    @property
+    def movimientos_por_segundo(self) -> float:
+        return self.aplicados / self.segundos if self.segundos else 0.0
+
+    def __str__(self):
+        if self.exito:
+            return (f"{self.aplicados} movimientos registrados en {self.segundos:.2f} s "
+                    f"({self.movimientos_por_segundo:.0f} mov/s)")
+        return f"Lote rechazado: {len(self.errores)} filas con errores, no se aplicó ningún movimiento"
+
+
+def leer_movimientos(ruta: str) -> Iterator:
+    # Lectura en streaming de un volcado CSV (con cabecera) o JSONL, según la
+    # extensión. Las filas se pasan por leer_fila al registrarlas.
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".csv":
+        return _leer_csv(ruta)
+    elif extension in (".jsonl", ".ndjson"):
+        return _leer_jsonl(ruta)
+    else:
+        raise ValueError(f"Formato de archivo no soportado: {extension}")
+
+
+def _leer_csv(ruta: str) -> Iterator[dict]:
+    with open(ruta, 'r', encoding='utf-8', newline='') as f:
+        for fila in csv.DictReader(f):
+            yield _normalizar(fila)
+
+
+def _leer_jsonl(ruta: str) -> Iterator[str]:
+    # Las líneas salen sin decodificar: leer_fila las convierte dentro del
+    # lote, así una línea dañada es un error de su fila y no corta la lectura
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            if linea.strip():
+                yield linea
+
+
+def leer_fila(fila) -> dict:
+    # Fila de un lote como dict: las de JSONL llegan como texto
+    if isinstance(fila, str):
+        try:
+            fila = json.loads(fila)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON no válido: {e.msg}")
+        if isinstance(fila, dict):
+            fila = _normalizar(fila)
+    if not isinstance(fila, dict):
+        raise ValueError("La fila no es un objeto")
+    return fila
+
+
+def leer_entero(valor) -> int:
+    # Enteros de JSON o texto con solo dígitos (CSV, parámetros de URL). Ni
+    # decimales ni booleanos: int() truncaría 2.9 a 2 y tomaría True por 1.
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str) and re.fullmatch(r"\s*[+-]?\d+\s*", valor):
+        return int(valor)
+    raise ValueError(f"No es un entero: {valor!r}")
+
+
+def _normalizar(fila: dict) -> dict:
+    return {campo: fila.get(campo) or None for campo in CAMPOS_MOVIMIENTO}
@@ -0,0 +1,183 @@
+import argparse
+import os
+import sys
+from typing import Optional
+
+# Interfaz de línea de comandos para scripts y cron, sin Tk:
+#   python -m inventario --sqlite inventario.db registrar Entrada PROD001 10 RESP001 A
+#   python -m inventario --sqlite inventario.db importar escaner.csv
+#   python -m inventario --sqlite inventario.db reporte movimientos historial.csv.gz
+#   python -m inventario --diario datos.json diario.jsonl compactar
+#   python -m inventario --sqlite inventario.db reabastecer
+#   python -m inventario --sqlite inventario.db servir --puerto 8080
+#   python -m inventario --sqlite inventario.db --metricas inventario.prom importar escaner.csv
+# Los módulos del gestor se importan dentro de cada orden: `--help` y los
+# errores de argumentos no pagan su carga.
+
+TIPOS_REPORTE = ("productos", "movimientos", "stock_minimo", "stock_por_almacen",
+                 "ventas_por_producto", "rotacion", "movimientos_por_almacen", "reabastecimiento")
+
+
+def _fecha(texto: str):
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError("fecha no válida (use AAAA-MM-DD[THH:MM:SS])")
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="inventario", description="Gestión de inventario sin interfaz gráfica")
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument("--sqlite", metavar="BD", help="base de datos SQLite del inventario")
+    origen.add_argument("--diario", nargs=2, metavar=("INSTANTANEA", "DIARIO"),
+                        help="instantánea JSON y diario de movimientos")
+    origen.add_argument("--datos", metavar="JSON",
+                        help="archivo guardado desde la aplicación (se crea o reescribe si hay cambios)")
+    parser.add_argument("--fsync", choices=("siempre", "grupo", "nunca"), default="grupo",
+                        help="política de fsync del diario")
+    parser.add_argument("--ejemplo", action="store_true",
+                        help="cargar los datos de ejemplo si el inventario está vacío")
+    parser.add_argument("--metricas", metavar="RUTA",
+                        help="volcar al terminar las métricas de la orden en texto de Prometheus")
+    parser.add_argument("--perfil", metavar="RUTA", help="perfilar la orden con cProfile (archivo .prof)")
+    ordenes = parser.add_subparsers(dest="orden_cli", metavar="ORDEN", required=True)
+
+    registrar = ordenes.add_parser("registrar", help="registrar un movimiento")
+    registrar.add_argument("tipo", choices=("Entrada", "Salida", "Devolución"))
+    registrar.add_argument("producto_id")
+    registrar.add_argument("cantidad", type=int)
+    registrar.add_argument("responsable_id")
+    registrar.add_argument("almacen")
+    registrar.add_argument("--motivo", help="obligatorio en devoluciones")
+    registrar.set_defaults(funcion=_registrar)
+
+    importar = ordenes.add_parser("importar", help="importar un lote de movimientos (CSV o JSONL)")
+    importar.add_argument("ruta")
+    importar.set_defaults(funcion=_importar)
+
+    reporte = ordenes.add_parser("reporte", help="exportar un reporte en streaming")
+    reporte.add_argument("tipo", choices=TIPOS_REPORTE)
+    reporte.add_argument("ruta", nargs="?", default="-",
+                         help=".csv, .jsonl o .ndjson, opcionalmente .gz (por defecto, salida estándar)")
+    reporte.add_argument("--formato", choices=("csv", "jsonl"), help="formato si no se deduce de la ruta")
+    reporte.add_argument("--orden", help="columna de orden")
+    reporte.add_argument("--descendente", action="store_true")
+    reporte.add_argument("--filtro")
+    reporte.add_argument("--desde", type=_fecha, help="fecha inicial (reportes del historial)")
+    reporte.add_argument("--hasta", type=_fecha, help="fecha final (reportes del historial)")
+    reporte.set_defaults(funcion=_reporte)
+
+    reabastecer = ordenes.add_parser(
+        "reabastecer", help="fijar el stock mínimo en el punto de pedido sugerido por la demanda")
+    reabastecer.add_argument("productos", nargs="*", metavar="PRODUCTO_ID",
+                             help="productos a ajustar (por defecto, todo el catálogo)")
+    reabastecer.set_defaults(funcion=_reabastecer)
+
+    servir = ordenes.add_parser("servir", help="atender la API HTTP/JSON hasta Ctrl+C")
+    servir.add_argument("--host", default="127.0.0.1")
+    servir.add_argument("--puerto", type=int, default=8080)
+    servir.set_defaults(funcion=_servir)
+
+    compactar = ordenes.add_parser("compactar", help="volcar el diario a la instantánea y truncarlo")
+    compactar.set_defaults(funcion=_compactar)
+    return parser
+
+
+def abrir_gestor(args):
+    from controlador import GestorInventario
+    if args.sqlite:
+        from almacenamiento import AlmacenamientoSQLite
+        return GestorInventario(AlmacenamientoSQLite(args.sqlite), datos_ejemplo=args.ejemplo)
+    if args.datos:
+        # Un archivo que aún no existe se empieza vacío (o con los datos de
+        # ejemplo) y se crea al guardar
+        gestor = GestorInventario()
+        if os.path.exists(args.datos):
+            gestor.cargar_archivo(args.datos)
+        if args.ejemplo and not gestor.productos and not gestor.categorias:
+            gestor.cargar_datos_ejemplo()
+        return gestor
+    gestor = GestorInventario(datos_ejemplo=args.ejemplo)
+    if args.diario:
+        gestor.abrir_diario(*args.diario, politica_fsync=args.fsync)
+    return gestor
+
+
+def _registrar(gestor, args) -> str:
+    return gestor.registrar_movimiento(args.tipo, args.producto_id, args.cantidad,
+                                       args.responsable_id, args.almacen, args.motivo)
+
+
+def _importar(gestor, args) -> str:
+    resultado = gestor.importar_movimientos(args.ruta)
+    if not resultado.exito:
+        detalle = "\n".join(f"Fila {n}: {error}" for n, error in resultado.errores[:20])
+        raise ValueError(f"{resultado}\n{detalle}")
+    return str(resultado)
+
+
+def _reporte(gestor, args) -> Optional[str]:
+    filas = gestor.exportar_reporte(args.tipo, args.ruta, args.orden, args.descendente, args.filtro,
+                                    args.desde, args.hasta, formato=args.formato)
+    # Con salida estándar el resumen iría mezclado con los datos
+    return None if args.ruta == "-" else f"{filas} filas exportadas a {args.ruta}"
+
+
+def _reabastecer(gestor, args) -> str:
+    cambiados = gestor.aplicar_stock_minimo_sugerido(args.productos or None)
+    return f"Stock mínimo actualizado en {cambiados} productos"
+
+
+def _servir(gestor, args) -> str:
+    import asyncio
+    from servidor import servir
+
+    def al_iniciar(servidor):
+        for host, puerto, *_ in servidor.direcciones:
+            print(f"Atendiendo en http://{host}:{puerto}", file=sys.stderr)
+
+    try:
+        asyncio.run(servir(gestor, args.host, args.puerto, al_iniciar))
+    except KeyboardInterrupt:
+        pass
+    return "Servidor detenido"
+
+
+def _compactar(gestor, args) -> str:
+    if not args.diario:
+        raise ValueError("compactar necesita --diario")
+    gestor.compactar()
+    return "Diario compactado"
+
+
+def main(argv=None) -> int:
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if not (args.sqlite or args.diario or args.datos or args.ejemplo):
+        parser.error("indique el origen de datos: --sqlite, --diario o --datos")
+    try:
+        gestor = abrir_gestor(args)
+        if args.metricas:
+            gestor.activar_metricas()
+        if args.perfil:
+            gestor.perfilar(1, args.perfil)
+        try:
+            mensaje = args.funcion(gestor, args)
+            if args.datos and args.orden_cli in ("registrar", "importar", "reabastecer", "servir"):
+                gestor.guardar_datos(args.datos)
+        finally:
+            gestor.cerrar()
+            if args.metricas:
+                gestor.volcar_metricas(args.metricas)
+    except (ValueError, OSError) as e:
+        # Errores de datos y de archivos (no existe, sin permiso...) sin traza
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if mensaje:
+        print(mensaje)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,7 @@ def main():
     root = tk.Tk()
 
     # Crear instancia del controlador
-    controlador = GestorInventario()
+    controlador = GestorInventario(datos_ejemplo=True)
 
     # Crear instancia de la vista y pasarle el controlador
     vista = InventarioVista(root, controlador)
@@ -0,0 +1,255 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+# Límites (en segundos) de los cubos del histograma de latencias, como los de un
+# histograma de Prometheus; el último cubo (+Inf) recoge el resto
+LIMITES_LATENCIA = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_LIMITES_NS = tuple(round(limite * 1e9) for limite in LIMITES_LATENCIA)
+
+PREFIJO_PROMETHEUS = "inventario"
+
+
+class Serie:
+    # Llamadas, errores e histograma de latencias de una operación (y tipo)
+    __slots__ = ('llamadas', 'errores', 'total_ns', 'maximo_ns', 'cubos')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.total_ns = 0
+        self.maximo_ns = 0
+        self.cubos = [0] * (len(_LIMITES_NS) + 1)
+
+    def anotar(self, ns: int, error: bool):
+        self.llamadas += 1
+        self.errores += error
+        self.total_ns += ns
+        if ns > self.maximo_ns:
+            self.maximo_ns = ns
+        self.cubos[bisect_left(_LIMITES_NS, ns)] += 1
+
+    def copia(self) -> 'Serie':
+        serie = Serie()
+        serie.llamadas, serie.errores = self.llamadas, self.errores
+        serie.total_ns, serie.maximo_ns = self.total_ns, self.maximo_ns
+        serie.cubos = list(self.cubos)
+        return serie
+
+    def percentil(self, p: float) -> float:
+        # Estimación por el límite superior del cubo (en segundos)
+        objetivo = p * self.llamadas
+        acumulado = 0
+        for limite, cuenta in zip(LIMITES_LATENCIA, self.cubos):
+            acumulado += cuenta
+            if cuenta and acumulado >= objetivo:
+                return min(limite, self.maximo_ns / 1e9)
+        return self.maximo_ns / 1e9
+
+
+class CapturaPerfil:
+    # Ventana de cProfile sobre las próximas `operaciones` operaciones de primer
+    # nivel. cProfile solo perfila el hilo que lo activa: un solo hilo a la vez
+    # entra en la ventana y las operaciones concurrentes quedan fuera.
+    def __init__(self, operaciones: int, ruta: str = None, al_terminar: Callable = None):
+        if operaciones <= 0:
+            raise ValueError("El número de operaciones a perfilar debe ser positivo")
+        import cProfile
+        self.restantes = operaciones
+        self.ruta = ruta
+        self._al_terminar = al_terminar
+        self._perfil = cProfile.Profile()
+        self._cerrojo = threading.Lock()
+
+    def ejecutar(self, funcion, args, kwargs):
+        if not self._cerrojo.acquire(blocking=False):
+            return funcion(*args, **kwargs)
+        try:
+            if self.restantes <= 0:
+                return funcion(*args, **kwargs)
+            self._perfil.enable()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                self._perfil.disable()
+                self.restantes -= 1
+                if self.restantes == 0:
+                    self._terminar()
+        finally:
+            self._cerrojo.release()
+
+    def _terminar(self):
+        import io
+        import pstats
+        if self.ruta:
+            self._perfil.dump_stats(self.ruta)
+        salida = io.StringIO()
+        pstats.Stats(self._perfil, stream=salida).sort_stats("cumulative").print_stats(30)
+        if self._al_terminar is not None:
+            self._al_terminar(salida.getvalue())
+
+
+class Metricas:
+    # Contadores e histogramas por (operación, tipo). Solo cuesta algo mientras
+    # hay funciones envueltas con `envolver`; sin instrumentar no hay sobrecarga.
+    def __init__(self):
+        self._series: Dict[Tuple[str, Optional[str]], Serie] = {}
+        self._cerrojo = threading.Lock()
+        self._local = threading.local()
+        self._captura: Optional[CapturaPerfil] = None
+        self.ultimo_perfil: Optional[str] = None
+        self.desde = time.time()
+
+    def anotar(self, operacion: str, tipo: Optional[str], ns: int, error: bool = False):
+        clave = (operacion, tipo)
+        with self._cerrojo:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = Serie()
+            serie.anotar(ns, error)
+
+    def reiniciar(self):
+        with self._cerrojo:
+            self._series.clear()
+            self.desde = time.time()
+
+    @contextmanager
+    def medir(self, operacion: str, tipo: str = None):
+        inicio = time.perf_counter_ns()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.anotar(operacion, tipo, time.perf_counter_ns() - inicio, error)
+
+    def envolver(self, funcion, operacion: str, tipo: str = None, tipo_de: Callable = None):
+        # tipo_de(args, kwargs) da el tipo de cada llamada (p. ej. el tipo de
+        # movimiento); si no, se usa el tipo fijo
+        anotar = self.anotar
+        local = self._local
+        reloj = time.perf_counter_ns
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            etiqueta = tipo_de(args, kwargs) if tipo_de is not None else tipo
+            # Solo las operaciones de primer nivel entran en la ventana de perfil
+            nivel = getattr(local, 'nivel', 0)
+            captura = self._captura if nivel == 0 else None
+            local.nivel = nivel + 1
+            inicio = reloj()
+            error = True
+            try:
+                if captura is None:
+                    resultado = funcion(*args, **kwargs)
+                else:
+                    resultado = captura.ejecutar(funcion, args, kwargs)
+                error = False
+                return resultado
+            finally:
+                anotar(operacion, etiqueta, reloj() - inicio, error)
+                local.nivel = nivel
+        return envoltura
+
+    def perfilar(self, operaciones: int, ruta: str = None):
+        def al_terminar(resumen):
+            self.ultimo_perfil = resumen
+            self._captura = None
+        self._captura = CapturaPerfil(operaciones, ruta, al_terminar)
+
+    @property
+    def perfilando(self) -> int:
+        captura = self._captura
+        return captura.restantes if captura is not None else 0
+
+    def _copiar_series(self) -> Dict[Tuple[str, Optional[str]], Serie]:
+        with self._cerrojo:
+            return {clave: serie.copia() for clave, serie in self._series.items()}
+
+    def instantanea(self) -> dict:
+        operaciones = {}
+        for (operacion, tipo), serie in sorted(self._copiar_series().items(),
+                                               key=lambda par: (par[0][0], par[0][1] or "")):
+            nombre = operacion if tipo is None else f"{operacion}[{tipo}]"
+            operaciones[nombre] = {
+                'operacion': operacion,
+                'tipo': tipo,
+                'llamadas': serie.llamadas,
+                'errores': serie.errores,
+                'total_s': serie.total_ns / 1e9,
+                'media_ms': serie.total_ns / serie.llamadas / 1e6,
+                'p50_ms': serie.percentil(0.50) * 1e3,
+                'p99_ms': serie.percentil(0.99) * 1e3,
+                'max_ms': serie.maximo_ns / 1e6,
+            }
+        return {
+            'desde': self.desde,
+            'operaciones': operaciones,
+            'perfilando': self.perfilando,
+            'perfil': self.ultimo_perfil,
+        }
+
+    def texto_prometheus(self) -> str:
+        # Formato de exposición de texto de Prometheus (p. ej. para el
+        # recolector de archivos de node_exporter)
+        series = sorted(self._copiar_series().items(), key=lambda par: (par[0][0], par[0][1] or ""))
+        llamadas = f"{PREFIJO_PROMETHEUS}_operaciones_total"
+        errores = f"{PREFIJO_PROMETHEUS}_errores_total"
+        latencia = f"{PREFIJO_PROMETHEUS}_latencia_segundos"
+        lineas = [f"# HELP {llamadas} Operaciones completadas o fallidas",
+                  f"# TYPE {llamadas} counter"]
+        lineas += [f"{llamadas}{_etiquetas(clave)} {serie.llamadas}" for clave, serie in series]
+        lineas += [f"# HELP {errores} Operaciones terminadas con excepción",
+                   f"# TYPE {errores} counter"]
+        lineas += [f"{errores}{_etiquetas(clave)} {serie.errores}" for clave, serie in series]
+        lineas += [f"# HELP {latencia} Latencia de las operaciones",
+                   f"# TYPE {latencia} histogram"]
+        for clave, serie in series:
+            acumulado = 0
+            for limite, cuenta in zip(LIMITES_LATENCIA + ("+Inf",), serie.cubos):
+                acumulado += cuenta
+                lineas.append(f"{latencia}_bucket{_etiquetas(clave, le=limite)} {acumulado}")
+            lineas.append(f"{latencia}_sum{_etiquetas(clave)} {serie.total_ns / 1e9:.9f}")
+            lineas.append(f"{latencia}_count{_etiquetas(clave)} {serie.llamadas}")
+        return "\n".join(lineas) + "\n"
+
+    def volcar_prometheus(self, ruta: str):
+        # Escritura atómica: el recolector nunca lee un archivo a medias
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporal, ruta)
+
+
+def _etiquetas(clave, le=None) -> str:
+    operacion, tipo = clave
+    pares = [('operacion', operacion)]
+    if tipo is not None:
+        pares.append(('tipo', tipo))
+    if le is not None:
+        pares.append(('le', le if isinstance(le, str) else repr(le)))
+    return "{" + ",".join(f'{nombre}="{_escapar(str(valor))}"' for nombre, valor in pares) + "}"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def instrumentar(objeto, nombres, metricas: Metricas, tipos_de: Dict[str, Callable] = None):
+    # Envuelve los métodos `nombres` de una instancia (atributos de instancia
+    # que tapan los de la clase); desinstrumentar los retira
+    tipos_de = tipos_de or {}
+    for nombre in nombres:
+        metodo = getattr(type(objeto), nombre).__get__(objeto)
+        setattr(objeto, nombre, metricas.envolver(metodo, nombre, tipo_de=tipos_de.get(nombre)))
+
+
+def desinstrumentar(objeto, nombres):
+    for nombre in nombres:
+        vars(objeto).pop(nombre, None)
+
@@ -3,11 +3,57 @@ from abc import ABC, abstractmethod
 
 
 class Serializable:
+    # Esquema de cada entidad: campos escalares y referencias a otras entidades
+    # (atributo -> colección del gestor). Las referencias se guardan por id.
+    # Las entidades usan __slots__: el esquema es la única fuente de sus campos.
+    __slots__ = ()
+    _campos = ()
+    _referencias = {}
+    _fechas = ()
+
     def to_dict(self):
-        return self.__dict__
+        # Copia para reportes: referencias expandidas y fechas en ISO
+        datos = self._campos_a_dict()
+        for campo in self._referencias:
+            datos[campo] = getattr(self, campo).to_dict()
+        return datos
+
+    def a_registro(self):
+        # Forma persistente: referencias por id y fechas en ISO
+        registro = self._campos_a_dict()
+        for campo in self._referencias:
+            registro[campo] = getattr(self, campo).id
+        return registro
+
+    def _campos_a_dict(self):
+        datos = {campo: getattr(self, campo) for campo in self._campos}
+        for campo in self._fechas:
+            datos[campo] = datos[campo].isoformat()
+        return datos
+
+    @classmethod
+    def desde_registro(cls, registro: dict, indices: dict = None):
+        # Reconstruye sin pasar por __init__ (conserva fecha, tipo, etc.);
+        # `indices` mapea cada colección referenciada a un dict id -> entidad
+        entidad = cls.__new__(cls)
+        for campo in cls._campos:
+            valor = registro.get(campo)
+            if campo in cls._fechas and valor is not None:
+                valor = datetime.fromisoformat(valor)
+            setattr(entidad, campo, valor)
+        for campo, coleccion in cls._referencias.items():
+            setattr(entidad, campo, indices[coleccion][registro[campo]])
+        entidad._inicializar_privados()
+        return entidad
+
+    def _inicializar_privados(self):
+        pass
 
 
 class Responsable(Serializable):
+    __slots__ = ('id', 'nombre', 'rol')
+    _campos = ('id', 'nombre', 'rol')
+
     def __init__(self, id_: str, nombre: str, rol: str):
         self.id = id_
         self.nombre = nombre
@@ -15,12 +61,18 @@ class Responsable(Serializable):
 
 
 class Categoria(Serializable):
+    __slots__ = ('id', 'nombre')
+    _campos = ('id', 'nombre')
+
     def __init__(self, id_: str, nombre: str):
         self.id = id_
         self.nombre = nombre
 
 
 class Proveedor(Serializable):
+    __slots__ = ('id', 'nombre', 'contacto')
+    _campos = ('id', 'nombre', 'contacto')
+
     def __init__(self, id_: str, nombre: str, contacto: str):
         self.id = id_
         self.nombre = nombre
@@ -28,6 +80,11 @@ class Proveedor(Serializable):
 
 
 class Producto(Serializable):
+    __slots__ = ('id', 'nombre', 'categoria', 'proveedor', 'stock_minimo', 'stock_actual',
+                 '_observador', '_libro')
+    _campos = ('id', 'nombre', 'stock_minimo', 'stock_actual')
+    _referencias = {'categoria': 'categorias', 'proveedor': 'proveedores'}
+
     def __init__(self, id_: str, nombre: str, categoria: Categoria,
                  proveedor: Proveedor, stock_minimo: int, stock_actual: int = 0):
         self.id = id_
@@ -36,13 +93,49 @@ class Producto(Serializable):
         self.proveedor = proveedor
         self.stock_minimo = stock_minimo
         self.stock_actual = stock_actual
+        self._inicializar_privados()
+
+    def _inicializar_privados(self):
+        self._observador = None
+        self._libro = None
+
+    def stock_bajo(self) -> bool:
+        return self.stock_actual < self.stock_minimo
+
+    def existencias(self, almacen: str) -> int:
+        # Sin libro de stock (producto suelto) solo se conoce el total
+        if self._libro is None:
+            return self.stock_actual
+        return self._libro.existencias(self.id, almacen)
 
-    def actualizar_stock(self, cantidad: int):
+    def actualizar_stock(self, cantidad: int, almacen: str = None):
+        bajo_antes = self.stock_bajo()
+        if almacen is not None and self._libro is not None:
+            self._libro.mover(self.id, almacen, cantidad)
         self.stock_actual += cantidad
+        self._notificar_si_cruza(bajo_antes)
         return self.stock_actual
 
+    def ajustar_stock_minimo(self, stock_minimo: int):
+        bajo_antes = self.stock_bajo()
+        self.stock_minimo = stock_minimo
+        self._notificar_si_cruza(bajo_antes)
+
+    def _notificar_si_cruza(self, bajo_antes: bool):
+        bajo = self.stock_bajo()
+        if self._observador is not None and bajo != bajo_antes:
+            self._observador.umbral_cruzado(self, bajo)
+
 
 class Movimiento(ABC, Serializable):
+    __slots__ = ('id', 'fecha', 'producto', 'cantidad', 'responsable', 'almacen')
+    _campos = ('id', 'fecha', 'cantidad', 'almacen')
+    _referencias = {'producto': 'productos', 'responsable': 'responsables'}
+    _fechas = ('fecha',)
+    # Cada subclase fija su tipo y el signo con el que afecta al stock
+    tipo = None
+    signo = 0
+
     def __init__(self, id_: str, producto: Producto, cantidad: int,
                  responsable: Responsable, almacen: str):
         self.id = id_
@@ -52,43 +145,149 @@ class Movimiento(ABC, Serializable):
         self.responsable = responsable
         self.almacen = almacen
 
+    @property
+    def cantidad_neta(self) -> int:
+        return self.signo * self.cantidad
+
+    def _campos_a_dict(self):
+        datos = super()._campos_a_dict()
+        datos['tipo'] = self.tipo
+        return datos
+
+    @classmethod
+    def desde_registro(cls, registro: dict, indices: dict = None):
+        # El campo `tipo` decide la subclase concreta
+        if cls is Movimiento:
+            return TIPOS_MOVIMIENTO[registro['tipo']].desde_registro(registro, indices)
+        return super().desde_registro(registro, indices)
+
     @abstractmethod
     def ejecutar(self):
         pass
 
+    def deshacer(self):
+        self.producto.actualizar_stock(-self.cantidad_neta, self.almacen)
+
 
 class Entrada(Movimiento):
-    def __init__(self, id_: str, producto: Producto, cantidad: int,
-                 responsable: Responsable, almacen: str):
-        super().__init__(id_, producto, cantidad, responsable, almacen)
-        self.tipo = "Entrada"
+    __slots__ = ()
+    tipo = "Entrada"
+    signo = 1
 
     def ejecutar(self):
-        self.producto.actualizar_stock(self.cantidad)
+        self.producto.actualizar_stock(self.cantidad, self.almacen)
         return f"Entrada de {self.cantidad} unidades de {self.producto.nombre}"
 
 
 class Salida(Movimiento):
-    def __init__(self, id_: str, producto: Producto, cantidad: int,
-                 responsable: Responsable, almacen: str):
-        super().__init__(id_, producto, cantidad, responsable, almacen)
-        self.tipo = "Salida"
+    __slots__ = ()
+    tipo = "Salida"
+    signo = -1
 
     def ejecutar(self):
-        if self.producto.stock_actual >= self.cantidad:
-            self.producto.actualizar_stock(-self.cantidad)
+        # Se valida contra el stock del almacén de origen, no contra el total
+        if self.producto.existencias(self.almacen) >= self.cantidad:
+            self.producto.actualizar_stock(-self.cantidad, self.almacen)
             return f"Salida de {self.cantidad} unidades de {self.producto.nombre}"
         else:
             raise ValueError("Stock insuficiente")
 
 
 class Devolucion(Movimiento):
+    __slots__ = ('motivo',)
+    _campos = Movimiento._campos + ('motivo',)
+    tipo = "Devolución"
+    signo = 1
+
     def __init__(self, id_: str, producto: Producto, cantidad: int,
                  responsable: Responsable, almacen: str, motivo: str):
         super().__init__(id_, producto, cantidad, responsable, almacen)
-        self.tipo = "Devolución"
         self.motivo = motivo
 
     def ejecutar(self):
-        self.producto.actualizar_stock(self.cantidad)
-        return f"Devolución de {self.cantidad} unidades de {self.producto.nombre}. Motivo: {self.motivo}"
\ No newline at end of file
+        self.producto.actualizar_stock(self.cantidad, self.almacen)
+        return f"Devolución de {self.cantidad} unidades de {self.producto.nombre}. Motivo: {self.motivo}"
+
+
+class Existencia(Serializable):
+    # Fila del libro de stock: existencias de un producto en un almacén
+    __slots__ = ('producto', 'almacen', 'cantidad')
+    _campos = ('almacen', 'cantidad')
+    _referencias = {'producto': 'productos'}
+
+    def __init__(self, producto: Producto, almacen: str, cantidad: int):
+        self.producto = producto
+        self.almacen = almacen
+        self.cantidad = cantidad
+
+
+class VentasProducto(Serializable):
+    # Fila del reporte ventas_por_producto: salidas y devoluciones en el periodo
+    __slots__ = ('producto', 'salidas', 'unidades', 'devueltas', 'netas')
+    _campos = ('salidas', 'unidades', 'devueltas', 'netas')
+    _referencias = {'producto': 'productos'}
+
+    def __init__(self, producto: Producto, salidas: int, unidades: int, devueltas: int):
+        self.producto = producto
+        self.salidas = salidas
+        self.unidades = unidades
+        self.devueltas = devueltas
+        self.netas = unidades - devueltas
+
+
+class RotacionProducto(Serializable):
+    # Fila del reporte rotacion: unidades vendidas sobre el stock medio del
+    # periodo y días que cubre ese stock al ritmo de venta
+    __slots__ = ('producto', 'vendidas', 'stock_inicial', 'stock_final', 'stock_medio',
+                 'rotacion', 'dias_inventario')
+    _campos = ('vendidas', 'stock_inicial', 'stock_final', 'stock_medio', 'rotacion', 'dias_inventario')
+    _referencias = {'producto': 'productos'}
+
+    def __init__(self, producto: Producto, vendidas: int, stock_inicial: int, stock_final: int,
+                 dias: float):
+        self.producto = producto
+        self.vendidas = vendidas
+        self.stock_inicial = stock_inicial
+        self.stock_final = stock_final
+        self.stock_medio = (stock_inicial + stock_final) / 2
+        # Sin stock medio positivo la rotación no está definida
+        self.rotacion = round(vendidas / self.stock_medio, 2) if self.stock_medio > 0 else None
+        self.dias_inventario = round(dias / self.rotacion, 1) if self.rotacion else None
+
+
+class Reabastecimiento(Serializable):
+    # Fila del reporte reabastecimiento: consumo diario medio de las salidas
+    # recientes, su variabilidad, días que cubre el stock actual (None sin
+    # consumo) y punto y cantidad de pedido sugeridos
+    __slots__ = ('producto', 'consumo_medio', 'desviacion', 'dias_cobertura',
+                 'punto_pedido', 'cantidad_sugerida')
+    _campos = ('consumo_medio', 'desviacion', 'dias_cobertura', 'punto_pedido', 'cantidad_sugerida')
+    _referencias = {'producto': 'productos'}
+
+    def __init__(self, producto: Producto, consumo_medio: float, desviacion: float,
+                 dias_cobertura, punto_pedido: int, cantidad_sugerida: int):
+        self.producto = producto
+        self.consumo_medio = consumo_medio
+        self.desviacion = desviacion
+        self.dias_cobertura = dias_cobertura
+        self.punto_pedido = punto_pedido
+        self.cantidad_sugerida = cantidad_sugerida
+
+
+class MovimientosAlmacen(Serializable):
+    # Fila del reporte movimientos_por_almacen
+    __slots__ = ('almacen', 'tipo', 'movimientos', 'unidades')
+    _campos = ('almacen', 'tipo', 'movimientos', 'unidades')
+
+    def __init__(self, almacen: str, tipo: str, movimientos: int, unidades: int):
+        self.almacen = almacen
+        self.tipo = tipo
+        self.movimientos = movimientos
+        self.unidades = unidades
+
+
+TIPOS_MOVIMIENTO = {
+    "Entrada": Entrada,
+    "Salida": Salida,
+    "Devolución": Devolucion
+}
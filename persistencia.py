@@ -0,0 +1,161 @@
+import json
+import os
+import time
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+POLITICAS_FSYNC = ("siempre", "grupo", "nunca")
+
+
+class DiarioMovimientos:
+    # Diario de solo anexado (write-ahead log): una línea JSON compacta por operación.
+    # Cada escritura se vuelca al sistema operativo; el fsync depende de la política:
+    #   "siempre" -> fsync por registro
+    #   "grupo"   -> fsync cada `tamano_grupo` registros o `intervalo_grupo` segundos
+    #   "nunca"   -> se deja al sistema operativo
+    def __init__(self, ruta: str, politica: str = "grupo",
+                 tamano_grupo: int = 100, intervalo_grupo: float = 1.0):
+        if politica not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync no válida: {politica}")
+        self.ruta = ruta
+        self.politica = politica
+        self.tamano_grupo = tamano_grupo
+        self.intervalo_grupo = intervalo_grupo
+        self._recortar_linea_incompleta()
+        self._archivo = open(ruta, 'a', encoding='utf-8')
+        self._pendientes = 0
+        self._ultimo_sync = time.monotonic()
+
+    def _recortar_linea_incompleta(self, bloque: int = 65536):
+        # Una caída a mitad de escritura puede dejar la última línea a medias.
+        # Se recorta (o, si el registro está entero, se completa con su salto)
+        # para que lo siguiente no se escriba pegado a ella.
+        try:
+            f = open(self.ruta, 'rb+')
+        except FileNotFoundError:
+            return
+        with f:
+            fin = f.seek(0, os.SEEK_END)
+            inicio = fin
+            while inicio > 0:
+                inicio = max(0, inicio - bloque)
+                f.seek(inicio)
+                cola = f.read(fin - inicio)
+                corte = cola.rstrip().rfind(b"\n")
+                if corte >= 0:
+                    inicio += corte + 1
+                    break
+            f.seek(inicio)
+            ultima = f.read()
+            if not ultima.strip():
+                return
+            try:
+                json.loads(ultima)
+            except ValueError:
+                f.truncate(inicio)
+            else:
+                if ultima.endswith(b"\n"):
+                    return
+                f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def anotar(self, registro: dict):
+        self.anotar_varios([registro])
+
+    def anotar_varios(self, registros):
+        # Un lote se escribe de una vez y cuenta como un único commit de grupo
+        lineas = [json.dumps(r, ensure_ascii=False, separators=(',', ':')) for r in registros]
+        if not lineas:
+            return
+        self._archivo.write('\n'.join(lineas) + '\n')
+        self._archivo.flush()
+        self._pendientes += len(lineas)
+        self._sincronizar_si_corresponde()
+
+    def _sincronizar_si_corresponde(self):
+        if self.politica == "siempre":
+            self.sincronizar()
+        elif self.politica == "grupo" and (
+                self._pendientes >= self.tamano_grupo
+                or time.monotonic() - self._ultimo_sync >= self.intervalo_grupo):
+            self.sincronizar()
+
+    def sincronizar(self):
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._pendientes = 0
+        self._ultimo_sync = time.monotonic()
+
+    def truncar(self):
+        self._archivo.truncate(0)
+        self.sincronizar()
+
+    def cerrar(self):
+        if not self._archivo.closed:
+            self.sincronizar()
+            self._archivo.close()
+
+    @staticmethod
+    def leer(ruta: str) -> Iterator[dict]:
+        try:
+            # En binario: un corte a mitad de un carácter UTF-8 (los registros
+            # llevan tildes) se trata como cualquier otra línea a medias
+            with open(ruta, 'rb') as f:
+                for numero, linea in enumerate(f, 1):
+                    if not linea.strip():
+                        continue
+                    try:
+                        registro = json.loads(linea.decode('utf-8'))
+                    except ValueError:
+                        # Solo la última línea puede estar a medio escribir (caída
+                        # durante una escritura): se descarta. Antes de ella es un
+                        # diario dañado; saltarla perdería movimientos confirmados.
+                        if any(resto.strip() for resto in f):
+                            raise ValueError(f"Registro dañado en la línea {numero} del diario {ruta}")
+                        return
+                    yield registro
+        except FileNotFoundError:
+            return
+
+
+def escribir_instantanea(ruta: str, datos: dict):
+    # Escritura atómica: archivo temporal + fsync + rename. Las colecciones pueden
+    # ser generadores: se escriben por lotes sin construir el documento completo.
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write("{")
+        for n, (clave, valor) in enumerate(datos.items()):
+            f.write(f"{',' if n else ''}{json.dumps(clave)}:")
+            if isinstance(valor, (dict, str, int, float, bool)) or valor is None:
+                f.write(json.dumps(valor, separators=(',', ':')))
+            else:
+                _escribir_lista(f, valor)
+        f.write("}")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+def _escribir_lista(f, elementos: Iterable, tamano_lote: int = 10_000):
+    # dumps por lotes: casi tan rápido como un único dumps (json.dump por
+    # fragmentos es varias veces más lento) y con memoria acotada
+    elementos = iter(elementos)
+    f.write("[")
+    separador = ""
+    while True:
+        lote = list(islice(elementos, tamano_lote))
+        if not lote:
+            break
+        f.write(separador)
+        f.write(json.dumps(lote, separators=(',', ':'))[1:-1])
+        separador = ","
+    f.write("]")
+
+
+def leer_instantanea(ruta: str) -> Optional[dict]:
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
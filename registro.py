@@ -0,0 +1,220 @@
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from busqueda import IndiceBusqueda
+
+
+class Registro:
+    # Colección de entidades indexada por id. Conserva el orden de inserción
+    # (como la lista que sustituye) y mantiene índices secundarios opcionales,
+    # p. ej. productos por categoría, sincronizados en altas, bajas y recargas.
+    # Con buscable=True también un índice de búsqueda por id y nombre.
+    def __init__(self, indices: Optional[Dict[str, Callable]] = None, buscable: bool = False):
+        self._por_id: Dict[str, object] = {}
+        self.por_id = MappingProxyType(self._por_id)  # vista de solo lectura id -> entidad
+        self._claves: Dict[str, Callable] = dict(indices or {})
+        self._secundarios: Dict[str, Dict[str, Dict[str, object]]] = {
+            nombre: {} for nombre in self._claves
+        }
+        self._busqueda = IndiceBusqueda() if buscable else None
+
+    def agregar(self, entidad):
+        if entidad.id in self._por_id:
+            raise ValueError(f"Ya existe un registro con ID {entidad.id}")
+        self._por_id[entidad.id] = entidad
+        for nombre, clave in self._claves.items():
+            self._secundarios[nombre].setdefault(clave(entidad), {})[entidad.id] = entidad
+        if self._busqueda is not None:
+            self._busqueda.agregar(entidad.id, entidad.nombre)
+        return entidad
+
+    def eliminar(self, _id: str):
+        entidad = self._por_id.pop(_id, None)
+        if entidad is None:
+            return None
+        for nombre, clave in self._claves.items():
+            grupo = self._secundarios[nombre].get(clave(entidad))
+            if grupo is not None:
+                grupo.pop(_id, None)
+                if not grupo:
+                    del self._secundarios[nombre][clave(entidad)]
+        if self._busqueda is not None:
+            self._busqueda.eliminar(_id)
+        return entidad
+
+    def obtener(self, _id: str):
+        return self._por_id.get(_id)
+
+    def filtrar(self, indice: str, clave: str) -> List:
+        return list(self._secundarios[indice].get(clave, {}).values())
+
+    def buscar(self, texto: str, limite: int = 10) -> List:
+        if self._busqueda is None:
+            raise ValueError("El registro no tiene índice de búsqueda")
+        encontradas = (self._por_id.get(_id) for _id in self._busqueda.buscar(texto, limite))
+        return [entidad for entidad in encontradas if entidad is not None]
+
+    def limpiar(self):
+        self._por_id.clear()
+        for grupos in self._secundarios.values():
+            grupos.clear()
+        if self._busqueda is not None:
+            self._busqueda.limpiar()
+
+    # Compatibilidad con el API de lista usado por la vista y los datos de ejemplo
+    def append(self, entidad):
+        self.agregar(entidad)
+
+    def extend(self, entidades):
+        for entidad in entidades:
+            self.agregar(entidad)
+
+    def clear(self):
+        self.limpiar()
+
+    def __iter__(self) -> Iterator:
+        return iter(self._por_id.values())
+
+    def __len__(self) -> int:
+        return len(self._por_id)
+
+    def __contains__(self, _id) -> bool:
+        return _id in self._por_id
+
+
+class IndiceStockBajo:
+    # Conjunto de productos por debajo de su stock mínimo. Los productos vigilados
+    # lo avisan al cruzar el umbral, así que el reporte cuesta O(k) en vez de O(n).
+    def __init__(self):
+        self._productos: Dict[str, object] = {}
+        self._suscriptores: List[Callable] = []
+        # Avisos retenidos por hilo mientras una operación no se confirma
+        self._local = threading.local()
+
+    def vigilar(self, producto):
+        producto._observador = self
+        if producto.stock_bajo():
+            self._productos[producto.id] = producto
+
+    def dejar_de_vigilar(self, producto):
+        producto._observador = None
+        self._productos.pop(producto.id, None)
+
+    def umbral_cruzado(self, producto, bajo: bool):
+        if bajo:
+            self._productos[producto.id] = producto
+        else:
+            self._productos.pop(producto.id, None)
+        retenidos = getattr(self._local, 'retenidos', None)
+        if retenidos is not None:
+            retenidos.setdefault(producto.id, (producto, not bajo))
+            return
+        self._avisar(producto, bajo)
+
+    def _avisar(self, producto, bajo: bool):
+        for callback in list(self._suscriptores):
+            callback(producto, bajo)
+
+    @contextmanager
+    def retener_avisos(self, avisos: list):
+        # El índice se actualiza al momento, pero los avisos de este hilo se
+        # retienen; si la operación falla (y deshace el stock) no queda
+        # ninguno. Al terminar bien se añaden a `avisos` (producto, bajo) los
+        # productos que acaban al otro lado del umbral, para enviarlos con
+        # enviar_avisos una vez soltados los cerrojos.
+        if getattr(self._local, 'retenidos', None) is not None:
+            yield
+            return
+        retenidos = self._local.retenidos = {}
+        try:
+            yield
+        finally:
+            self._local.retenidos = None
+        for producto, bajo_antes in retenidos.values():
+            bajo = producto.stock_bajo()
+            if bajo != bajo_antes:
+                avisos.append((producto, bajo))
+
+    def enviar_avisos(self, avisos: list):
+        for producto, bajo in avisos:
+            self._avisar(producto, bajo)
+
+    def suscribir(self, callback: Callable):
+        self._suscriptores.append(callback)
+
+    def desuscribir(self, callback: Callable):
+        self._suscriptores.remove(callback)
+
+    def limpiar(self):
+        self._productos.clear()
+
+    def __iter__(self) -> Iterator:
+        return iter(list(self._productos.values()))
+
+    def __len__(self) -> int:
+        return len(self._productos)
+
+    def __contains__(self, _id) -> bool:
+        return _id in self._productos
+
+
+class LibroStock:
+    # Existencias por (producto, almacén) y totales por almacén. Los productos
+    # vinculados lo actualizan en cada movimiento, así que cualquier celda o total
+    # se consulta en O(1) sin recorrer el historial.
+    def __init__(self):
+        self._celdas: Dict[str, Dict[str, int]] = {}
+        self._totales: Dict[str, int] = {}
+        # Las celdas de un producto las protege su cerrojo en el gestor; los
+        # totales por almacén se comparten entre productos
+        self._cerrojo = threading.Lock()
+
+    def vincular(self, producto, almacen_inicial: str):
+        # El stock del producto que no explican sus celdas (stock inicial o datos
+        # anteriores al libro) se asigna a almacen_inicial
+        producto._libro = self
+        resto = producto.stock_actual - sum(self._celdas.get(producto.id, {}).values())
+        if resto:
+            self.mover(producto.id, almacen_inicial, resto)
+
+    def desvincular(self, producto):
+        producto._libro = None
+        with self._cerrojo:
+            for almacen, cantidad in self._celdas.pop(producto.id, {}).items():
+                self._totales[almacen] -= cantidad
+
+    def mover(self, producto_id: str, almacen: str, cantidad: int) -> int:
+        with self._cerrojo:
+            celdas = self._celdas.setdefault(producto_id, {})
+            celdas[almacen] = existencias = celdas.get(almacen, 0) + cantidad
+            self._totales[almacen] = self._totales.get(almacen, 0) + cantidad
+        return existencias
+
+    def existencias(self, producto_id: str, almacen: str) -> int:
+        return self._celdas.get(producto_id, {}).get(almacen, 0)
+
+    def por_producto(self, producto_id: str) -> Dict[str, int]:
+        return dict(self._celdas.get(producto_id, {}))
+
+    def total_almacen(self, almacen: str) -> int:
+        return self._totales.get(almacen, 0)
+
+    def totales(self) -> Dict[str, int]:
+        return dict(self._totales)
+
+    def limpiar(self):
+        with self._cerrojo:
+            self._celdas.clear()
+            self._totales.clear()
+
+    def __iter__(self) -> Iterator[Tuple[str, str, int]]:
+        # (producto_id, almacén, existencias) sobre una copia, como IndiceStockBajo
+        with self._cerrojo:
+            return iter([(producto_id, almacen, cantidad)
+                         for producto_id, celdas in self._celdas.items()
+                         for almacen, cantidad in celdas.items()])
+
+    def __len__(self) -> int:
+        return sum(len(celdas) for celdas in self._celdas.values())
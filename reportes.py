@@ -0,0 +1,170 @@
+import threading
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Reportes calculados agregando el historial (admiten rango de fechas)
+REPORTES_AGREGADOS = ("ventas_por_producto", "rotacion", "movimientos_por_almacen")
+
+
+def _sin_nulos(atributo: str) -> Callable:
+    # Los valores no definidos (None) ordenan antes que cualquier número
+    obtener = attrgetter(atributo)
+    return lambda fila: (obtener(fila) is not None, obtener(fila) or 0)
+
+
+# Claves de orden por tipo de reporte y columna. En movimientos, "id" y "fecha"
+# siguen el orden natural del historial (no necesitan ordenar).
+ORDEN_NATURAL = None
+
+CLAVES_ORDEN: Dict[str, Dict[str, Optional[Callable]]] = {
+    "productos": {
+        "id": attrgetter('id'),
+        "nombre": attrgetter('nombre'),
+        "categoria": attrgetter('categoria.nombre'),
+        "proveedor": attrgetter('proveedor.nombre'),
+        "stock_actual": attrgetter('stock_actual'),
+        "stock_minimo": attrgetter('stock_minimo')
+    },
+    "stock_minimo": {
+        "id": attrgetter('id'),
+        "nombre": attrgetter('nombre'),
+        "stock_actual": attrgetter('stock_actual'),
+        "stock_minimo": attrgetter('stock_minimo'),
+        "diferencia": lambda p: p.stock_actual - p.stock_minimo
+    },
+    "stock_por_almacen": {
+        "id": attrgetter('producto.id'),
+        "nombre": attrgetter('producto.nombre'),
+        "almacen": attrgetter('almacen'),
+        "cantidad": attrgetter('cantidad')
+    },
+    "ventas_por_producto": {
+        "id": attrgetter('producto.id'),
+        "nombre": attrgetter('producto.nombre'),
+        "salidas": attrgetter('salidas'),
+        "unidades": attrgetter('unidades'),
+        "devueltas": attrgetter('devueltas'),
+        "netas": attrgetter('netas')
+    },
+    "rotacion": {
+        "id": attrgetter('producto.id'),
+        "nombre": attrgetter('producto.nombre'),
+        "vendidas": attrgetter('vendidas'),
+        "stock_inicial": attrgetter('stock_inicial'),
+        "stock_final": attrgetter('stock_final'),
+        "stock_medio": attrgetter('stock_medio'),
+        "rotacion": _sin_nulos('rotacion'),
+        "dias_inventario": _sin_nulos('dias_inventario')
+    },
+    "reabastecimiento": {
+        "id": attrgetter('producto.id'),
+        "nombre": attrgetter('producto.nombre'),
+        "stock_actual": attrgetter('producto.stock_actual'),
+        "stock_minimo": attrgetter('producto.stock_minimo'),
+        "consumo_medio": attrgetter('consumo_medio'),
+        "desviacion": attrgetter('desviacion'),
+        "dias_cobertura": _sin_nulos('dias_cobertura'),
+        "punto_pedido": attrgetter('punto_pedido'),
+        "cantidad_sugerida": attrgetter('cantidad_sugerida')
+    },
+    "movimientos_por_almacen": {
+        "almacen": attrgetter('almacen'),
+        "tipo": attrgetter('tipo'),
+        "movimientos": attrgetter('movimientos'),
+        "unidades": attrgetter('unidades')
+    },
+    "movimientos": {
+        "id": ORDEN_NATURAL,
+        "fecha": ORDEN_NATURAL,
+        "tipo": attrgetter('tipo'),
+        "producto": attrgetter('producto.nombre'),
+        "cantidad": attrgetter('cantidad'),
+        "responsable": attrgetter('responsable.nombre'),
+        "almacen": attrgetter('almacen')
+    }
+}
+
+
+def texto_busqueda(tipo: str, entidad) -> str:
+    # Texto sobre el que se aplica el filtro de los reportes (sin distinguir mayúsculas)
+    if tipo == "movimientos":
+        partes = (entidad.id, entidad.tipo, entidad.producto.id, entidad.producto.nombre,
+                  entidad.responsable.nombre, entidad.almacen)
+    elif tipo == "stock_por_almacen":
+        partes = (entidad.producto.id, entidad.producto.nombre, entidad.almacen)
+    elif tipo in ("ventas_por_producto", "rotacion", "reabastecimiento"):
+        partes = (entidad.producto.id, entidad.producto.nombre)
+    elif tipo == "movimientos_por_almacen":
+        partes = (entidad.almacen, entidad.tipo)
+    else:
+        partes = (entidad.id, entidad.nombre, entidad.categoria.nombre, entidad.proveedor.nombre)
+    return " ".join(partes).lower()
+
+
+def clave_orden(tipo: str, orden: Optional[str]) -> Optional[Callable]:
+    if orden is None:
+        return ORDEN_NATURAL
+    try:
+        return CLAVES_ORDEN[tipo][orden]
+    except KeyError:
+        raise ValueError(f"No se puede ordenar el reporte {tipo} por {orden}")
+
+
+class ConsultasPaginadas:
+    # Cachea el resultado filtrado y ordenado de cada consulta mientras la versión
+    # de los datos no cambie, para que pedir páginas sucesivas cueste O(limit).
+    def __init__(self, capacidad: int = 8):
+        self._capacidad = capacidad
+        self._cache: Dict[tuple, List] = {}
+        self._version = None
+        # Los reportes se piden con el cerrojo compartido del gestor: varios
+        # lectores a la vez. El cálculo va fuera de este cerrojo.
+        self._cerrojo = threading.Lock()
+
+    def resolver(self, tipo: str, elementos: Callable[[], Iterable], version,
+                 orden: Optional[str] = None, descendente: bool = False,
+                 filtro: Optional[str] = None, rango=None) -> List:
+        # rango: cualquier valor que distinga subconjuntos de `elementos`
+        # (p. ej. un intervalo de fechas), parte de la clave de la caché
+        consulta = (tipo, orden, descendente, (filtro or "").lower(), rango)
+        with self._cerrojo:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            resultado = self._cache.get(consulta)
+        if resultado is None:
+            resultado = self._calcular(tipo, elementos(), orden, descendente, consulta[3])
+            with self._cerrojo:
+                if version == self._version and consulta not in self._cache:
+                    if len(self._cache) >= self._capacidad:
+                        self._cache.pop(next(iter(self._cache)))
+                    self._cache[consulta] = resultado
+        return resultado
+
+    @staticmethod
+    def _calcular(tipo: str, elementos: Iterable, orden: Optional[str],
+                  descendente: bool, filtro: str) -> List:
+        if filtro:
+            elementos = [e for e in elementos if filtro in texto_busqueda(tipo, e)]
+        else:
+            elementos = list(elementos)
+        clave = clave_orden(tipo, orden)
+        if clave is not ORDEN_NATURAL:
+            elementos.sort(key=clave, reverse=descendente)
+        elif descendente:
+            elementos.reverse()
+        return elementos
+
+
+def validar_pagina(offset: int, limit: Optional[int]):
+    # Común a todos los orígenes: SQLite tomaría un LIMIT negativo como "sin
+    # límite" y un corte de lista, como "todas menos las últimas"
+    if offset < 0:
+        raise ValueError("El desplazamiento no puede ser negativo")
+    if limit is not None and limit < 0:
+        raise ValueError("El límite no puede ser negativo")
+
+
+def paginar(elementos, offset: int = 0, limit: Optional[int] = None) -> List:
+    validar_pagina(offset, limit)
+    return list(elementos[offset:None if limit is None else offset + limit])
@@ -0,0 +1,418 @@
+import asyncio
+import json
+import re
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from importacion import leer_entero
+
+# API HTTP/JSON local sobre GestorInventario, solo con la biblioteca estándar:
+#   GET  /salud
+#   POST /productos             {"id", "nombre", "categoria_id", "proveedor_id", "stock_minimo"}
+#   GET  /productos/<id>
+#   GET  /productos/<id>/stock
+#   POST /movimientos           {"tipo", "producto_id", "cantidad", "responsable_id", "almacen", "motivo"}
+#   POST /movimientos/lote      [{...}, ...] o {"movimientos": [...]}
+#   GET  /reportes/<tipo>?offset=&limit=&orden=&descendente=&filtro=&desde=&hasta=
+#   GET  /buscar/<coleccion>?texto=&limite=
+# HTTP/1.1 con keep-alive y peticiones encadenadas (pipelining): cada conexión
+# procesa varias a la vez y responde en el orden en que llegaron.
+
+MAX_CABECERAS = 64 * 1024
+MAX_CUERPO = 16 * 1024 * 1024
+MAX_EN_VUELO = 32            # peticiones encadenadas pendientes por conexión
+MAX_LOTE_ESCRITURA = 256     # escrituras que el escritor ejecuta por viaje a su hilo
+LIMITE_PAGINA = 100
+MAX_LIMITE_PAGINA = 1000
+SEGUNDOS_INACTIVIDAD = 60
+
+ESTADOS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error", 501: "Not Implemented"
+}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class Peticion:
+    __slots__ = ('metodo', 'ruta', 'consulta', 'mantener', 'cuerpo')
+
+    def __init__(self, metodo: str, ruta: str, consulta: Dict[str, List[str]], mantener: bool,
+                 cuerpo: bytes):
+        self.metodo = metodo
+        self.ruta = ruta
+        self.consulta = consulta
+        self.mantener = mantener  # keep-alive
+        self.cuerpo = cuerpo
+
+    def json(self):
+        try:
+            return json.loads(self.cuerpo)
+        except ValueError:
+            raise ErrorHTTP(400, "El cuerpo no es JSON válido")
+
+    def parametro(self, nombre: str, defecto=None):
+        valores = self.consulta.get(nombre)
+        return valores[0] if valores else defecto
+
+
+class ServidorInventario:
+    # Las lecturas corren en un pool de hilos (el gestor las deja ir en
+    # paralelo con su cerrojo compartido). Las escrituras pasan todas por una
+    # cola que vacía una única tarea escritora, en orden de llegada y por
+    # lotes en su propio hilo: no compiten entre sí por el cerrojo exclusivo
+    # ni ocupan los hilos de lectura. Dentro de una conexión, una lectura
+    # espera a las escrituras anteriores de esa misma conexión.
+    def __init__(self, gestor, hilos_lectura: int = 4):
+        self.gestor = gestor
+        self._lecturas = ThreadPoolExecutor(hilos_lectura, thread_name_prefix="api-lectura")
+        self._hilo_escritor = ThreadPoolExecutor(1, thread_name_prefix="api-escritura")
+        self._cola_escrituras: Optional[asyncio.Queue] = None
+        self._escritor = None
+        self._servidor = None
+        # (método, patrón de la ruta, manejador, escribe)
+        self._rutas: List[Tuple[str, re.Pattern, Callable, bool]] = [
+            (metodo, re.compile(patron), manejador, escribe)
+            for metodo, patron, manejador, escribe in (
+                ("GET", r"/salud", self._salud, False),
+                ("POST", r"/productos", self._registrar_producto, True),
+                ("GET", r"/productos/([^/]+)", self._producto, False),
+                ("GET", r"/productos/([^/]+)/stock", self._stock, False),
+                ("POST", r"/movimientos", self._registrar_movimiento, True),
+                ("POST", r"/movimientos/lote", self._registrar_lote, True),
+                ("GET", r"/reportes/([^/]+)", self._reporte, False),
+                ("GET", r"/buscar/([^/]+)", self._buscar, False),
+            )
+        ]
+
+    async def iniciar(self, host: str = "127.0.0.1", puerto: int = 8080):
+        self._cola_escrituras = asyncio.Queue()
+        self._escritor = asyncio.create_task(self._escribir())
+        self._servidor = await asyncio.start_server(self._atender, host, puerto, limit=MAX_CABECERAS)
+        return self._servidor
+
+    @property
+    def direcciones(self) -> List[tuple]:
+        return [s.getsockname() for s in self._servidor.sockets]
+
+    async def servir(self):
+        await self._servidor.serve_forever()
+
+    async def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._escritor is not None:
+            self._escritor.cancel()
+        self._lecturas.shutdown(wait=False, cancel_futures=True)
+        self._hilo_escritor.shutdown(wait=True)
+
+    # --- Conexiones -----------------------------------------------------
+
+    async def _atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        # Este bucle lee y despacha; _emitir espera cada respuesta en orden y
+        # la escribe. La cola acotada frena a un cliente que encadena sin leer.
+        respuestas = asyncio.Queue(MAX_EN_VUELO)
+        emisor = asyncio.create_task(self._emitir(respuestas, escritor))
+        ultima_escritura = None
+        try:
+            while not escritor.is_closing():
+                try:
+                    peticion = await asyncio.wait_for(_leer_peticion(lector), SEGUNDOS_INACTIVIDAD)
+                except ErrorHTTP as e:
+                    await respuestas.put((_completada(e.estado, {"error": str(e)}), False))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if peticion is None:
+                    break
+                respuesta, escribe = self._despachar(peticion, ultima_escritura)
+                if escribe:
+                    ultima_escritura = respuesta
+                await respuestas.put((respuesta, peticion.mantener))
+                if not peticion.mantener:
+                    break
+        finally:
+            await respuestas.put(None)
+            await emisor
+            escritor.close()
+
+    @staticmethod
+    async def _emitir(respuestas: asyncio.Queue, escritor: asyncio.StreamWriter):
+        # Las respuestas ya listas se escriben juntas (una llamada al sistema
+        # para varias peticiones encadenadas). Se vacía la cola hasta el final
+        # aunque la conexión se rompa, para no bloquear al lector.
+        salida = []
+        abierta = True
+        while True:
+            elemento = await respuestas.get()
+            if elemento is None:
+                await _volcar(escritor, salida, abierta)
+                return
+            respuesta, mantener = elemento
+            if salida and not respuesta.done():
+                abierta = await _volcar(escritor, salida, abierta)
+            estado, cuerpo = await respuesta
+            if abierta:
+                salida.append(_serializar(estado, cuerpo, mantener))
+            if respuestas.empty() or not mantener:
+                abierta = await _volcar(escritor, salida, abierta)
+            if not mantener:
+                abierta = False
+
+    def _despachar(self, peticion: Peticion, ultima_escritura) -> Tuple[asyncio.Future, bool]:
+        try:
+            manejador, escribe, argumentos = self._resolver_ruta(peticion)
+        except ErrorHTTP as e:
+            return _completada(e.estado, {"error": str(e)}), False
+        trabajo = partial(manejador, peticion, *argumentos)
+        if escribe:
+            futuro = asyncio.get_running_loop().create_future()
+            self._cola_escrituras.put_nowait((trabajo, futuro))
+            return asyncio.ensure_future(_responder(futuro)), True
+        return asyncio.ensure_future(_responder(self._leer(trabajo, ultima_escritura))), False
+
+    async def _leer(self, trabajo: Callable, ultima_escritura):
+        if ultima_escritura is not None and not ultima_escritura.done():
+            await asyncio.wait((ultima_escritura,))
+        return await asyncio.get_running_loop().run_in_executor(self._lecturas, trabajo)
+
+    async def _escribir(self):
+        # Única tarea escritora: toma lo que haya en la cola y lo ejecuta de
+        # una vez en su hilo; cada petición recibe su propio resultado o error
+        bucle = asyncio.get_running_loop()
+        while True:
+            lote = [await self._cola_escrituras.get()]
+            while len(lote) < MAX_LOTE_ESCRITURA and not self._cola_escrituras.empty():
+                lote.append(self._cola_escrituras.get_nowait())
+            resultados = await bucle.run_in_executor(self._hilo_escritor, _ejecutar_lote,
+                                                     [trabajo for trabajo, _ in lote])
+            for (_, futuro), (correcto, valor) in zip(lote, resultados):
+                if futuro.cancelled():
+                    continue
+                if correcto:
+                    futuro.set_result(valor)
+                else:
+                    futuro.set_exception(valor)
+
+    def _resolver_ruta(self, peticion: Peticion) -> Tuple[Callable, bool, tuple]:
+        ruta_conocida = False
+        for metodo, patron, manejador, escribe in self._rutas:
+            coincidencia = patron.fullmatch(peticion.ruta)
+            if coincidencia is None:
+                continue
+            if metodo == peticion.metodo:
+                return manejador, escribe, coincidencia.groups()
+            ruta_conocida = True
+        if ruta_conocida:
+            raise ErrorHTTP(405, f"Método {peticion.metodo} no admitido en {peticion.ruta}")
+        raise ErrorHTTP(404, f"Ruta no encontrada: {peticion.ruta}")
+
+    # --- Manejadores (en hilos: devuelven (estado, cuerpo)) ---------------
+
+    def _salud(self, peticion: Peticion):
+        return 200, {"estado": "ok", "productos": len(self.gestor.productos),
+                     "movimientos": len(self.gestor.movimientos)}
+
+    def _registrar_producto(self, peticion: Peticion):
+        datos = _objeto(peticion.json())
+        producto = self.gestor.registrar_producto(
+            _texto(datos, 'id'), _texto(datos, 'nombre'), _texto(datos, 'categoria_id'),
+            _texto(datos, 'proveedor_id'), _entero(datos.get('stock_minimo'), 'stock_minimo'))
+        return 201, producto.to_dict()
+
+    def _producto(self, peticion: Peticion, producto_id: str):
+        producto = self.gestor.buscar_producto(producto_id)
+        if producto is None:
+            raise ErrorHTTP(404, "Producto no encontrado")
+        return 200, producto.to_dict()
+
+    def _stock(self, peticion: Peticion, producto_id: str):
+        producto = self.gestor.buscar_producto(producto_id)
+        if producto is None:
+            raise ErrorHTTP(404, "Producto no encontrado")
+        return 200, {"producto": producto.id, "stock_actual": producto.stock_actual,
+                     "stock_minimo": producto.stock_minimo,
+                     "stock_valido": self.gestor.validar_stock(producto_id),
+                     "por_almacen": self.gestor.stock_por_almacen(producto_id)}
+
+    def _registrar_movimiento(self, peticion: Peticion):
+        datos = _objeto(peticion.json())
+        resultado = self.gestor.registrar_movimiento(
+            _texto(datos, 'tipo'), _texto(datos, 'producto_id'),
+            _entero(datos.get('cantidad'), 'cantidad'), _texto(datos, 'responsable_id'),
+            datos.get('almacen') or "", datos.get('motivo'))
+        return 201, {"resultado": resultado}
+
+    def _registrar_lote(self, peticion: Peticion):
+        datos = peticion.json()
+        filas = datos.get('movimientos') if isinstance(datos, dict) else datos
+        if not isinstance(filas, list) or not all(isinstance(f, dict) for f in filas):
+            raise ErrorHTTP(400, "Se esperaba una lista de movimientos")
+        resultado = self.gestor.registrar_movimientos_lote(filas)
+        cuerpo = {"aplicados": resultado.aplicados,
+                  "errores": [{"fila": n, "error": error} for n, error in resultado.errores]}
+        return (200 if resultado.exito else 422), cuerpo
+
+    def _reporte(self, peticion: Peticion, tipo: str):
+        offset = _entero(peticion.parametro('offset', 0), 'offset', minimo=0)
+        limit = min(_entero(peticion.parametro('limit', LIMITE_PAGINA), 'limit', minimo=1),
+                    MAX_LIMITE_PAGINA)
+        orden = peticion.parametro('orden')
+        descendente = peticion.parametro('descendente', '').lower() in ('1', 'true', 'si', 'sí')
+        filtro = peticion.parametro('filtro')
+        desde = _fecha(peticion.parametro('desde'), 'desde')
+        hasta = _fecha(peticion.parametro('hasta'), 'hasta')
+        filas = self.gestor.generar_reporte(tipo, offset, limit, orden, descendente, filtro, desde, hasta)
+        return 200, {"total": self.gestor.contar_reporte(tipo, filtro, desde, hasta),
+                     "offset": offset, "limit": limit, "filas": filas}
+
+    def _buscar(self, peticion: Peticion, coleccion: str):
+        limite = min(_entero(peticion.parametro('limite', 10), 'limite', minimo=1), MAX_LIMITE_PAGINA)
+        encontradas = self.gestor.buscar(coleccion, peticion.parametro('texto', ''), limite)
+        return 200, [e.to_dict() for e in encontradas]
+
+
+async def _leer_peticion(lector: asyncio.StreamReader) -> Optional[Peticion]:
+    # None si el cliente cerró la conexión entre peticiones
+    try:
+        cabecera = await lector.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise ErrorHTTP(400, "Petición incompleta")
+    except asyncio.LimitOverrunError:
+        raise ErrorHTTP(431, "Cabeceras demasiado grandes")
+    # Se toleran líneas vacías sueltas entre peticiones encadenadas
+    lineas = cabecera.decode('latin-1').lstrip("\r\n").split("\r\n")
+    try:
+        metodo, destino, version = lineas[0].split(" ")
+    except ValueError:
+        raise ErrorHTTP(400, "Línea de petición no válida")
+    cabeceras = {}
+    for linea in lineas[1:]:
+        if not linea:
+            continue
+        nombre, separador, valor = linea.partition(":")
+        if not separador:
+            raise ErrorHTTP(400, "Cabecera no válida")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+    if cabeceras.get('transfer-encoding', 'identity').lower() != 'identity':
+        raise ErrorHTTP(501, "Solo se admiten cuerpos con Content-Length")
+    try:
+        longitud = int(cabeceras.get('content-length', 0))
+    except ValueError:
+        raise ErrorHTTP(400, "Content-Length no válido")
+    if longitud < 0:
+        raise ErrorHTTP(400, "Content-Length no válido")
+    if longitud > MAX_CUERPO:
+        raise ErrorHTTP(413, "Cuerpo demasiado grande")
+    cuerpo = await lector.readexactly(longitud) if longitud else b""
+    conexion = cabeceras.get('connection', '').lower()
+    mantener = conexion != 'close' if version == 'HTTP/1.1' else conexion == 'keep-alive'
+    partes = urlsplit(destino)
+    return Peticion(metodo, unquote(partes.path), parse_qs(partes.query), mantener, cuerpo)
+
+
+async def _volcar(escritor: asyncio.StreamWriter, salida: list, abierta: bool) -> bool:
+    if abierta and salida:
+        try:
+            escritor.write(b"".join(salida))
+            await escritor.drain()
+        except ConnectionError:
+            escritor.close()
+            abierta = False
+    salida.clear()
+    return abierta
+
+
+def _serializar(estado: int, cuerpo, mantener: bool) -> bytes:
+    datos = json.dumps(cuerpo, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+    cabecera = (f"HTTP/1.1 {estado} {ESTADOS.get(estado, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(datos)}\r\n"
+                f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+    return cabecera.encode('latin-1') + datos
+
+
+async def _responder(trabajo) -> Tuple[int, object]:
+    # Los errores del gestor (ValueError) son errores del cliente
+    try:
+        return await trabajo
+    except ErrorHTTP as e:
+        return e.estado, {"error": str(e)}
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        return 500, {"error": "Error interno del servidor"}
+
+
+def _completada(estado: int, cuerpo) -> asyncio.Future:
+    futuro = asyncio.get_running_loop().create_future()
+    futuro.set_result((estado, cuerpo))
+    return futuro
+
+
+def _ejecutar_lote(trabajos: List[Callable]) -> List[Tuple[bool, object]]:
+    resultados = []
+    for trabajo in trabajos:
+        try:
+            resultados.append((True, trabajo()))
+        except Exception as e:
+            resultados.append((False, e))
+    return resultados
+
+
+def _objeto(datos) -> dict:
+    if not isinstance(datos, dict):
+        raise ErrorHTTP(400, "Se esperaba un objeto JSON")
+    return datos
+
+
+def _texto(datos: dict, campo: str) -> str:
+    valor = datos.get(campo)
+    if not isinstance(valor, str) or not valor:
+        raise ErrorHTTP(400, f"Falta el campo {campo}")
+    return valor
+
+
+def _entero(valor, campo: str, minimo: int = None) -> int:
+    try:
+        entero = leer_entero(valor)
+    except ValueError:
+        raise ErrorHTTP(400, f"{campo} debe ser un entero")
+    if minimo is not None and entero < minimo:
+        raise ErrorHTTP(400, f"{campo} debe ser como mínimo {minimo}")
+    return entero
+
+
+def _fecha(texto: Optional[str], campo: str) -> Optional[datetime]:
+    if not texto:
+        return None
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        raise ErrorHTTP(400, f"{campo} no es una fecha válida (use AAAA-MM-DD[THH:MM:SS])")
+
+
+async def servir(gestor, host: str = "127.0.0.1", puerto: int = 8080, al_iniciar=None):
+    # Atiende hasta que se cancele (Ctrl+C con asyncio.run)
+    servidor = ServidorInventario(gestor)
+    await servidor.iniciar(host, puerto)
+    if al_iniciar is not None:
+        al_iniciar(servidor)
+    try:
+        await servidor.servir()
+    finally:
+        await servidor.cerrar()
@@ -1,5 +1,10 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from datetime import datetime, time
+from tkinter import ttk, messagebox, filedialog
+from ejecutor import Ejecutor
+from importacion import leer_movimientos
+from reportes import REPORTES_AGREGADOS
+from widgets import CampoBusqueda, TablaVirtual
 # Eliminado: 'from controlador import GestorInventario' (no se usa directamente en la vista)
 
 class InventarioVista:
@@ -7,8 +12,15 @@ class InventarioVista:
         self.root = root
         self.controlador = controlador
         self.frame_reporte = None  # Inicializado en __init__
+        self._solicitud_reporte = None
+        self._reporte_actual = None  # (tipo, desde, hasta, TablaVirtual o None)
         self.widgets = {}  # Inicializado en __init__
         self.labels = {}  # Inicializado en __init__
+        # Las operaciones del controlador corren fuera del hilo de Tk
+        self.ejecutor = Ejecutor(root)
+        if self.controlador.metricas_activas:
+            self.ejecutor.metricas = self.controlador.activar_metricas()
+        self._diagnostico = None  # Toplevel del panel de diagnóstico
         self.configurar_interfaz()
 
     def configurar_interfaz(self):
@@ -29,7 +41,11 @@ class InventarioVista:
             ("Gestión de Productos", self.mostrar_formulario_producto),
             ("Registrar Movimiento", self.mostrar_formulario_movimiento),
             ("Generar Reportes", self.mostrar_reportes),
-            ("Salir", self.root.quit)
+            ("Importar Movimientos", self.importar_movimientos),
+            ("Guardar Datos", self.guardar_datos),
+            ("Cargar Datos", self.cargar_datos),
+            ("Diagnóstico", self.mostrar_diagnostico),
+            ("Salir", self.salir)
         ]
 
         for texto, comando in opciones:
@@ -43,10 +59,8 @@ class InventarioVista:
             [
                 ("ID Producto:", "entry", "entry_id"),
                 ("Nombre:", "entry", "entry_nombre"),
-                ("Categoría:", "combo", "combo_categoria",
-                 [f"{c.id} - {c.nombre}" for c in self.controlador.categorias]),
-                ("Proveedor:", "combo", "combo_proveedor",
-                 [f"{p.id} - {p.nombre}" for p in self.controlador.proveedores]),
+                ("Categoría:", "busqueda", "combo_categoria", "categorias"),
+                ("Proveedor:", "busqueda", "combo_proveedor", "proveedores"),
                 ("Stock Mínimo:", "entry", "entry_stock_min")
             ],
             self.guardar_producto
@@ -55,18 +69,26 @@ class InventarioVista:
     def guardar_producto(self):
         try:
             datos = {
-                'id': self.widgets["entry_id"].get(),
+                '_id': self.widgets["entry_id"].get(),
                 'nombre': self.widgets["entry_nombre"].get(),
                 'categoria_id': self.widgets["combo_categoria"].get().split(" - ")[0],
                 'proveedor_id': self.widgets["combo_proveedor"].get().split(" - ")[0],
                 'stock_minimo': int(self.widgets["entry_stock_min"].get())
             }
 
-            self.controlador.registrar_producto(**datos)
-            messagebox.showinfo("Éxito", "Producto registrado correctamente")
-            self.crear_menu_principal()
+            self.ejecutor.enviar(self.controlador.registrar_producto, **datos,
+                                 al_terminar=lambda _: self._exito("Producto registrado correctamente"),
+                                 al_error=self._mostrar_error)
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self._mostrar_error(e)
+
+    def _exito(self, mensaje: str):
+        messagebox.showinfo("Éxito", mensaje)
+        self.crear_menu_principal()
+
+    @staticmethod
+    def _mostrar_error(error):
+        messagebox.showerror("Error", str(error))
 
     def mostrar_formulario_movimiento(self):
         self.limpiar_pantalla()
@@ -74,11 +96,9 @@ class InventarioVista:
             "Registrar Movimiento de Inventario",
             [
                 ("Tipo Movimiento:", "combo", "combo_tipo", ["Entrada", "Salida", "Devolución"]),
-                ("Producto:", "combo", "combo_producto",
-                 [f"{p.id} - {p.nombre}" for p in self.controlador.productos]),
+                ("Producto:", "busqueda", "combo_producto", "productos"),
                 ("Cantidad:", "entry", "entry_cantidad"),
-                ("Responsable:", "combo", "combo_responsable",
-                 [f"{r.id} - {r.nombre}" for r in self.controlador.responsables]),
+                ("Responsable:", "busqueda", "combo_responsable", "responsables"),
                 ("Almacén:", "entry", "entry_almacen"),
                 ("Motivo (solo devolución):", "entry", "entry_motivo")
             ],
@@ -118,11 +138,175 @@ class InventarioVista:
                 if not datos['motivo']:
                     raise ValueError("Debe especificar un motivo para la devolución")
 
-            resultado = self.controlador.registrar_movimiento(**datos)
-            messagebox.showinfo("Éxito", resultado)
-            self.crear_menu_principal()
+            self.ejecutor.enviar(self.controlador.registrar_movimiento, **datos,
+                                 al_terminar=self._exito, al_error=self._mostrar_error)
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self._mostrar_error(e)
+
+    def importar_movimientos(self):
+        ruta = filedialog.askopenfilename(
+            title="Importar movimientos",
+            filetypes=[("Volcados de escáner", "*.csv *.jsonl"), ("Todos", "*.*")])
+        if not ruta:
+            return
+
+        def importar(tarea):
+            return self.controlador.registrar_movimientos_lote(tarea.seguir(leer_movimientos(ruta)))
+
+        def al_terminar(resultado):
+            if resultado.exito:
+                messagebox.showinfo("Éxito", str(resultado))
+            else:
+                detalle = "\n".join(f"Fila {n}: {error}" for n, error in resultado.errores[:20])
+                messagebox.showerror("Error", f"{resultado}\n\n{detalle}")
+
+        self._ejecutar_con_progreso("Importando movimientos...", importar, al_terminar)
+
+    def guardar_datos(self):
+        ruta = filedialog.asksaveasfilename(title="Guardar datos", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if ruta:
+            self._ejecutar_con_progreso(
+                "Guardando datos...", lambda tarea: self.controlador.guardar_datos(ruta),
+                lambda _: messagebox.showinfo("Éxito", "Datos guardados correctamente"))
+
+    def cargar_datos(self):
+        ruta = filedialog.askopenfilename(title="Cargar datos", filetypes=[("JSON", "*.json")])
+        if ruta:
+            self._ejecutar_con_progreso(
+                "Cargando datos...", lambda tarea: self.controlador.cargar_datos(ruta),
+                lambda _: self._exito("Datos cargados"))
+
+    def _ejecutar_con_progreso(self, titulo: str, funcion, al_terminar):
+        # Diálogo modal con barra de progreso y botón de cancelar; `funcion` recibe
+        # la Tarea y puede recorrer sus datos con tarea.seguir() para informar y cancelar
+        dialogo = tk.Toplevel(self.root)
+        dialogo.title(titulo)
+        dialogo.transient(self.root)
+        dialogo.resizable(False, False)
+        tk.Label(dialogo, text=titulo).pack(padx=20, pady=(15, 5))
+        barra = ttk.Progressbar(dialogo, mode="indeterminate", length=300)
+        barra.pack(padx=20, pady=5)
+        barra.start(15)
+        estado = tk.Label(dialogo, text="")
+        estado.pack(padx=20)
+
+        def cerrar():
+            barra.stop()
+            dialogo.destroy()
+
+        def al_progreso(procesados, total):
+            if total:
+                barra.stop()
+                barra.configure(mode="determinate", maximum=total, value=procesados)
+            estado.config(text=f"{procesados} registros procesados")
+
+        def terminar(resultado):
+            cerrar()
+            al_terminar(resultado)
+
+        def fallar(error):
+            cerrar()
+            self._mostrar_error(error)
+
+        tarea = self.ejecutor.enviar(funcion, al_terminar=terminar, al_error=fallar,
+                                     al_progreso=al_progreso, con_tarea=True)
+
+        def cancelar():
+            tarea.cancelar()
+            cerrar()
+
+        tk.Button(dialogo, text="Cancelar", command=cancelar).pack(pady=10)
+        dialogo.protocol("WM_DELETE_WINDOW", cancelar)
+        dialogo.grab_set()
+
+    def mostrar_diagnostico(self):
+        # Ventana aparte (no modal) con las métricas del controlador, refrescadas cada segundo
+        if self._diagnostico is not None and self._diagnostico.winfo_exists():
+            self._diagnostico.lift()
+            return
+        ventana = self._diagnostico = tk.Toplevel(self.root)
+        ventana.title("Diagnóstico")
+        ventana.geometry("760x480")
+
+        barra = tk.Frame(ventana)
+        barra.pack(fill=tk.X, padx=10, pady=5)
+        activas = tk.BooleanVar(value=self.controlador.metricas_activas)
+
+        def alternar():
+            if activas.get():
+                self.ejecutor.metricas = self.controlador.activar_metricas()
+            else:
+                self.controlador.desactivar_metricas()
+                self.ejecutor.metricas = None
+
+        tk.Checkbutton(barra, text="Instrumentación activa", variable=activas,
+                       command=alternar).pack(side=tk.LEFT)
+        tk.Button(barra, text="Reiniciar", command=self.controlador.reiniciar_metricas).pack(side=tk.LEFT, padx=5)
+        tk.Label(barra, text="Perfilar").pack(side=tk.LEFT, padx=(15, 0))
+        operaciones = tk.Spinbox(barra, from_=1, to=100000, width=7)
+        operaciones.delete(0, tk.END)
+        operaciones.insert(0, "100")
+        operaciones.pack(side=tk.LEFT, padx=5)
+
+        def perfilar():
+            try:
+                self.controlador.perfilar(int(operaciones.get()))
+            except ValueError as e:
+                self._mostrar_error(e)
+                return
+            activas.set(True)
+            self.ejecutor.metricas = self.controlador.activar_metricas()
+
+        tk.Button(barra, text="operaciones", command=perfilar).pack(side=tk.LEFT)
+
+        def volcar():
+            ruta = filedialog.asksaveasfilename(parent=ventana, title="Exportar métricas",
+                                                defaultextension=".prom",
+                                                filetypes=[("Prometheus", "*.prom"), ("Texto", "*.txt")])
+            if ruta:
+                try:
+                    self.controlador.volcar_metricas(ruta)
+                except OSError as e:
+                    self._mostrar_error(e)
+
+        tk.Button(barra, text="Exportar Prometheus...", command=volcar).pack(side=tk.RIGHT)
+
+        columnas = ("operacion", "llamadas", "errores", "media_ms", "p50_ms", "p99_ms", "max_ms")
+        arbol = ttk.Treeview(ventana, columns=columnas, show="headings", height=12)
+        for col in columnas:
+            arbol.heading(col, text=col.replace("_", " ").capitalize())
+            arbol.column(col, width=260 if col == "operacion" else 70,
+                         anchor=tk.W if col == "operacion" else tk.E)
+        arbol.pack(fill=tk.BOTH, expand=True, padx=10)
+        estado = tk.Label(ventana, anchor=tk.W)
+        estado.pack(fill=tk.X, padx=10)
+        perfil = tk.Text(ventana, height=8, font=("Courier", 9))
+        perfil.pack(fill=tk.BOTH, padx=10, pady=(0, 10))
+
+        def refrescar(ultimo_perfil=None):
+            if not ventana.winfo_exists():
+                return
+            datos = self.controlador.metricas()
+            arbol.delete(*arbol.get_children())
+            for nombre, serie in datos['operaciones'].items():
+                arbol.insert("", tk.END, values=(
+                    nombre, serie['llamadas'], serie['errores'], f"{serie['media_ms']:.3f}",
+                    f"{serie['p50_ms']:.3f}", f"{serie['p99_ms']:.3f}", f"{serie['max_ms']:.3f}"))
+            texto = "activa" if datos['activas'] else "inactiva"
+            if datos['perfilando']:
+                texto += f" · perfilando: faltan {datos['perfilando']} operaciones"
+            estado.config(text=f"Instrumentación {texto}")
+            if datos['perfil'] is not ultimo_perfil:
+                perfil.delete("1.0", tk.END)
+                perfil.insert("1.0", datos['perfil'] or "")
+            ventana.after(1000, refrescar, datos['perfil'])
+
+        refrescar()
+
+    def salir(self):
+        self.ejecutor.cerrar()
+        self.root.quit()
 
     def mostrar_reportes(self):
         self.limpiar_pantalla()
@@ -139,6 +323,18 @@ class InventarioVista:
                  command=lambda: self.mostrar_reporte("movimientos")).pack(pady=5)
         tk.Button(frame_opciones, text="Productos con Stock Bajo",
                  command=lambda: self.mostrar_reporte("stock_minimo")).pack(pady=5)
+        tk.Button(frame_opciones, text="Stock por Almacén",
+                 command=lambda: self.mostrar_reporte("stock_por_almacen")).pack(pady=5)
+        tk.Button(frame_opciones, text="Ventas por Producto",
+                 command=lambda: self.mostrar_reporte("ventas_por_producto")).pack(pady=5)
+        tk.Button(frame_opciones, text="Rotación de Inventario",
+                 command=lambda: self.mostrar_reporte("rotacion")).pack(pady=5)
+        tk.Button(frame_opciones, text="Movimientos por Almacén",
+                 command=lambda: self.mostrar_reporte("movimientos_por_almacen")).pack(pady=5)
+        tk.Button(frame_opciones, text="Reabastecimiento",
+                 command=lambda: self.mostrar_reporte("reabastecimiento")).pack(pady=5)
+        tk.Button(frame_opciones, text="Exportar...",
+                 command=self.exportar_reporte).pack(pady=(15, 5))
 
         tk.Button(self.root, text="Volver al Menú Principal",
                  command=self.crear_menu_principal).pack(pady=20)
@@ -146,85 +342,241 @@ class InventarioVista:
         self.frame_reporte = tk.Frame(self.root)
         self.frame_reporte.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-    def mostrar_reporte(self, tipo: str):
+    def mostrar_reporte(self, tipo: str, desde: datetime = None, hasta: datetime = None):
         for widget in self.frame_reporte.winfo_children():
             widget.destroy()
 
         try:
-            datos = self.controlador.generar_reporte(tipo)
-
-            if not datos:
+            columnas, formatear = self._formato_reporte(tipo)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if tipo == "movimientos" or tipo in REPORTES_AGREGADOS:
+            self._barra_fechas(tipo, desde, hasta)
+        elif tipo == "reabastecimiento":
+            self._barra_reabastecimiento()
+        self._reporte_actual = (tipo, desde, hasta, None)
+
+        def obtener_pagina(offset, limit, orden, descendente, filtro):
+            datos = self.controlador.generar_reporte(tipo, offset, limit, orden, descendente,
+                                                     filtro, desde, hasta)
+            return [formatear(item) for item in datos]
+
+        def al_contar(total):
+            # Ignorar la respuesta si entretanto se pidió otro reporte
+            if self._solicitud_reporte is not solicitud or not self.frame_reporte.winfo_exists():
+                return
+            cargando.destroy()
+            if total == 0:
                 tk.Label(self.frame_reporte, text="No hay datos para mostrar").pack()
                 return
+            tabla = TablaVirtual(self.frame_reporte, columnas, obtener_pagina,
+                                 lambda filtro: self.controlador.contar_reporte(tipo, filtro, desde, hasta),
+                                 pedir=self._pedir)
+            tabla.pack(fill=tk.BOTH, expand=True)
+            self._reporte_actual = (tipo, desde, hasta, tabla)
+
+        solicitud = self._solicitud_reporte = object()
+        cargando = tk.Label(self.frame_reporte, text="Generando reporte...")
+        cargando.pack()
+        self._pedir(lambda: self.controlador.contar_reporte(tipo, None, desde, hasta), al_contar)
+
+    def exportar_reporte(self):
+        # Exporta el reporte en pantalla con su orden, filtro y rango de fechas
+        if self._reporte_actual is None:
+            messagebox.showerror("Error", "Primero genere un reporte")
+            return
+        tipo, desde, hasta, tabla = self._reporte_actual
+        ruta = filedialog.asksaveasfilename(
+            title="Exportar reporte", defaultextension=".csv", initialfile=f"{tipo}.csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"),
+                       ("Comprimido", "*.csv.gz *.jsonl.gz")])
+        if not ruta:
+            return
+        orden, descendente, filtro = None, False, None
+        if tabla is not None:
+            orden, descendente, filtro = tabla.orden, tabla.descendente, tabla.filtro or None
+
+        def exportar(tarea):
+            return self.controlador.exportar_reporte(tipo, ruta, orden, descendente, filtro,
+                                                     desde, hasta, tarea=tarea)
+
+        self._ejecutar_con_progreso(
+            "Exportando reporte...", exportar,
+            lambda filas: messagebox.showinfo("Éxito", f"{filas} filas exportadas"))
+
+    def _barra_fechas(self, tipo: str, desde, hasta):
+        # Rango de fechas del historial (AAAA-MM-DD, opcional en ambos extremos)
+        barra = tk.Frame(self.frame_reporte)
+        barra.pack(fill=tk.X, pady=(0, 5))
+        entradas = []
+        for texto, valor in (("Desde:", desde), ("Hasta:", hasta)):
+            tk.Label(barra, text=texto).pack(side=tk.LEFT)
+            entrada = tk.Entry(barra, width=12)
+            if valor is not None:
+                entrada.insert(0, valor.date().isoformat())
+            entrada.pack(side=tk.LEFT, padx=5)
+            entradas.append(entrada)
+
+        def aplicar():
+            try:
+                desde = self._leer_fecha(entradas[0].get())
+                hasta = self._leer_fecha(entradas[1].get(), fin_del_dia=True)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            self.mostrar_reporte(tipo, desde, hasta)
 
-            tree = ttk.Treeview(self.frame_reporte)
-            scrollbar = ttk.Scrollbar(self.frame_reporte, orient=tk.VERTICAL, command=tree.yview)
-            tree.configure(yscroll=scrollbar.set)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            tree.pack(fill=tk.BOTH, expand=True)
+        tk.Button(barra, text="Aplicar", command=aplicar).pack(side=tk.LEFT, padx=5)
+        tk.Button(barra, text="Todo",
+                  command=lambda: self.mostrar_reporte(tipo)).pack(side=tk.LEFT)
 
-            if tipo == "productos":
-                self._configurar_treeview_productos(tree, datos)
-            elif tipo == "movimientos":
-                self._configurar_treeview_movimientos(tree, datos)
-            elif tipo == "stock_minimo":
-                self._configurar_treeview_stock(tree, datos)
+    def _barra_reabastecimiento(self):
+        barra = tk.Frame(self.frame_reporte)
+        barra.pack(fill=tk.X, pady=(0, 5))
 
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        def aplicar():
+            if not messagebox.askyesno(
+                    "Confirmar", "¿Fijar el stock mínimo de los productos con ventas recientes "
+                                 "en su punto de pedido sugerido?"):
+                return
 
-    @staticmethod
-    def _configurar_columnas(tree, columnas):
-        tree["columns"] = columnas
-        tree.heading("#0", text="Ítem")
-        tree.column("#0", width=50, stretch=tk.NO)
+            def al_terminar(cambiados):
+                messagebox.showinfo("Éxito", f"Stock mínimo actualizado en {cambiados} productos")
+                self.mostrar_reporte("reabastecimiento")
 
-        for col in columnas:
-            tree.heading(col, text=col.capitalize().replace("_", " "))
-            tree.column(col, width=100, anchor=tk.W)
+            self.ejecutor.enviar(self.controlador.aplicar_stock_minimo_sugerido,
+                                 al_terminar=al_terminar, al_error=self._mostrar_error)
+
+        tk.Button(barra, text="Aplicar stock mínimo sugerido",
+                  command=aplicar).pack(side=tk.LEFT, padx=5)
+
+    @staticmethod
+    def _leer_fecha(texto: str, fin_del_dia: bool = False):
+        texto = texto.strip()
+        if not texto:
+            return None
+        try:
+            fecha = datetime.fromisoformat(texto)
+        except ValueError:
+            raise ValueError("Fecha no válida (use AAAA-MM-DD)")
+        if fin_del_dia and len(texto) == 10:
+            fecha = datetime.combine(fecha.date(), time.max)
+        return fecha
 
-    def _configurar_treeview_productos(self, tree, datos):
+    @staticmethod
+    def _columnas(claves):
+        return [(col, col.capitalize().replace("_", " ")) for col in claves]
+
+    def _formato_reporte(self, tipo):
+        if tipo == "productos":
+            return self._formato_productos()
+        elif tipo == "movimientos":
+            return self._formato_movimientos()
+        elif tipo == "stock_minimo":
+            return self._formato_stock()
+        elif tipo == "stock_por_almacen":
+            return self._formato_stock_por_almacen()
+        elif tipo == "ventas_por_producto":
+            return self._formato_ventas()
+        elif tipo == "rotacion":
+            return self._formato_rotacion()
+        elif tipo == "movimientos_por_almacen":
+            return self._formato_movimientos_por_almacen()
+        elif tipo == "reabastecimiento":
+            return self._formato_reabastecimiento()
+        raise ValueError("Tipo de reporte no válido")
+
+    def _formato_productos(self):
         columnas = ("id", "nombre", "categoria", "proveedor", "stock_actual", "stock_minimo")
-        self._configurar_columnas(tree, columnas)
-
-        for i, item in enumerate(datos, 1):
-            tree.insert("", tk.END, text=str(i), values=(
-                item["id"],
-                item["nombre"],
-                item["categoria"]["nombre"],
-                item["proveedor"]["nombre"],
-                item["stock_actual"],
-                item["stock_minimo"]
-            ))
-
-    def _configurar_treeview_movimientos(self, tree, datos):
+        return self._columnas(columnas), lambda item: (
+            item["id"],
+            item["nombre"],
+            item["categoria"]["nombre"],
+            item["proveedor"]["nombre"],
+            item["stock_actual"],
+            item["stock_minimo"]
+        )
+
+    def _formato_movimientos(self):
         columnas = ("id", "fecha", "tipo", "producto", "cantidad", "responsable", "almacen")
-        self._configurar_columnas(tree, columnas)
-
-        for i, item in enumerate(datos, 1):
-            tree.insert("", tk.END, text=str(i), values=(
-                item["id"],
-                item["fecha"],
-                item.get("tipo", ""),
-                item["producto"]["nombre"],
-                item["cantidad"],
-                item["responsable"]["nombre"],
-                item["almacen"]
-            ))
-
-    def _configurar_treeview_stock(self, tree, datos):
+        return self._columnas(columnas), lambda item: (
+            item["id"],
+            item["fecha"],
+            item.get("tipo", ""),
+            item["producto"]["nombre"],
+            item["cantidad"],
+            item["responsable"]["nombre"],
+            item["almacen"]
+        )
+
+    def _formato_stock(self):
         columnas = ("id", "nombre", "stock_actual", "stock_minimo", "diferencia")
-        self._configurar_columnas(tree, columnas)
-
-        for i, item in enumerate(datos, 1):
-            diferencia = item["stock_actual"] - item["stock_minimo"]
-            tree.insert("", tk.END, text=str(i), values=(
-                item["id"],
-                item["nombre"],
-                item["stock_actual"],
-                item["stock_minimo"],
-                diferencia
-            ))
+        return self._columnas(columnas), lambda item: (
+            item["id"],
+            item["nombre"],
+            item["stock_actual"],
+            item["stock_minimo"],
+            item["stock_actual"] - item["stock_minimo"]
+        )
+
+    def _formato_stock_por_almacen(self):
+        columnas = ("id", "nombre", "almacen", "cantidad")
+        return self._columnas(columnas), lambda item: (
+            item["producto"]["id"],
+            item["producto"]["nombre"],
+            item["almacen"],
+            item["cantidad"]
+        )
+
+    def _formato_ventas(self):
+        columnas = ("id", "nombre", "salidas", "unidades", "devueltas", "netas")
+        return self._columnas(columnas), lambda item: (
+            item["producto"]["id"],
+            item["producto"]["nombre"],
+            item["salidas"],
+            item["unidades"],
+            item["devueltas"],
+            item["netas"]
+        )
+
+    def _formato_rotacion(self):
+        columnas = ("id", "nombre", "vendidas", "stock_inicial", "stock_final", "stock_medio",
+                    "rotacion", "dias_inventario")
+        return self._columnas(columnas), lambda item: (
+            item["producto"]["id"],
+            item["producto"]["nombre"],
+            item["vendidas"],
+            item["stock_inicial"],
+            item["stock_final"],
+            item["stock_medio"],
+            "-" if item["rotacion"] is None else item["rotacion"],
+            "-" if item["dias_inventario"] is None else item["dias_inventario"]
+        )
+
+    def _formato_movimientos_por_almacen(self):
+        columnas = ("almacen", "tipo", "movimientos", "unidades")
+        return self._columnas(columnas), lambda item: (
+            item["almacen"],
+            item["tipo"],
+            item["movimientos"],
+            item["unidades"]
+        )
+
+    def _formato_reabastecimiento(self):
+        columnas = ("id", "nombre", "stock_actual", "stock_minimo", "consumo_medio", "desviacion",
+                    "dias_cobertura", "punto_pedido", "cantidad_sugerida")
+        return self._columnas(columnas), lambda item: (
+            item["producto"]["id"],
+            item["producto"]["nombre"],
+            item["producto"]["stock_actual"],
+            item["producto"]["stock_minimo"],
+            item["consumo_medio"],
+            item["desviacion"],
+            "-" if item["dias_cobertura"] is None else item["dias_cobertura"],
+            item["punto_pedido"],
+            item["cantidad_sugerida"]
+        )
 
     def crear_formulario(self, titulo, campos, comando_guardar, config_extra=None):
         tk.Label(self.root, text=titulo, font=("Arial", 14)).pack(pady=10)
@@ -242,6 +594,9 @@ class InventarioVista:
 
             if tipo == "combo":
                 widget = ttk.Combobox(frame_form, values=opciones[0])
+            elif tipo == "busqueda":
+                # Autocompletado contra el índice de búsqueda de la colección
+                widget = CampoBusqueda(frame_form, self._buscador(opciones[0]), pedir=self._pedir)
             else:
                 widget = tk.Entry(frame_form)
 
@@ -257,6 +612,18 @@ class InventarioVista:
         if config_extra:
             config_extra()
 
+    def _buscador(self, coleccion: str):
+        def buscar(texto, limite):
+            return [f"{e.id} - {e.nombre}" for e in self.controlador.buscar(coleccion, texto, limite)]
+        return buscar
+
+    def _pedir(self, funcion, al_terminar, al_error=None):
+        def al_fallar(error):
+            if al_error is not None:
+                al_error(error)
+            self._mostrar_error(error)
+        self.ejecutor.enviar(funcion, al_terminar=al_terminar, al_error=al_fallar)
+
     def limpiar_pantalla(self):
         for widget in self.root.winfo_children():
             widget.destroy()
\ No newline at end of file
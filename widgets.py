@@ -0,0 +1,248 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+def _pedir_en_el_acto(funcion, al_terminar, al_error=None):
+    try:
+        resultado = funcion()
+    except Exception as e:
+        if al_error is None:
+            raise
+        al_error(e)
+        return
+    al_terminar(resultado)
+
+
+class TablaVirtual(tk.Frame):
+    # Treeview "virtual": solo existen como ítems las filas visibles. Las páginas
+    # se piden al origen de datos bajo demanda, y el orden por columna y el filtro
+    # se resuelven allí, así que el coste no depende del tamaño del reporte.
+    TAMANO_BLOQUE = 200
+    BLOQUES_EN_CACHE = 16
+    RETARDO_FILTRO_MS = 300
+
+    def __init__(self, master, columnas, obtener_pagina, contar, pedir=None, **kwargs):
+        # columnas: [(clave, título)]
+        # obtener_pagina(offset, limit, orden, descendente, filtro) -> [tupla de valores]
+        # contar(filtro) -> int
+        # pedir(funcion, al_terminar, al_error): cómo ejecutar las consultas; por
+        # defecto en el acto, o en segundo plano con Ejecutor.enviar para no
+        # bloquear Tk
+        super().__init__(master, **kwargs)
+        self.columnas = columnas
+        self.obtener_pagina = obtener_pagina
+        self.contar = contar
+        self.pedir = pedir or _pedir_en_el_acto
+        self.orden = None
+        self.descendente = False
+        self.filtro = ""
+        self.total = 0
+        self.inicio = 0
+        self.visibles = 20
+        self._bloques = {}
+        self._pendientes = set()
+        self._fallidos = set()
+        self._generacion = 0
+        self._pintando = False
+        self._filtro_pendiente = None
+
+        barra = tk.Frame(self)
+        barra.pack(fill=tk.X, pady=(0, 5))
+        tk.Label(barra, text="Filtrar:").pack(side=tk.LEFT)
+        self.var_filtro = tk.StringVar()
+        self.var_filtro.trace_add("write", self._al_escribir_filtro)
+        tk.Entry(barra, textvariable=self.var_filtro).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.label_total = tk.Label(barra, text="")
+        self.label_total.pack(side=tk.RIGHT)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._al_desplazar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree = ttk.Treeview(self, columns=[c for c, _ in columnas], height=self.visibles)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.tree.heading("#0", text="Ítem")
+        self.tree.column("#0", width=60, stretch=tk.NO)
+        for clave, titulo in columnas:
+            self.tree.heading(clave, text=titulo, command=lambda c=clave: self.ordenar_por(c))
+            self.tree.column(clave, width=100, anchor=tk.W)
+
+        self.tree.bind("<Configure>", self._al_redimensionar)
+        self.tree.bind("<MouseWheel>", lambda e: self.desplazar(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.desplazar(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.desplazar(1, "units"))
+        self.tree.bind("<Prior>", lambda e: self.desplazar(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.desplazar(1, "pages"))
+
+        self.recargar()
+
+    def recargar(self):
+        generacion = self._reiniciar()
+        self.label_total.config(text="Contando...")
+        filtro = self.filtro or None
+
+        def al_contar(total):
+            if generacion == self._generacion and self.winfo_exists():
+                self.total = total
+                self.label_total.config(text=f"{total} filas")
+                self._pintar()
+
+        def al_fallar(error):
+            if generacion == self._generacion and self.winfo_exists():
+                self.label_total.config(text="Error al contar")
+
+        self.pedir(lambda: self.contar(filtro), al_contar, al_fallar)
+
+    def _reiniciar(self) -> int:
+        # Descarta las páginas cargadas y las respuestas que aún estén en camino
+        self._generacion += 1
+        self._bloques.clear()
+        self._pendientes.clear()
+        self._fallidos.clear()
+        self.inicio = 0
+        return self._generacion
+
+    def ordenar_por(self, clave):
+        if self.orden == clave:
+            self.descendente = not self.descendente
+        else:
+            self.orden, self.descendente = clave, False
+        for c, titulo in self.columnas:
+            marca = (" ▼" if self.descendente else " ▲") if c == self.orden else ""
+            self.tree.heading(c, text=titulo + marca)
+        self._reiniciar()
+        self._pintar()
+
+    def desplazar(self, cantidad: int, unidad: str):
+        paso = self.visibles if unidad == "pages" else 3
+        self._mover_a(self.inicio + int(cantidad) * paso)
+        return "break"
+
+    def _al_desplazar(self, accion, *args):
+        if accion == "moveto":
+            self._mover_a(int(float(args[0]) * self.total))
+        elif accion == "scroll":
+            self.desplazar(int(args[0]), args[1])
+
+    def _mover_a(self, inicio: int):
+        inicio = max(0, min(inicio, self.total - self.visibles))
+        if inicio != self.inicio:
+            self.inicio = inicio
+            self._fallidos.clear()  # al moverse se reintentan los bloques que fallaron
+            self._pintar()
+
+    def _al_redimensionar(self, event):
+        alto_fila = ttk.Style().lookup("Treeview", "rowheight") or 20
+        visibles = max(1, event.height // int(alto_fila) - 1)
+        if visibles != self.visibles:
+            self.visibles = visibles
+            self.inicio = max(0, min(self.inicio, self.total - visibles))
+            self._pintar()
+
+    def _al_escribir_filtro(self, *args):
+        # Espera a que el usuario deje de escribir antes de consultar
+        if self._filtro_pendiente is not None:
+            self.after_cancel(self._filtro_pendiente)
+        self._filtro_pendiente = self.after(self.RETARDO_FILTRO_MS, self._aplicar_filtro)
+
+    def _aplicar_filtro(self):
+        self._filtro_pendiente = None
+        self.filtro = self.var_filtro.get().strip()
+        self.recargar()
+
+    def _fila(self, indice: int):
+        # Devuelve la fila si su bloque ya está cargado; si no, lo pide y devuelve None
+        bloque, posicion = divmod(indice, self.TAMANO_BLOQUE)
+        filas = self._bloques.get(bloque)
+        if filas is None:
+            if bloque in self._fallidos:
+                return None
+            self._pedir_bloque(bloque)
+            filas = self._bloques.get(bloque)  # ya disponible si `pedir` es síncrono
+            if filas is None:
+                return None
+        return filas[posicion] if posicion < len(filas) else ()
+
+    def _pedir_bloque(self, bloque: int):
+        if bloque in self._pendientes:
+            return
+        self._pendientes.add(bloque)
+        generacion = self._generacion
+        argumentos = (bloque * self.TAMANO_BLOQUE, self.TAMANO_BLOQUE,
+                      self.orden, self.descendente, self.filtro or None)
+
+        def al_cargar(filas):
+            if generacion != self._generacion or not self.winfo_exists():
+                return
+            self._pendientes.discard(bloque)
+            if len(self._bloques) >= self.BLOQUES_EN_CACHE:
+                self._bloques.pop(next(iter(self._bloques)))
+            self._bloques[bloque] = filas
+            if not self._pintando:
+                self._pintar()
+
+        def al_fallar(error):
+            if generacion != self._generacion or not self.winfo_exists():
+                return
+            self._pendientes.discard(bloque)
+            self._fallidos.add(bloque)
+            if not self._pintando:
+                self._pintar()
+
+        self.pedir(lambda: self.obtener_pagina(*argumentos), al_cargar, al_fallar)
+
+    def _pintar(self):
+        self._pintando = True
+        self.tree.delete(*self.tree.get_children())
+        fin = min(self.inicio + self.visibles, self.total)
+        for indice in range(self.inicio, fin):
+            valores = self._fila(indice)
+            if valores is None:
+                if indice // self.TAMANO_BLOQUE in self._fallidos:
+                    valores = ("Error al cargar",)
+                else:
+                    valores = ("Cargando...",)
+            self.tree.insert("", tk.END, text=str(indice + 1), values=valores)
+        self._pintando = False
+        if self.total:
+            self.scrollbar.set(self.inicio / self.total, fin / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+
+class CampoBusqueda(ttk.Combobox):
+    # Combobox con autocompletado: no se carga con todas las opciones, sino que
+    # al escribir (tras una pausa, no en cada tecla) pide las mejores
+    # coincidencias y las pone como valores; la flecha abajo las despliega.
+    RETARDO_MS = 200
+    LIMITE = 20
+
+    def __init__(self, master, buscar, pedir=None, **kwargs):
+        # buscar(texto, limite) -> [texto de cada opción]
+        # pedir(funcion, al_terminar, al_error): como en TablaVirtual
+        super().__init__(master, **kwargs)
+        self.buscar = buscar
+        self.pedir = pedir or _pedir_en_el_acto
+        self._pendiente = None
+        self.var_texto = tk.StringVar()
+        self.configure(textvariable=self.var_texto)
+        self.var_texto.trace_add("write", self._al_escribir)
+        self._consultar()
+
+    def _al_escribir(self, *args):
+        # Elegir una opción también escribe el texto: no hace falta buscarla
+        if self.var_texto.get() in self["values"]:
+            return
+        if self._pendiente is not None:
+            self.after_cancel(self._pendiente)
+        self._pendiente = self.after(self.RETARDO_MS, self._consultar)
+
+    def _consultar(self):
+        self._pendiente = None
+        texto = self.var_texto.get().strip()
+
+        def al_recibir(opciones):
+            # Descarta respuestas de un texto que ya no es el actual
+            if self.winfo_exists() and self.var_texto.get().strip() == texto:
+                self["values"] = opciones
+
+        self.pedir(lambda: self.buscar(texto, self.LIMITE), al_recibir)